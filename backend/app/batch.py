@@ -0,0 +1,314 @@
+"""
+Batch parsing: many PDFs (or ZIP archives of PDFs) on one shared process pool
+
+POST /api/parse-batch[/stream] hands every document of a request to a pool
+of PARSE_BATCH_WORKERS processes (0 = one per CPU core) shared by all
+batches. A document is one task, parsed end to end in a worker (segmentation
+stays serial there: the pool already keeps every core busy), so a batch
+takes about total work / cores instead of the sum of its documents.
+Documents are submitted largest first, so a big booklet does not start last
+and leave the other cores idle at the end.
+
+Cached documents are answered from the parse result cache without touching
+the pool, and identical uploads within a batch are parsed once. Workers send
+their page progress through one queue; a dispatcher thread routes it to the
+batch it belongs to. Each worker gets an equal share of
+OPENAI_VISION_CONCURRENCY (at least 1), so the pool as a whole stays within it.
+"""
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .cache import get_parse_cache, make_cache_key
+from .images import inline_images, result_images_available
+from .logs import get_logger, log_context, request_id_var
+from .metrics import observe_parse, observe_parse_failure
+from .parse_pdf import PARSER_VERSION, PdfSource, iter_parse_events, parser_settings, questions_to_json
+from .render import RenderOptions
+from .selection import FULL_DOCUMENT, Selection
+from .uploads import SpooledUpload
+from .vision import VISION_CONCURRENCY, limit_vision_concurrency
+
+logger = get_logger("batch")
+
+BATCH_WORKERS = int(os.getenv("PARSE_BATCH_WORKERS", "0")) or (os.cpu_count() or 1)
+BATCH_MAX_DOCUMENTS = int(os.getenv("PARSE_BATCH_MAX_DOCUMENTS", "200"))
+
+# Worker side: the parent's progress queue (set by _init_worker)
+_progress_queue = None
+
+
+def _init_worker(progress_queue, vision_concurrency: int) -> None:
+    global _progress_queue
+    _progress_queue = progress_queue
+    limit_vision_concurrency(vision_concurrency)
+
+
+def _parse_in_worker(
+    batch_id: str,
+    document: int,
+    pdf: PdfSource,
+    render: RenderOptions,
+    request_id: Optional[str],
+    trace: bool,
+    selection: Selection,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Worker entry point: parse one document; returns (result JSON, summary event)"""
+    questions = []
+    summary: Dict[str, Any] = {}
+    with log_context(request_id=request_id, trace=trace):
+        for event in iter_parse_events(pdf, workers=1, render=render, selection=selection):
+            if event["type"] == "question":
+                questions.append(event["question"])
+            elif event["type"] == "summary":
+                summary = event
+            elif event["type"] in ("start", "progress"):
+                _progress_queue.put((batch_id, document, event))
+    return questions_to_json(questions), summary
+
+
+class BatchPool:
+    """Worker processes shared by all batches, plus the thread routing their progress"""
+
+    def __init__(self, workers: int = BATCH_WORKERS):
+        self.workers = max(1, workers)
+        # spawn: safe with the threads uvicorn/OpenAI keep running, same on Windows
+        self._context = multiprocessing.get_context("spawn")
+        self._progress = self._context.Queue()
+        self._executor = self._create_executor()
+        self._lock = threading.Lock()
+        self._batches: Dict[str, "queue.SimpleQueue"] = {}
+        self._dispatcher = threading.Thread(target=self._dispatch, name="batch-progress", daemon=True)
+        self._dispatcher.start()
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=self._context,
+            initializer=_init_worker,
+            initargs=(self._progress, max(1, VISION_CONCURRENCY // self.workers)),
+        )
+
+    def _dispatch(self) -> None:
+        while True:
+            item = self._progress.get()
+            if item is None:
+                return
+            batch_id, document, event = item
+            with self._lock:
+                events = self._batches.get(batch_id)
+            if events is not None:  # Finished batches drop late progress
+                events.put(("progress", document, event))
+
+    def open_batch(self) -> Tuple[str, "queue.SimpleQueue"]:
+        """New batch ID and the queue receiving its progress and finished documents"""
+        batch_id = uuid.uuid4().hex
+        events: "queue.SimpleQueue" = queue.SimpleQueue()
+        with self._lock:
+            self._batches[batch_id] = events
+        return batch_id, events
+
+    def close_batch(self, batch_id: str) -> None:
+        with self._lock:
+            self._batches.pop(batch_id, None)
+
+    def submit(self, *args: Any) -> Future:
+        """Queue one document (arguments of _parse_in_worker)"""
+        with self._lock:
+            executor = self._executor
+        try:
+            return executor.submit(_parse_in_worker, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. MuPDF crashed on a malformed PDF): start a fresh pool
+            logger.warning("⚠️  Batch worker pool broken, restarting it")
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = self._create_executor()
+                executor = self._executor
+            return executor.submit(_parse_in_worker, *args)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor = self._executor
+        executor.shutdown(wait=False, cancel_futures=True)
+        self._progress.put(None)
+
+
+_pool: Optional[BatchPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_batch_pool() -> BatchPool:
+    """Process-wide batch pool (worker processes start on first use)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BatchPool(BATCH_WORKERS)
+        return _pool
+
+
+def shutdown_batch_pool() -> None:
+    """Stop the batch worker processes (called on app shutdown)"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+def iter_batch_records(
+    uploads: List[SpooledUpload],
+    render: RenderOptions,
+    images: str = "url",
+    trace: bool = False,
+    selection: Selection = FULL_DOCUMENT,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Batch records as documents finish (blocking: runs on the parse executor)
+
+      batch → progress / document / document_error ... → summary
+
+    Records of one document carry its index in `uploads` as "document".
+    Closing the iterator early cancels the documents not started yet.
+    """
+    started = time.perf_counter()
+    yield {
+        "type": "batch",
+        "documents": [
+            {"document": index, "filename": upload.filename, "size": upload.size}
+            for index, upload in enumerate(uploads)
+        ],
+    }
+
+    # Identical uploads are parsed once
+    groups: Dict[str, List[int]] = {}
+    for index, upload in enumerate(uploads):
+        groups.setdefault(upload.digest, []).append(index)
+
+    cache = get_parse_cache(PARSER_VERSION)
+    settings = parser_settings(render, selection)
+    counts = {"completed": 0, "failed": 0, "cached": 0, "total_questions": 0}
+
+    def document_records(digest: str, result: Dict[str, Any], cached: bool) -> Iterator[Dict[str, Any]]:
+        if images == "inline":
+            result = inline_images(result)
+        for index in groups[digest]:
+            counts["completed"] += 1
+            counts["cached"] += cached
+            counts["total_questions"] += result["total_questions"]
+            yield {
+                "type": "document",
+                "document": index,
+                "filename": uploads[index].filename,
+                "cached": cached,
+                "result": result,
+            }
+
+    to_parse = []
+    for digest in groups:
+        cached = None
+        if cache is not None:
+            cached = cache.get(make_cache_key(digest, settings, PARSER_VERSION))
+            if cached is not None and not result_images_available(cached):
+                cached = None
+        if cached is not None:
+            yield from document_records(digest, cached, True)
+        else:
+            to_parse.append(digest)
+
+    pool = get_batch_pool()
+    batch_id, events = pool.open_batch()
+    futures: List[Future] = []
+    request_id = request_id_var.get()
+    try:
+        if to_parse:
+            logger.info("📦 Batch: %d document(s) to parse on %d worker process(es)", len(to_parse), pool.workers)
+
+        # Largest first: the long documents overlap with the short ones
+        for digest in sorted(to_parse, key=lambda digest: -uploads[groups[digest][0]].size):
+            document = groups[digest][0]
+            future = pool.submit(batch_id, document, uploads[document].source(), render, request_id, trace, selection)
+            future.add_done_callback(lambda future, digest=digest: events.put(("done", digest, future)))
+            futures.append(future)
+
+        finished = set()
+        while len(finished) < len(futures):
+            kind, key, payload = events.get()
+            if kind == "progress":
+                if uploads[key].digest in finished:
+                    continue
+                progress = {
+                    "pages_done": payload.get("pages_done", 0),
+                    "pages_total": payload.get("pages_total", payload.get("pages")),
+                    "questions_found": payload.get("questions_found", 0),
+                }
+                for index in groups[uploads[key].digest]:
+                    yield {"type": "progress", "document": index, **progress}
+                continue
+
+            finished.add(key)
+            try:
+                result, summary = payload.result()
+            except Exception as e:
+                # Worker processes keep their own metrics: count the document here
+                observe_parse_failure()
+                logger.warning("❌ %s: %s", uploads[groups[key][0]].filename, e)
+                for index in groups[key]:
+                    counts["failed"] += 1
+                    yield {
+                        "type": "document_error",
+                        "document": index,
+                        "filename": uploads[index].filename,
+                        "detail": f"PDF parsing error: {str(e)}",
+                    }
+                continue
+
+            observe_parse(summary["timings"], summary["pages"], summary["total_questions"])
+            if cache is not None:
+                cache.put(make_cache_key(key, settings, PARSER_VERSION), result)
+            yield from document_records(key, result, False)
+    finally:
+        for future in futures:
+            future.cancel()
+        pool.close_batch(batch_id)
+
+    seconds = time.perf_counter() - started
+    logger.info(
+        "📦 Batch done: %d document(s), %d failed, %d cached, %.1fs",
+        len(uploads), counts["failed"], counts["cached"], seconds,
+    )
+    yield {"type": "summary", "total_documents": len(uploads), **counts, "seconds": round(seconds, 2)}
+
+
+def collect_batch_result(records: Iterator[Dict[str, Any]]) -> Dict[str, Any]:
+    """Response of POST /api/parse-batch: one entry per document, in upload order"""
+    documents: List[Optional[Dict[str, Any]]] = []
+    summary: Dict[str, Any] = {}
+    for record in records:
+        if record["type"] == "batch":
+            documents = [None] * len(record["documents"])
+        elif record["type"] == "document":
+            documents[record["document"]] = {
+                "document": record["document"],
+                "filename": record["filename"],
+                "status": "completed",
+                "cached": record["cached"],
+                **record["result"],
+            }
+        elif record["type"] == "document_error":
+            documents[record["document"]] = {
+                "document": record["document"],
+                "filename": record["filename"],
+                "status": "failed",
+                "error": record["detail"],
+            }
+        elif record["type"] == "summary":
+            summary = {key: value for key, value in record.items() if key != "type"}
+
+    return {"success": summary.get("failed", 0) == 0, **summary, "documents": documents}
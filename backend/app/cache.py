@@ -0,0 +1,489 @@
+"""
+Content-addressed cache for parse results
+
+Key: SHA-256 of the uploaded PDF + parser settings + PARSER_VERSION.
+Two tiers:
+- in-memory LRU (per uvicorn worker), bounded by bytes
+- SQLite file shared by all workers on the host, bounded by bytes (LRU eviction)
+
+Entries written by another PARSER_VERSION are purged when the cache opens.
+
+VisionResultCache maps individual question crops to their Vision analysis.
+"""
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from .logs import get_logger
+
+logger = get_logger("cache")
+
+CACHE_DIR = Path(os.getenv("PARSE_CACHE_DIR", ".cache"))
+PARSE_CACHE_ENABLED = os.getenv("PARSE_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+PARSE_CACHE_MEMORY_MB = float(os.getenv("PARSE_CACHE_MEMORY_MB", "64"))
+PARSE_CACHE_DISK_MB = float(os.getenv("PARSE_CACHE_DISK_MB", "1024"))
+
+
+def sha256_digest(data: bytes) -> str:
+    """Hex SHA-256 of raw bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def make_cache_key(content_digest: str, settings: Dict[str, Any], parser_version: str) -> str:
+    """Combine content digest, settings and parser version into one key"""
+    settings_json = json.dumps(settings, sort_keys=True, separators=(",", ":"))
+    return sha256_digest(f"{parser_version}|{content_digest}|{settings_json}".encode("utf-8"))
+
+
+def open_sqlite(path: Path) -> sqlite3.Connection:
+    """Open a SQLite database that several processes can share"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class ParseResultCache:
+    """Two-tier (memory LRU + SQLite) cache of questions_to_json() results"""
+
+    def __init__(
+        self,
+        path: Path,
+        parser_version: str,
+        memory_bytes: int,
+        disk_bytes: int,
+    ):
+        self.parser_version = parser_version
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_size = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+        self._conn = open_sqlite(path)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS parse_results (
+                key TEXT PRIMARY KEY,
+                parser_version TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                value BLOB NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS parse_results_accessed ON parse_results (accessed_at)")
+
+        # Parser version changed → old results are no longer valid
+        purged = self._conn.execute(
+            "DELETE FROM parse_results WHERE parser_version != ?", (parser_version,)
+        ).rowcount
+        if purged:
+            logger.info("🗑️  Parse cache: purged %d entries from older parser versions", purged)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result or None"""
+        with self._lock:
+            blob = self._memory.get(key)
+            if blob is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return json.loads(zlib.decompress(blob))
+
+            row = self._conn.execute(
+                "SELECT value FROM parse_results WHERE key = ? AND parser_version = ?",
+                (key, self.parser_version),
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+
+            blob = row[0]
+            self._conn.execute("UPDATE parse_results SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._remember(key, blob)
+            self.stats["disk_hits"] += 1
+            return json.loads(zlib.decompress(blob))
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        """Store a result in both tiers"""
+        self._put_blob(key, zlib.compress(json.dumps(result, ensure_ascii=False).encode("utf-8"), 6))
+
+    def writer(self, key: str) -> "ParseResultWriter":
+        """Store a result question by question (see ParseResultWriter)"""
+        return ParseResultWriter(self, key)
+
+    def _put_blob(self, key: str, blob: bytes) -> None:
+        now = time.time()
+
+        with self._lock:
+            self._remember(key, blob)
+            if len(blob) > self.disk_bytes:
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO parse_results (key, parser_version, size, created_at, accessed_at, value) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, self.parser_version, len(blob), now, now, blob),
+            )
+            self.stats["stores"] += 1
+            self._evict_disk()
+
+    def _remember(self, key: str, blob: bytes) -> None:
+        if len(blob) > self.memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_size -= len(old)
+        self._memory[key] = blob
+        self._memory_size += len(blob)
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def _evict_disk(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM parse_results").fetchone()[0]
+        if total <= self.disk_bytes:
+            return
+
+        # Least recently used first
+        freed = 0
+        doomed = []
+        for key, size in self._conn.execute("SELECT key, size FROM parse_results ORDER BY accessed_at"):
+            doomed.append((key,))
+            freed += size
+            if total - freed <= self.disk_bytes:
+                break
+        self._conn.executemany("DELETE FROM parse_results WHERE key = ?", doomed)
+        self.stats["evictions"] += len(doomed)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters and sizes for monitoring"""
+        with self._lock:
+            entries, disk_size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM parse_results"
+            ).fetchone()
+            lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            return {
+                **self.stats,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_size,
+                "disk_entries": entries,
+                "disk_bytes": disk_size,
+                "parser_version": self.parser_version,
+            }
+
+
+class ParseResultWriter:
+    """
+    A questions_to_json() result written to the parse cache one question at a time
+
+    Questions are spooled to a temporary file, so a streamed parse never holds
+    the whole result in memory; commit() compresses it into the cache.
+    """
+
+    def __init__(self, cache: ParseResultCache, key: str):
+        self.cache = cache
+        self.key = key
+        self.total = 0
+        self._file = tempfile.TemporaryFile()
+
+    def add(self, question: Dict[str, Any]) -> None:
+        self._file.write((b"," if self.total else b"") + json.dumps(question, ensure_ascii=False).encode("utf-8"))
+        self.total += 1
+
+    def commit(self) -> None:
+        """Store the questions added so far as a complete result"""
+        head = json.dumps({"success": True, "total_questions": self.total})[:-1] + ', "questions": ['
+        compressor = zlib.compressobj(6)
+        chunks = [compressor.compress(head.encode("utf-8"))]
+        self._file.seek(0)
+        for chunk in iter(lambda: self._file.read(1 << 16), b""):
+            chunks.append(compressor.compress(chunk))
+        chunks += [compressor.compress(b"]}"), compressor.flush()]
+        self.close()
+        self.cache._put_blob(self.key, b"".join(chunks))
+
+    def close(self) -> None:
+        self._file.close()
+
+
+_parse_cache: Optional[ParseResultCache] = None
+_parse_cache_lock = threading.Lock()
+
+
+def get_parse_cache(parser_version: str) -> Optional[ParseResultCache]:
+    """Process-wide parse cache (None when PARSE_CACHE_ENABLED=false)"""
+    global _parse_cache
+    if not PARSE_CACHE_ENABLED:
+        return None
+    with _parse_cache_lock:
+        if _parse_cache is None:
+            _parse_cache = ParseResultCache(
+                CACHE_DIR / "parse_results.sqlite3",
+                parser_version=parser_version,
+                memory_bytes=int(PARSE_CACHE_MEMORY_MB * 1024 * 1024),
+                disk_bytes=int(PARSE_CACHE_DISK_MB * 1024 * 1024),
+            )
+        return _parse_cache
+
+
+# ---------------------------------------------------------------------------
+# Per-crop Vision analysis cache
+# ---------------------------------------------------------------------------
+
+VISION_CACHE_ENABLED = os.getenv("VISION_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+# Perceptual-hash matching catches near-identical re-renders (other scale/encoder).
+# Off by default: crops that differ in only a few glyphs can hash alike.
+VISION_CACHE_PHASH = os.getenv("VISION_CACHE_PHASH", "false").lower() in ("1", "true", "yes")
+VISION_CACHE_PHASH_DISTANCE = int(os.getenv("VISION_CACHE_PHASH_DISTANCE", "2"))
+VISION_CACHE_DISK_MB = float(os.getenv("VISION_CACHE_DISK_MB", "256"))
+
+_PHASH_SIDE = 16  # 16x16 difference hash → 256 bits
+_PHASH_BANDS = 8  # 8 x 32-bit bands: any distance < 8 shares at least one band
+# Key, hash and band columns plus their index entries, counted on top of the JSON value
+_VISION_ROW_OVERHEAD = 512
+
+
+def perceptual_hash(image_bytes: bytes) -> Tuple[int, float]:
+    """
+    256-bit difference hash of an encoded image, plus its aspect ratio
+
+    Grayscale → (17 x 16) → compare horizontal neighbours.
+    """
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        aspect = img.width / img.height if img.height else 0.0
+        small = img.convert("L").resize((_PHASH_SIDE + 1, _PHASH_SIDE), Image.BILINEAR)
+        pixels = list(small.getdata())
+
+    value = 0
+    row = _PHASH_SIDE + 1
+    for y in range(_PHASH_SIDE):
+        for x in range(_PHASH_SIDE):
+            value = (value << 1) | (pixels[y * row + x] > pixels[y * row + x + 1])
+    return value, aspect
+
+
+def _phash_bands(value: int) -> List[int]:
+    bits = _PHASH_SIDE * _PHASH_SIDE // _PHASH_BANDS
+    mask = (1 << bits) - 1
+    return [(value >> (i * bits)) & mask for i in range(_PHASH_BANDS)]
+
+
+class VisionResultCache:
+    """
+    Persistent map: image hash (+ prompt version + model) → parsed Vision JSON
+
+    Exact matches use SHA-256 of the encoded crop. With perceptual mode on, a
+    miss falls back to the nearest stored dHash within `phash_distance` bits
+    (same prompt/model, similar aspect ratio). Least recently used entries are
+    evicted beyond `disk_bytes` (JSON size plus a fixed per-row overhead).
+    """
+
+    def __init__(self, path: Path, phash: bool = False, phash_distance: int = 2, disk_bytes: int = 256 * 1024 * 1024):
+        self.phash = phash
+        self.phash_distance = min(phash_distance, _PHASH_BANDS - 1)
+        self.disk_bytes = disk_bytes
+
+        self._lock = threading.Lock()
+        self.stats = {
+            "exact_hits": 0,
+            "perceptual_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "api_calls": 0,
+            "api_seconds": 0.0,
+            "api_tokens": 0,
+        }
+
+        band_columns = ", ".join(f"band{i} INTEGER" for i in range(_PHASH_BANDS))
+        self._conn = open_sqlite(path)
+        self._conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS vision_results (
+                key TEXT PRIMARY KEY,
+                prompt_version TEXT NOT NULL,
+                model TEXT NOT NULL,
+                phash TEXT,
+                aspect REAL,
+                {band_columns},
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                value TEXT NOT NULL
+            )
+            """
+        )
+        for i in range(_PHASH_BANDS):
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS vision_results_band{i} ON vision_results (band{i})")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS vision_results_accessed ON vision_results (accessed_at)")
+
+    @staticmethod
+    def _key(image_bytes: bytes, prompt_version: str, model: str) -> str:
+        return sha256_digest(f"{prompt_version}|{model}|".encode("utf-8") + image_bytes)
+
+    def lookup(self, image_bytes: bytes, prompt_version: str, model: str) -> Optional[Dict[str, Any]]:
+        """Return a cached Vision result for this crop, or None"""
+        key = self._key(image_bytes, prompt_version, model)
+
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM vision_results WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._conn.execute(
+                    "UPDATE vision_results SET hits = hits + 1, accessed_at = ? WHERE key = ?", (time.time(), key)
+                )
+                self.stats["exact_hits"] += 1
+                return json.loads(row[0])
+
+        if self.phash:
+            match = self._lookup_perceptual(image_bytes, prompt_version, model)
+            if match is not None:
+                return match
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def _lookup_perceptual(self, image_bytes: bytes, prompt_version: str, model: str) -> Optional[Dict[str, Any]]:
+        try:
+            value, aspect = perceptual_hash(image_bytes)
+        except Exception:
+            return None
+
+        bands = _phash_bands(value)
+        where = " OR ".join(f"band{i} = ?" for i in range(_PHASH_BANDS))
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key, phash, aspect, value FROM vision_results "
+                f"WHERE prompt_version = ? AND model = ? AND ({where})",
+                (prompt_version, model, *bands),
+            ).fetchall()
+
+            best = None
+            for key, phash_hex, stored_aspect, stored_value in rows:
+                if not phash_hex or not stored_aspect or abs(stored_aspect - aspect) / stored_aspect > 0.02:
+                    continue
+                distance = bin(int(phash_hex, 16) ^ value).count("1")
+                if distance <= self.phash_distance and (best is None or distance < best[0]):
+                    best = (distance, key, stored_value)
+
+            if best is None:
+                return None
+
+            self._conn.execute(
+                "UPDATE vision_results SET hits = hits + 1, accessed_at = ? WHERE key = ?", (time.time(), best[1])
+            )
+            self.stats["perceptual_hits"] += 1
+            return json.loads(best[2])
+
+    def store(self, image_bytes: bytes, prompt_version: str, model: str, result: Dict[str, Any]) -> None:
+        """Remember a successful Vision result for this crop"""
+        key = self._key(image_bytes, prompt_version, model)
+
+        phash_hex, aspect, bands = None, None, [None] * _PHASH_BANDS
+        try:
+            value, aspect = perceptual_hash(image_bytes)
+            phash_hex = format(value, "x")
+            bands = _phash_bands(value)
+        except Exception:
+            pass
+
+        band_names = ", ".join(f"band{i}" for i in range(_PHASH_BANDS))
+        placeholders = ", ".join("?" for _ in range(_PHASH_BANDS))
+        value = json.dumps(result, ensure_ascii=False)
+        size = len(value.encode("utf-8")) + _VISION_ROW_OVERHEAD
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO vision_results "
+                f"(key, prompt_version, model, phash, aspect, {band_names}, created_at, value, size, accessed_at) "
+                f"VALUES (?, ?, ?, ?, ?, {placeholders}, ?, ?, ?, ?)",
+                (key, prompt_version, model, phash_hex, aspect, *bands, now, value, size, now),
+            )
+            self.stats["stores"] += 1
+            self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM vision_results").fetchone()[0]
+        if total <= self.disk_bytes:
+            return
+
+        # Least recently used first
+        freed = 0
+        doomed = []
+        for key, size in self._conn.execute("SELECT key, size FROM vision_results ORDER BY accessed_at"):
+            doomed.append((key,))
+            freed += size
+            if total - freed <= self.disk_bytes:
+                break
+        self._conn.executemany("DELETE FROM vision_results WHERE key = ?", doomed)
+        self.stats["evictions"] += len(doomed)
+
+    def record_api_call(self, seconds: float, tokens: int) -> None:
+        """Track real API latency/tokens so savings from hits can be estimated"""
+        with self._lock:
+            self.stats["api_calls"] += 1
+            self.stats["api_seconds"] += seconds
+            self.stats["api_tokens"] += tokens
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Hit/miss counters with estimated latency and token savings"""
+        with self._lock:
+            stats = dict(self.stats)
+            entries, disk_size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM vision_results"
+            ).fetchone()
+
+        hits = stats["exact_hits"] + stats["perceptual_hits"]
+        lookups = hits + stats["misses"]
+        calls = stats["api_calls"]
+        avg_seconds = stats["api_seconds"] / calls if calls else 0.0
+        avg_tokens = stats["api_tokens"] / calls if calls else 0.0
+        return {
+            **stats,
+            "api_seconds": round(stats["api_seconds"], 3),
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "entries": entries,
+            "disk_bytes": disk_size,
+            "perceptual_mode": self.phash,
+            "avg_call_seconds": round(avg_seconds, 3),
+            "estimated_seconds_saved": round(hits * avg_seconds, 2),
+            "estimated_tokens_saved": int(hits * avg_tokens),
+        }
+
+
+_vision_cache: Optional[VisionResultCache] = None
+
+
+def get_vision_cache() -> Optional[VisionResultCache]:
+    """Process-wide Vision result cache (None when VISION_CACHE_ENABLED=false)"""
+    global _vision_cache
+    if not VISION_CACHE_ENABLED:
+        return None
+    with _parse_cache_lock:
+        if _vision_cache is None:
+            _vision_cache = VisionResultCache(
+                CACHE_DIR / "vision_results.sqlite3",
+                phash=VISION_CACHE_PHASH,
+                phash_distance=VISION_CACHE_PHASH_DISTANCE,
+                disk_bytes=int(VISION_CACHE_DISK_MB * 1024 * 1024),
+            )
+        return _vision_cache
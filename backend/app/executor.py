@@ -0,0 +1,207 @@
+"""
+Dedicated executor for CPU-bound parsing with admission control
+
+Parsing never runs on the event loop. At most PARSE_EXECUTOR_WORKERS parses
+run at once and at most PARSE_QUEUE_SIZE more may wait; anything beyond that
+is rejected right away (503 + Retry-After) instead of queuing without limit.
+"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, AsyncIterator, Callable, Dict, Iterator
+
+PARSE_EXECUTOR_WORKERS = int(os.getenv("PARSE_EXECUTOR_WORKERS", str(min(4, os.cpu_count() or 1))))
+PARSE_QUEUE_SIZE = int(os.getenv("PARSE_QUEUE_SIZE", "8"))
+# Records buffered between a streaming parse and a slow client (backpressure)
+STREAM_BUFFER_SIZE = 16
+
+
+class QueueFull(Exception):
+    """Raised when the parse executor cannot accept more work"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Parse queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class _Admission:
+    """One admitted unit of work; releases its slot exactly once"""
+
+    def __init__(self, executor: "ParseExecutor"):
+        self._executor = executor
+        self._started = time.perf_counter()
+        self._slot = [True]  # list.pop() is atomic: whoever pops it releases
+
+    def _take(self) -> bool:
+        try:
+            self._slot.pop()
+            return True
+        except IndexError:
+            return False
+
+    def release(self) -> None:
+        if self._take():
+            self._executor._release(time.perf_counter() - self._started)
+
+    def abandon(self) -> None:
+        """release() for GC finalizers: queued, since the executor's lock may be held by this thread"""
+        if self._take():
+            self._executor._abandoned.append(time.perf_counter() - self._started)
+
+
+class ParseExecutor:
+    """Thread pool with a bounded admission queue and load counters"""
+
+    def __init__(self, workers: int = PARSE_EXECUTOR_WORKERS, queue_size: int = PARSE_QUEUE_SIZE):
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="parse")
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self._running = 0
+        self._rejected = 0
+        self._completed = 0
+        self._avg_seconds = 10.0  # Moving average of parse duration, seeds Retry-After
+        self._abandoned: deque = deque()  # Durations of slots released by GC, applied under the lock
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.queue_size
+
+    def _admit(self) -> _Admission:
+        with self._lock:
+            self._release_abandoned()
+            if self._admitted >= self.capacity:
+                self._rejected += 1
+                raise QueueFull(self.retry_after())
+            self._admitted += 1
+        return _Admission(self)
+
+    def _release(self, seconds: float) -> None:
+        with self._lock:
+            self._release_abandoned()
+            self._release_locked(seconds)
+
+    def _release_locked(self, seconds: float) -> None:
+        self._admitted -= 1
+        self._completed += 1
+        self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * seconds
+
+    def _release_abandoned(self) -> None:
+        while self._abandoned:
+            self._release_locked(self._abandoned.popleft())
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free (based on recent parse durations)"""
+        waves = max(1, (self._admitted - self.workers) // self.workers + 1)
+        return max(1, int(self._avg_seconds * waves / 2))
+
+    def _tracked(self, fn: Callable, *args: Any) -> Any:
+        with self._lock:
+            self._running += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    async def run(self, fn: Callable, *args: Any) -> Any:
+        """Run fn(*args) on the executor; raises QueueFull when saturated"""
+        admission = self._admit()
+        # Copy the caller's context so the request ID follows the parse into the thread
+        context = contextvars.copy_context()
+        future = self._executor.submit(context.run, self._tracked, fn, *args)
+        # The slot is held until the thread is done, even if the request is
+        # cancelled meanwhile (a parse that has not started is cancelled with it)
+        future.add_done_callback(lambda _: admission.release())
+        return await asyncio.wrap_future(future)
+
+    def stream(self, make_iterator: Callable[[], Iterator[Any]]) -> AsyncIterator[Any]:
+        """
+        Run a synchronous generator on the executor and consume it asynchronously
+
+        Admission happens here (before the response starts), so a full queue can
+        still be answered with 503. The producer blocks when the client reads
+        slowly, holding at most STREAM_BUFFER_SIZE records.
+        """
+        admission = self._admit()
+        stream = self._stream(make_iterator, admission)
+        # A response that is never iterated must not leak its slot
+        weakref.finalize(stream, admission.abandon)
+        return stream
+
+    async def _stream(self, make_iterator: Callable[[], Iterator[Any]], admission: _Admission) -> AsyncIterator[Any]:
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_BUFFER_SIZE)
+        done = object()
+        cancelled = threading.Event()
+
+        def put(item: Any) -> None:
+            future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+            while True:
+                try:
+                    future.result(timeout=0.1)
+                    return
+                except FutureTimeout:
+                    # Consumer is gone: drop the record instead of blocking forever
+                    if cancelled.is_set() and future.cancel():
+                        return
+
+        def produce() -> None:
+            iterator = make_iterator()
+            try:
+                for item in iterator:
+                    if cancelled.is_set():
+                        break
+                    put(item)
+            except BaseException as e:  # Surface producer errors to the consumer
+                put(e)
+            finally:
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    close()
+                put(done)
+
+        context = contextvars.copy_context()
+        producer = loop.run_in_executor(self._executor, context.run, self._tracked, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            # Client went away: stop the producer; no awaits here, since a
+            # cancelled response task would be interrupted again
+            cancelled.set()
+            producer.add_done_callback(lambda _: admission.release())
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Load counters for health checks and load balancers"""
+        with self._lock:
+            self._release_abandoned()
+            queued = max(0, self._admitted - self._running)
+            return {
+                "workers": self.workers,
+                "running": self._running,
+                "queued": queued,
+                "queue_capacity": self.queue_size,
+                "saturation": round(self._running / self.workers, 3),
+                "accepting": self._admitted < self.capacity,
+                "rejected_total": self._rejected,
+                "completed_total": self._completed,
+                "avg_parse_seconds": round(self._avg_seconds, 2),
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+parse_executor = ParseExecutor()
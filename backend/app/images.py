@@ -0,0 +1,187 @@
+"""
+Content-addressed store for question crop images
+
+Each crop is written once under PARSE_IMAGES_DIR, named by the SHA-256 of its
+bytes, and served by GET /api/images/{digest}. Question JSON only carries the
+URL, so responses stay small and clients can render text before images arrive.
+Because a digest always names the same bytes, responses are cacheable forever
+(ETag + Cache-Control: immutable).
+
+Inline base64 data URIs remain available as a compatibility mode
+(?images=inline or PARSE_IMAGE_DELIVERY=inline).
+"""
+import base64
+import os
+import re
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from .cache import CACHE_DIR, sha256_digest
+
+IMAGES_DIR = Path(os.getenv("PARSE_IMAGES_DIR", str(CACHE_DIR / "images")))
+PARSE_IMAGES_MAX_MB = float(os.getenv("PARSE_IMAGES_MAX_MB", "2048"))
+# Default delivery mode for question images: "url" or "inline" (base64 data URI)
+IMAGE_DELIVERY = os.getenv("PARSE_IMAGE_DELIVERY", "url").lower()
+IMAGE_DELIVERY_MODES = ("url", "inline")
+
+IMAGE_URL_PREFIX = "/api/images/"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_DIGEST_RE = re.compile(r"[0-9a-f]{64}")
+
+
+def is_valid_digest(digest: str) -> bool:
+    """True for a lowercase hex SHA-256 (also keeps paths inside the store)"""
+    return bool(_DIGEST_RE.fullmatch(digest))
+
+
+def image_media_type(data: bytes) -> str:
+    """Media type from the file signature"""
+    if data.startswith(b"\x89PNG"):
+        return "image/png"
+    if data.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+def image_data_uri(data: bytes) -> str:
+    """Encode image bytes as a data URI (Vision requests, inline delivery)"""
+    return f"data:{image_media_type(data)};base64,{base64.b64encode(data).decode('utf-8')}"
+
+
+def image_url(digest: Optional[str]) -> Optional[str]:
+    """Relative URL of a stored image"""
+    return f"{IMAGE_URL_PREFIX}{digest}" if digest else None
+
+
+def digest_from_url(url: Optional[str]) -> Optional[str]:
+    """Digest of an /api/images/ URL (None for data URIs and other values)"""
+    if not url or not url.startswith(IMAGE_URL_PREFIX):
+        return None
+    digest = url[len(IMAGE_URL_PREFIX):]
+    return digest if is_valid_digest(digest) else None
+
+
+class ImageStore:
+    """Image files named by content digest, LRU-pruned above max_bytes"""
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._size = sum(path.stat().st_size for path in self._files())
+        self.stats = {"stores": 0, "dedup_hits": 0, "served": 0, "pruned": 0}
+
+    def _files(self):
+        return (path for path in self.directory.glob("??/*") if is_valid_digest(path.name))
+
+    def path(self, digest: str) -> Path:
+        return self.directory / digest[:2] / digest
+
+    def put(self, data: bytes) -> str:
+        """Store image bytes; returns their digest (no-op when already stored)"""
+        digest = sha256_digest(data)
+        path = self.path(digest)
+        if path.exists():
+            try:
+                os.utime(path)  # Mark as recently used for pruning
+            except OSError:
+                pass
+            self.stats["dedup_hits"] += 1
+            return digest
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{digest}.{uuid.uuid4().hex}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)  # Atomic: readers never see a partial file
+
+        with self._lock:
+            self._size += len(data)
+            self.stats["stores"] += 1
+            over_limit = self._size > self.max_bytes
+        if over_limit:
+            self.prune()
+        return digest
+
+    def get(self, digest: str) -> Optional[bytes]:
+        if not is_valid_digest(digest):
+            return None
+        try:
+            data = self.path(digest).read_bytes()
+        except FileNotFoundError:
+            return None
+        self.stats["served"] += 1
+        return data
+
+    def contains_all(self, digests: Iterable[str]) -> bool:
+        return all(self.path(digest).exists() for digest in digests)
+
+    def prune(self) -> None:
+        """Delete least recently stored images until below 90% of max_bytes"""
+        with self._lock:
+            entries = []
+            for path in self._files():
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            self._size = sum(size for _, size, _ in entries)
+            target = int(self.max_bytes * 0.9)
+            for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+                if self._size <= target:
+                    break
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                self._size -= size
+                self.stats["pruned"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "size_bytes": self._size, "max_bytes": self.max_bytes}
+
+
+_image_store: Optional[ImageStore] = None
+_image_store_lock = threading.Lock()
+
+
+def get_image_store() -> ImageStore:
+    """Process-wide image store"""
+    global _image_store
+    with _image_store_lock:
+        if _image_store is None:
+            _image_store = ImageStore(IMAGES_DIR, int(PARSE_IMAGES_MAX_MB * 1024 * 1024))
+        return _image_store
+
+
+def result_images_available(result: Dict[str, Any]) -> bool:
+    """False when a cached result references images that were pruned since"""
+    digests = [
+        digest_from_url(question["content"].get("image"))
+        for question in result.get("questions", [])
+    ]
+    return get_image_store().contains_all(digest for digest in digests if digest)
+
+
+def inline_question_image(question: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a question JSON with its image URL replaced by a data URI"""
+    digest = digest_from_url(question["content"].get("image"))
+    if digest is None:
+        return question
+    data = get_image_store().get(digest)
+    if data is None:
+        return question
+    return {**question, "content": {**question["content"], "image": image_data_uri(data)}}
+
+
+def inline_images(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a questions_to_json() result with inline base64 images"""
+    return {**result, "questions": [inline_question_image(q) for q in result["questions"]]}
@@ -0,0 +1,499 @@
+"""
+Asynchronous parse jobs
+
+POST /api/parse-jobs stores the PDF under PARSE_JOBS_DIR, records a job in a
+SQLite store and returns immediately. Worker threads claim queued jobs, run
+the incremental parser and persist every finished question, so a job that
+was interrupted (server restart, crash) resumes from its last completed
+question instead of starting over.
+
+A claim is a lease: the worker's heartbeat thread keeps updated_at fresh
+while the parse runs, and every write of a running job is conditional on the
+claim (its attempt number), so a worker whose job was reclaimed as stale
+stops instead of overwriting the new owner's results.
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .cache import get_parse_cache, make_cache_key, open_sqlite
+from .images import result_images_available
+from .logs import get_logger, log_context
+from .parse_pdf import PARSER_VERSION, iter_parse_events, parser_settings, question_to_json
+from .uploads import SpooledUpload
+
+JOBS_DIR = Path(os.getenv("PARSE_JOBS_DIR", ".jobs"))
+PARSE_JOB_WORKERS = int(os.getenv("PARSE_JOB_WORKERS", "1"))
+# A running job whose heartbeat is older than this is considered orphaned and re-queued
+PARSE_JOB_STALE_SECONDS = float(os.getenv("PARSE_JOB_STALE_SECONDS", "120"))
+PARSE_JOB_HEARTBEAT_SECONDS = float(os.getenv("PARSE_JOB_HEARTBEAT_SECONDS", str(PARSE_JOB_STALE_SECONDS / 4)))
+
+logger = get_logger("jobs")
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a worker when the job was cancelled by the client"""
+
+
+class JobLost(Exception):
+    """Raised inside a worker whose claim was taken over by another worker"""
+
+
+def _process_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return False  # Our own previous incarnation (pid reuse) - nothing is running it now
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+class JobStore:
+    """SQLite-backed job table plus the questions each job has produced so far"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = open_sqlite(directory / "jobs.sqlite3")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                filename TEXT,
+                content_digest TEXT NOT NULL,
+                status TEXT NOT NULL,
+                worker TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                updated_at REAL NOT NULL,
+                finished_at REAL,
+                pages_total INTEGER,
+                pages_done INTEGER NOT NULL DEFAULT 0,
+                questions_found INTEGER NOT NULL DEFAULT 0,
+                questions_done INTEGER NOT NULL DEFAULT 0,
+                run_questions_start INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+            CREATE TABLE IF NOT EXISTS job_questions (
+                job_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                subject TEXT,
+                data TEXT NOT NULL,
+                PRIMARY KEY (job_id, seq)
+            );
+            """
+        )
+
+    def pdf_path(self, job_id: str) -> Path:
+        return self.directory / f"{job_id}.pdf"
+
+    def create(self, upload: SpooledUpload) -> str:
+        """Persist the upload (its temp file is moved, not copied) and enqueue a job for it"""
+        job_id = uuid.uuid4().hex
+        upload.save_as(self.pdf_path(job_id))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, filename, content_digest, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, upload.filename, upload.digest, QUEUED, now, now),
+            )
+        return job_id
+
+    def claim_next(self, worker: str) -> Optional[sqlite3.Row]:
+        """Atomically take the oldest queued (or orphaned running) job"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id FROM jobs "
+                    "WHERE cancel_requested = 0 AND (status = ? OR (status = ? AND updated_at < ?)) "
+                    "ORDER BY created_at LIMIT 1",
+                    (QUEUED, RUNNING, now - PARSE_JOB_STALE_SECONDS),
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+
+                job_id = row[0]
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, worker = ?, started_at = ?, updated_at = ?, "
+                    "attempts = attempts + 1, run_questions_start = questions_done WHERE id = ?",
+                    (RUNNING, worker, now, now, job_id),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            cursor = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            return dict(zip([c[0] for c in cursor.description], row))
+
+    def update_progress(self, job_id: str, attempt: int, **fields: Any) -> None:
+        """Update progress counters of a job claimed as `attempt` (JobLost once it was reclaimed)"""
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ? AND status = ? AND attempts = ?",
+                (*fields.values(), job_id, RUNNING, attempt),
+            )
+        if cursor.rowcount == 0:
+            raise JobLost()
+
+    def heartbeat(self, job_id: str, attempt: int) -> None:
+        """Mark a claimed job as alive (JobLost once it was reclaimed or finished)"""
+        self.update_progress(job_id, attempt)
+
+    def add_question(self, job_id: str, attempt: int, seq: int, question: Dict[str, Any]) -> None:
+        """
+        Persist one finished question and advance the resume point (JobLost once reclaimed)
+
+        `seq` is the question ID; questions_done counts the stored questions.
+        """
+        now = time.time()
+        data = json.dumps(question, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                added = self._conn.execute(
+                    "INSERT OR IGNORE INTO job_questions (job_id, seq, subject, data) VALUES (?, ?, ?, ?)",
+                    (job_id, seq, question.get("subject"), data),
+                ).rowcount
+                if not added:
+                    self._conn.execute(
+                        "UPDATE job_questions SET subject = ?, data = ? WHERE job_id = ? AND seq = ?",
+                        (question.get("subject"), data, job_id, seq),
+                    )
+                cursor = self._conn.execute(
+                    "UPDATE jobs SET questions_done = questions_done + ?, updated_at = ? "
+                    "WHERE id = ? AND status = ? AND attempts = ?",
+                    (added, now, job_id, RUNNING, attempt),
+                )
+                if cursor.rowcount == 0:
+                    self._conn.execute("ROLLBACK")
+                    raise JobLost()
+                self._conn.execute("COMMIT")
+            except JobLost:
+                raise
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def last_question(self, job_id: str) -> Optional[sqlite3.Row]:
+        """(seq, subject) of the last persisted question"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT seq, subject FROM job_questions WHERE job_id = ? ORDER BY seq DESC LIMIT 1",
+                (job_id,),
+            ).fetchone()
+
+    def questions(self, job_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM job_questions WHERE job_id = ? ORDER BY seq", (job_id,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def finish(self, job_id: str, status: str, error: Optional[str] = None, attempt: Optional[int] = None) -> bool:
+        """
+        Record a final status and delete the job's PDF
+
+        With `attempt`, only the worker holding that claim may finish the job;
+        returns False (and changes nothing) once it was reclaimed or finished.
+        """
+        now = time.time()
+        query = "UPDATE jobs SET status = ?, error = ?, finished_at = ?, updated_at = ? WHERE id = ?"
+        params = [status, error, now, now, job_id]
+        if attempt is not None:
+            query += " AND status = ? AND attempts = ?"
+            params += [RUNNING, attempt]
+        with self._lock:
+            cursor = self._conn.execute(query, params)
+        if cursor.rowcount == 0:
+            return False
+        self.pdf_path(job_id).unlink(missing_ok=True)
+        return True
+
+    def request_cancel(self, job_id: str) -> Optional[str]:
+        """Flag a job for cancellation; queued jobs are cancelled immediately"""
+        with self._lock:
+            row = self._conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            status = row[0]
+            if status in FINISHED_STATES:
+                return status
+            self._conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+
+        if status == QUEUED:
+            self.finish(job_id, CANCELLED)
+            return CANCELLED
+        return status
+
+    def requeue_orphans(self, hostname: str) -> int:
+        """
+        Re-queue running jobs whose worker process on this host no longer exists
+
+        Orphans with a pending cancel request are finished as cancelled instead
+        (claim_next never takes them), as are stale ones from any host.
+        """
+        stale_before = time.time() - PARSE_JOB_STALE_SECONDS
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, worker, cancel_requested, updated_at FROM jobs WHERE status = ?", (RUNNING,)
+            ).fetchall()
+
+        orphans = []
+        cancelled = []
+        for job_id, worker, cancel_requested, updated_at in rows:
+            host, _, pid = (worker or "").rpartition(":")
+            dead = host == hostname and pid.isdigit() and not _process_alive(int(pid))
+            if cancel_requested and (dead or updated_at < stale_before):
+                cancelled.append(job_id)
+            elif dead:
+                orphans.append((QUEUED, job_id))
+
+        with self._lock:
+            self._conn.executemany("UPDATE jobs SET status = ? WHERE id = ?", orphans)
+        for job_id in cancelled:
+            self.finish(job_id, CANCELLED)
+        if cancelled:
+            logger.info("🛑 Cancelled %d interrupted parse job(s) with a pending cancel request", len(cancelled))
+        return len(orphans)
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def status_counts(self) -> Dict[str, int]:
+        """Number of jobs per status (all statuses, zero included)"""
+        counts = {status: 0 for status in (QUEUED, RUNNING, *FINISHED_STATES)}
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts.update((status, count) for status, count in rows)
+        return counts
+
+
+def job_status(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Public view of a job row, with progress and ETA"""
+    now = time.time()
+    pages_total = job["pages_total"] or 0
+    pages_done = job["pages_done"] or 0
+    questions_done = job["questions_done"]
+
+    # Extrapolate question count from the pages segmented so far
+    questions_expected = job["questions_found"]
+    if pages_done and pages_total and pages_done < pages_total:
+        questions_expected = round(job["questions_found"] * pages_total / pages_done)
+
+    eta_seconds = None
+    processed_this_run = questions_done - job["run_questions_start"]
+    if job["status"] == RUNNING and job["started_at"] and processed_this_run > 0:
+        rate = processed_this_run / (now - job["started_at"])
+        eta_seconds = round(max(0, questions_expected - questions_done) / rate, 1)
+
+    return {
+        "job_id": job["id"],
+        "filename": job["filename"],
+        "status": job["status"],
+        "pages_total": job["pages_total"],
+        "pages_done": pages_done,
+        "questions_found": job["questions_found"],
+        "questions_done": questions_done,
+        "eta_seconds": eta_seconds,
+        "attempts": job["attempts"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+    }
+
+
+class JobWorkerPool:
+    """Local worker threads that drain the job store"""
+
+    def __init__(self, store: JobStore, workers: int = PARSE_JOB_WORKERS, poll_interval: float = 1.0):
+        self.store = store
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        requeued = self.store.requeue_orphans(socket.gethostname())
+        if requeued:
+            logger.info("🔁 Re-queued %d interrupted parse job(s)", requeued)
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"parse-job-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+    def notify(self) -> None:
+        """Wake idle workers (a job was just submitted)"""
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            job = self.store.claim_next(self.worker_id)
+            if job is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            with log_context(job_id=job["id"]):
+                self._process(job)
+
+    def _heartbeat(self, job_id: str, attempt: int, done: threading.Event, lost: threading.Event) -> None:
+        """Keep a claim fresh while the parse runs (slow Vision / OCR stretches emit no events)"""
+        while not done.wait(PARSE_JOB_HEARTBEAT_SECONDS):
+            try:
+                self.store.heartbeat(job_id, attempt)
+            except JobLost:
+                lost.set()
+                return
+            except Exception as e:
+                logger.warning("⚠️  Job heartbeat failed: %s", e)
+
+    def _process(self, job: Dict[str, Any]) -> None:
+        job_id = job["id"]
+        attempt = job["attempts"]
+        logger.info("🧾 Job starting (attempt %d, %d question(s) already done)", attempt, job["questions_done"])
+
+        done, lost = threading.Event(), threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat,
+            args=(job_id, attempt, done, lost),
+            name=f"{threading.current_thread().name}-heartbeat",
+            daemon=True,
+        )
+        heartbeat.start()
+        try:
+            self._run_job(job, attempt, lost)
+        finally:
+            done.set()
+            heartbeat.join()
+
+    def _run_job(self, job: Dict[str, Any], attempt: int, lost: threading.Event) -> None:
+        job_id = job["id"]
+        store = self.store
+        try:
+            settings = parser_settings()
+            cache = get_parse_cache(PARSER_VERSION)
+            cache_key = make_cache_key(job["content_digest"], settings, PARSER_VERSION)
+            cached = cache.get(cache_key) if cache is not None else None
+            if cached is not None and not result_images_available(cached):
+                cached = None  # Images were pruned since: parse again
+
+            if cached is not None:
+                for seq, question in enumerate(cached["questions"], start=1):
+                    store.add_question(job_id, attempt, seq, question)
+                store.update_progress(job_id, attempt, questions_found=cached["total_questions"])
+                if not store.finish(job_id, COMPLETED, attempt=attempt):
+                    raise JobLost()
+                logger.info("⚡ Job served from parse cache")
+                return
+
+            last = store.last_question(job_id)
+            skip_questions, resume_subject = (last[0], last[1]) if last else (0, None)
+
+            # Opened by path: pages come from the OS page cache, not a bytes copy
+            for event in iter_parse_events(store.pdf_path(job_id), skip_questions=skip_questions, resume_subject=resume_subject):
+                if lost.is_set():
+                    raise JobLost()
+                if store.is_cancel_requested(job_id):
+                    raise JobCancelled()
+
+                if event["type"] == "progress":
+                    store.update_progress(
+                        job_id,
+                        attempt,
+                        pages_done=event["pages_done"],
+                        pages_total=event["pages_total"],
+                        questions_found=event["questions_found"],
+                    )
+                elif event["type"] == "question":
+                    question = event["question"]
+                    store.add_question(job_id, attempt, question.id, question_to_json(question))
+
+            questions = store.questions(job_id)
+            store.update_progress(job_id, attempt, questions_found=len(questions))
+            if not store.finish(job_id, COMPLETED, attempt=attempt):
+                raise JobLost()
+
+            if cache is not None:
+                cache.put(cache_key, {"success": True, "total_questions": len(questions), "questions": questions})
+            logger.info("✅ Job completed (%d questions)", len(questions))
+
+        except JobLost:
+            logger.warning("⚠️  Job was taken over by another worker, abandoning this run")
+        except JobCancelled:
+            if store.finish(job_id, CANCELLED, attempt=attempt):
+                logger.info("🛑 Job cancelled")
+        except Exception as e:
+            if store.finish(job_id, FAILED, error=str(e), attempt=attempt):
+                logger.error("❌ Job failed: %s", e)
+            else:
+                logger.warning("⚠️  Job was taken over by another worker, abandoning this run (%s)", e)
+
+
+_store: Optional[JobStore] = None
+_pool: Optional[JobWorkerPool] = None
+
+
+def get_job_store() -> JobStore:
+    global _store
+    if _store is None:
+        _store = JobStore(JOBS_DIR)
+    return _store
+
+
+def start_job_workers() -> JobWorkerPool:
+    """Start the local job workers (idempotent)"""
+    global _pool
+    if _pool is None:
+        _pool = JobWorkerPool(get_job_store())
+        _pool.start()
+    return _pool
+
+
+def stop_job_workers() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.stop()
+        _pool = None
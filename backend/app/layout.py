@@ -0,0 +1,63 @@
+"""
+Columnar page geometry for segmentation
+
+A page's line extents are held as NumPy arrays (x0, x1, center) next to
+their TextBlock objects, so column detection and column assignment are
+array operations instead of Python loops over every line and column.
+TextBlock (a slots dataclass in parse_pdf) stays the object API for the rest
+of the parser; PageLayout only indexes into the block list.
+"""
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# Horizontal distance between line centers that separates two columns (points)
+COLUMN_GAP = 50
+
+
+class PageLayout:
+    """Horizontal geometry of one page's text lines as float64 arrays"""
+    __slots__ = ("blocks", "x0", "x1", "center_x")
+
+    def __init__(self, blocks: Sequence[Any]):
+        self.blocks = blocks
+        self.x0 = np.array([b.x0 for b in blocks], dtype=np.float64)
+        self.x1 = np.array([b.x1 for b in blocks], dtype=np.float64)
+        self.center_x = (self.x0 + self.x1) / 2
+
+    def __len__(self) -> int:
+        return len(self.blocks)
+
+    def columns(self, page_width: float) -> List[Tuple[float, float]]:
+        """
+        (x_start, x_end) per column: split where sorted line centers are more
+        than COLUMN_GAP apart, at the midpoint of the gap
+        """
+        if not len(self):
+            return [(0, page_width)]
+
+        centers = np.sort(self.center_x)
+        split = np.flatnonzero(np.diff(centers) > COLUMN_GAP)
+        bounds = ((centers[split] + centers[split + 1]) / 2).tolist()
+        return list(zip([0] + bounds, bounds + [page_width]))
+
+    def column_indices(self, columns: List[Tuple[float, float]]) -> np.ndarray:
+        """Column of every line: first column with start <= center_x < end (-1 for none)"""
+        centers = self.center_x
+        indices = np.full(len(self), -1, dtype=np.int64)
+        for col_idx, (col_start, col_end) in enumerate(columns):
+            hit = (indices < 0) & (col_start <= centers) & (centers < col_end)
+            indices[hit] = col_idx
+        return indices
+
+    def group_by_column(self, columns: List[Tuple[float, float]]) -> Dict[int, List[Any]]:
+        """Lines of each non-empty column, in their original order"""
+        indices = self.column_indices(columns)
+        order = np.argsort(indices, kind="stable")
+        cuts = np.flatnonzero(np.diff(indices[order])) + 1
+
+        groups: Dict[int, List[Any]] = {}
+        for members in np.split(order, cuts):
+            if len(members) and indices[members[0]] >= 0:
+                groups[int(indices[members[0]])] = list(map(self.blocks.__getitem__, members.tolist()))
+        return groups
@@ -0,0 +1,166 @@
+"""
+Structured, level-gated logging for the parser and the API
+
+Every module logs through get_logger(name) → logger "pdf_parser.<name>".
+Records are handed to a QueueHandler and written by one background thread
+(QueueListener), so parse threads never block on stdout.
+
+- PARSE_LOG_LEVEL (default INFO): DEBUG adds the per-line / per-question
+  messages (columns, question boxes, answer key lines, answer matching)
+- PARSE_LOG_FORMAT: text (default) or json (one object per line)
+- request_id / job_id are attached to every record from context variables
+  (RequestContextMiddleware, the job workers)
+- log_context(trace=True) logs one document at DEBUG without lowering the
+  level for anything else (?trace=true on the parse endpoints)
+
+Hot-loop messages are logger.debug() calls with %-style arguments: when
+DEBUG is off for the current document they cost a level check and a
+context variable lookup; nothing is formatted.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+LOG_LEVEL = os.getenv("PARSE_LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("PARSE_LOG_FORMAT", "text").lower()
+ROOT_LOGGER = "pdf_parser"
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+job_id_var: ContextVar[Optional[str]] = ContextVar("job_id", default=None)
+_trace_var: ContextVar[bool] = ContextVar("trace", default=False)
+
+
+class ContextLogger(logging.Logger):
+    """Logger that also lets DEBUG records through while the current document is traced"""
+
+    def isEnabledFor(self, level: int) -> bool:
+        return super().isEnabledFor(level) or (_trace_var.get() and not self.disabled)
+
+
+class ContextFilter(logging.Filter):
+    """Copy request/job IDs onto the record (runs in the thread that logs, where they are set)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        record.job_id = job_id_var.get()
+        return True
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(context)s%(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        context = ""
+        if getattr(record, "request_id", None):
+            context += f"[req {record.request_id}] "
+        if getattr(record, "job_id", None):
+            context += f"[job {record.job_id}] "
+        record.context = context
+        return super().format(record)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in ("request_id", "job_id"):
+            value = getattr(record, field, None)
+            if value:
+                entry[field] = value
+        return json.dumps(entry, ensure_ascii=False)
+
+
+_logger_class_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _configure() -> None:
+    """Queue → background writer on the package logger (once per process)"""
+    global _listener
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+    root.propagate = False  # Not duplicated by uvicorn's root handlers
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+    records: "queue.SimpleQueue" = queue.SimpleQueue()
+    handler = logging.handlers.QueueHandler(records)
+    handler.addFilter(ContextFilter())
+    root.addHandler(handler)
+
+    _listener = logging.handlers.QueueListener(records, output)
+    _listener.start()
+    atexit.register(_listener.stop)  # Flush what is still queued
+
+
+_configure()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger "pdf_parser.<name>" (a ContextLogger)"""
+    with _logger_class_lock:
+        manager = logging.Logger.manager
+        previous = manager.loggerClass
+        manager.loggerClass = ContextLogger  # Only for this logger, not for other libraries'
+        try:
+            return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+        finally:
+            manager.loggerClass = previous
+
+
+@contextmanager
+def log_context(request_id: Optional[str] = None, job_id: Optional[str] = None, trace: bool = False):
+    """Attach IDs to the records logged inside the block; trace=True logs it at DEBUG"""
+    tokens = []
+    if request_id is not None:
+        tokens.append((request_id_var, request_id_var.set(request_id)))
+    if job_id is not None:
+        tokens.append((job_id_var, job_id_var.set(job_id)))
+    if trace:
+        tokens.append((_trace_var, _trace_var.set(True)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+class RequestContextMiddleware:
+    """
+    ASGI middleware: one request ID per HTTP request (X-Request-ID is honoured
+    and echoed), visible to every record logged while serving it
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1")[:64] or uuid.uuid4().hex[:12]
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        with log_context(request_id=request_id):
+            await self.app(scope, receive, send_with_id)
@@ -2,15 +2,62 @@
 FastAPI backend for PDF question parsing with OCR support
 DEFINITIVE SOLUTION: PyMuPDF + Tesseract OCR
 """
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response, Query, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+import dataclasses
+import json
 import sys
+from typing import Optional
 
 # Ensure UTF-8 encoding for console output
 if sys.stdout.encoding != 'utf-8':
     sys.stdout.reconfigure(encoding='utf-8')
 
-from .parse_pdf import parse_pdf_with_ocr, questions_to_json
+from .parse_pdf import (
+    PARSER_VERSION,
+    PdfSource,
+    iter_parse_events,
+    parse_pdf_with_ocr,
+    parser_settings,
+    question_to_json,
+    questions_to_json,
+    shutdown_segmentation_pools,
+)
+from .cache import get_parse_cache, get_vision_cache, make_cache_key
+from .vision import shutdown_vision_runner
+from .ocr import OCR_AVAILABLE, ocr_pool_snapshot, shutdown_ocr_pool
+from .executor import QueueFull, parse_executor
+from .images import (
+    IMAGE_DELIVERY,
+    IMAGE_DELIVERY_MODES,
+    IMMUTABLE_CACHE_CONTROL,
+    get_image_store,
+    image_media_type,
+    inline_images,
+    inline_question_image,
+    is_valid_digest,
+    result_images_available,
+)
+from .render import DEFAULT_RENDER_OPTIONS, RenderOptions
+from .selection import FULL_DOCUMENT, Selection
+from .timing import StageTimer
+from .metrics import MetricsMiddleware, ServiceCollector
+from .logs import RequestContextMiddleware, get_logger, log_context
+from .uploads import SpooledUpload, receive_pdf_batch, receive_pdf_upload, upload_openapi
+from .batch import BATCH_MAX_DOCUMENTS, collect_batch_result, iter_batch_records, shutdown_batch_pool
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+from .jobs import (
+    COMPLETED,
+    get_job_store,
+    job_status,
+    start_job_workers,
+    stop_job_workers,
+)
+
+logger = get_logger("api")
 
 app = FastAPI(title="BasariYolu PDF Parser API with OCR")
 
@@ -22,6 +69,46 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestContextMiddleware)
+
+
+def parse_cache_snapshot():
+    cache = get_parse_cache(PARSER_VERSION)
+    return cache.snapshot() if cache is not None else None
+
+
+def vision_cache_snapshot():
+    cache = get_vision_cache()
+    return cache.snapshot() if cache is not None else None
+
+
+# OCR, cache, queue and job counters are read from the services when /metrics is scraped
+REGISTRY.register(ServiceCollector(
+    ocr_pool=ocr_pool_snapshot,
+    parse_queue=parse_executor.snapshot,
+    parse_cache=parse_cache_snapshot,
+    vision_cache=vision_cache_snapshot,
+    image_store=lambda: get_image_store().snapshot(),
+    jobs=lambda: get_job_store().status_counts(),
+))
+
+
+@app.on_event("startup")
+async def startup():
+    """Start local parse-job workers (resumes interrupted jobs)"""
+    start_job_workers()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Release worker processes, OCR workers and the pooled OpenAI client"""
+    stop_job_workers()
+    parse_executor.shutdown()
+    shutdown_vision_runner()
+    shutdown_ocr_pool()
+    shutdown_segmentation_pools()
+    shutdown_batch_pool()
 
 
 @app.get("/")
@@ -33,64 +120,554 @@ async def root():
     }
 
 
-@app.post("/api/parse-pdf")
-async def parse_pdf(file: UploadFile = File(...)):
+def check_image_delivery(images: str) -> None:
+    if images not in IMAGE_DELIVERY_MODES:
+        raise HTTPException(status_code=400, detail="images must be 'url' or 'inline'")
+
+
+def lookup_cached_result(cache, cache_key: str):
+    """Cached result, unless some of its images were pruned from the image store"""
+    cached = cache.get(cache_key)
+    if cached is not None and not result_images_available(cached):
+        return None
+    return cached
+
+
+def render_options(
+    scale: Optional[float] = Query(None, description="Crop render scale (default 2.0)"),
+    image_format: Optional[str] = Query(None, description="png, jpeg or webp"),
+    quality: Optional[int] = Query(None, description="JPEG/WebP quality 1-100"),
+    png_compression: Optional[int] = Query(None, description="PNG zlib level 0-9"),
+    grayscale: Optional[str] = Query(None, description="never, always or auto"),
+) -> RenderOptions:
+    """Per-request crop settings on top of the server defaults (PARSE_IMAGE_*)"""
+    overrides = {
+        "scale": scale,
+        "image_format": image_format.lower() if image_format else None,
+        "quality": quality,
+        "png_compression": png_compression,
+        "grayscale": grayscale.lower() if grayscale else None,
+    }
+    overrides = {name: value for name, value in overrides.items() if value is not None}
+    try:
+        return dataclasses.replace(DEFAULT_RENDER_OPTIONS, **overrides).validate()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def parse_selection(
+    pages: Optional[str] = Query(None, description="Pages to parse, e.g. 1-12,15"),
+    questions: Optional[str] = Query(None, description="Question IDs to return, e.g. 1-20"),
+    preview: Optional[int] = Query(None, description="Only the first N questions, without Vision / OCR"),
+) -> Selection:
+    """Part of the document to parse (default: all of it)"""
+    try:
+        return Selection.parse(pages, questions, preview)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/api/parse-pdf", openapi_extra=upload_openapi())
+async def parse_pdf(
+    request: Request,
+    response: Response,
+    refresh: bool = False,
+    images: str = Query(IMAGE_DELIVERY),
+    render: RenderOptions = Depends(render_options),
+    selection: Selection = Depends(parse_selection),
+    trace: bool = Query(False, description="Log this parse at DEBUG level"),
+):
     """
     Parse PDF and extract questions with OCR support
 
+    Results are cached by PDF content (SHA-256) + parser settings; repeat
+    uploads are served from cache. `refresh=true` forces a re-parse.
+    The X-Parse-Cache response header reports "hit" or "miss".
+
+    Question images are returned as URLs (GET /api/images/{digest});
+    images=inline embeds them as base64 data URIs instead. scale,
+    image_format, quality, png_compression and grayscale override the crop
+    settings. Fresh parses report per-stage timings in the Server-Timing header;
+    trace=true logs this parse at DEBUG level (per-question details).
+
+    pages=1-12 parses only those pages (the answer key is still found on the
+    last pages), questions=1-20 returns only those question IDs and stops
+    after the last one, preview=N returns the first N questions from the text
+    layer (no Vision / OCR). Partial results are cached under their own key.
+
     Returns:
         {
           "success": true,
           "total_questions": 21,
           "questions": [
             {
-              "question_number": 1,
-              "page_number": 2,
-              "text": "Soru metni...",
-              "choices": ["A) ...", "B) ..."],
-              "answer": "A",
-              "image_base64": "data:image/png;base64,...",
-              "crop_info": {...}
+              "id": 1,
+              "content": {
+                "text": "Soru metni...",
+                "options": [{"label": "A", "value": "..."}, ...],
+                "image": "/api/images/3f5a...",
+              },
+              "answer_key": {"correct": "A", ...},
+              ...
             }
           ]
         }
+
+    The multipart field is "file". The upload is streamed to a spool (memory,
+    then a temp file) and hashed on the way in; over PARSE_MAX_UPLOAD_MB it
+    is rejected with 413 without reading the rest.
+
+    Parsing runs on a bounded executor; when it is saturated the request is
+    rejected with 503 and a Retry-After header instead of waiting in line.
     """
-    if not file.filename.endswith('.pdf'):
-        raise HTTPException(status_code=400, detail="File must be a PDF")
+    check_image_delivery(images)
+    upload = await receive_pdf_upload(request)
 
     try:
-        # Read PDF file
-        pdf_bytes = await file.read()
+        logger.info("📄 Processing PDF: %s (%s)", upload.filename, describe_upload(upload))
+
+        cache = get_parse_cache(PARSER_VERSION)
+        cache_key = make_cache_key(upload.digest, parser_settings(render, selection), PARSER_VERSION)
+
+        if cache is not None and not refresh:
+            cached = await run_in_threadpool(lookup_cached_result, cache, cache_key)
+            if cached is not None:
+                logger.info("⚡ Cache hit: %d questions", cached["total_questions"])
+                response.headers["X-Parse-Cache"] = "hit"
+                if images == "inline":
+                    cached = await run_in_threadpool(inline_images, cached)
+                return cached
 
-        print(f"\n📄 Processing PDF: {file.filename}")
-        print(f"   Size: {len(pdf_bytes)} bytes")
+        timer = StageTimer()
 
-        # Parse with OCR support
-        questions = parse_pdf_with_ocr(pdf_bytes)
+        def parse_and_cache() -> dict:
+            # Parse with OCR support
+            with log_context(trace=trace):
+                questions = parse_pdf_with_ocr(upload.source(), render=render, timer=timer, selection=selection)
 
-        print(f"\n✅ Successfully parsed {len(questions)} questions")
+            logger.info("⏱️  Stage timings: %s", timer.server_timing())
 
-        # Convert to JSON format
-        result = questions_to_json(questions)
+            # Convert to JSON format
+            result = questions_to_json(questions)
+
+            if cache is not None:
+                cache.put(cache_key, result)
+            return result
+
+        result = await parse_executor.run(parse_and_cache)
+        response.headers["X-Parse-Cache"] = "miss"
+        response.headers["Server-Timing"] = timer.server_timing()
+        if images == "inline":
+            result = await run_in_threadpool(inline_images, result)
 
         return result
 
+    except QueueFull as e:
+        logger.warning("⏳ Parse queue full, rejecting %s", upload.filename)
+        raise queue_full_error(e)
     except Exception as e:
-        print(f"\n❌ PDF parsing error: {e}")
+        logger.exception("❌ PDF parsing error: %s", e)
         raise HTTPException(status_code=500, detail=f"PDF parsing error: {str(e)}")
+    finally:
+        upload.close()
+
+
+def describe_upload(upload: SpooledUpload) -> str:
+    return f"{upload.size} bytes" + ("" if upload.in_memory else ", spooled to disk")
+
+
+def queue_full_error(error: QueueFull) -> HTTPException:
+    """503 with Retry-After: the server is over capacity, the request itself is fine"""
+    return HTTPException(
+        status_code=503,
+        detail=str(error),
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
+
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
+
+
+def format_stream_record(record: dict, stream_format: str) -> str:
+    """Serialize one stream record as an NDJSON line or an SSE event"""
+    data = json.dumps(record, ensure_ascii=False)
+    if stream_format == "sse":
+        return f"event: {record['type']}\ndata: {data}\n\n"
+    return data + "\n"
+
+
+def iter_stream_records(
+    pdf: Optional[PdfSource],
+    cached: dict = None,
+    images: str = IMAGE_DELIVERY,
+    render: RenderOptions = DEFAULT_RENDER_OPTIONS,
+    trace: bool = False,
+    selection: Selection = FULL_DOCUMENT,
+    cache=None,
+    cache_key: Optional[str] = None,
+):
+    """Parse events as JSON-ready records (replays a cached result when given, fills `cache` otherwise)"""
+    if cached is not None:
+        for question in cached["questions"]:
+            if images == "inline":
+                question = inline_question_image(question)
+            yield {"type": "question", "question": question}
+        yield {"type": "summary", "total_questions": cached["total_questions"], "cached": True}
+        return
+
+    try:
+        with log_context(trace=trace):
+            yield from _iter_parsed_records(pdf, images, render, selection, cache, cache_key)
+    except Exception as e:
+        logger.exception("❌ PDF parsing error: %s", e)
+        yield {"type": "error", "detail": f"PDF parsing error: {str(e)}"}
+
+
+def _iter_parsed_records(
+    pdf: PdfSource, images: str, render: RenderOptions, selection: Selection, cache, cache_key: Optional[str]
+):
+    # Same result as /api/parse-pdf, so either endpoint serves the other's repeats
+    writer = cache.writer(cache_key) if cache is not None else None
+    try:
+        for event in iter_parse_events(pdf, render=render, selection=selection):
+            if event["type"] == "question":
+                question = question_to_json(event["question"])
+                if writer is not None:
+                    writer.add(question)
+                if images == "inline":
+                    question = inline_question_image(question)
+                yield {"type": "question", "question": question}
+            else:
+                if event["type"] == "summary" and writer is not None:
+                    writer.commit()
+                yield event
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def iter_upload_records(
+    upload: SpooledUpload,
+    images: str,
+    render: RenderOptions,
+    trace: bool,
+    selection: Selection,
+    cache=None,
+    cache_key: Optional[str] = None,
+):
+    """iter_stream_records() for an upload, whose temp file is deleted as soon as the parse ends"""
+    try:
+        yield from iter_stream_records(
+            upload.source(), images=images, render=render, trace=trace, selection=selection,
+            cache=cache, cache_key=cache_key,
+        )
+    finally:
+        upload.close()
+
+
+@app.post("/api/parse-pdf/stream", openapi_extra=upload_openapi())
+async def parse_pdf_stream(
+    request: Request,
+    stream_format: str = Query("ndjson", alias="format"),
+    images: str = Query(IMAGE_DELIVERY),
+    render: RenderOptions = Depends(render_options),
+    selection: Selection = Depends(parse_selection),
+    trace: bool = Query(False, description="Log this parse at DEBUG level"),
+):
+    """
+    Streaming variant of /api/parse-pdf
+
+    Emits one record per event as soon as it is ready:
+      start → answer_key → progress / question ... → summary
+    format=ndjson (default, one JSON object per line) or format=sse
+    (Server-Sent Events, event name = record type). Question records carry
+    the same JSON as the items of /api/parse-pdf's "questions" array.
+    Repeat uploads are replayed from the parse result cache, which a
+    completed stream fills as /api/parse-pdf does. A fresh parse needs a
+    slot on the parse executor (503 + Retry-After when saturated).
+    The upload is streamed and size-limited as for /api/parse-pdf; pages,
+    questions and preview select part of the document as there.
+    """
+    if stream_format not in STREAM_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+    check_image_delivery(images)
+
+    upload = await receive_pdf_upload(request)
+    logger.info("📄 Streaming PDF: %s (%s)", upload.filename, describe_upload(upload))
+
+    cached = None
+    cache = get_parse_cache(PARSER_VERSION)
+    cache_key = make_cache_key(upload.digest, parser_settings(render, selection), PARSER_VERSION)
+    if cache is not None:
+        cached = await run_in_threadpool(lookup_cached_result, cache, cache_key)
+
+    if cached is not None:
+        upload.close()
+        records = (
+            format_stream_record(record, stream_format)
+            for record in iter_stream_records(None, cached, images)
+        )
+    else:
+        try:
+            # Parsing runs on the executor; a slow client pauses it (bounded buffer)
+            events = parse_executor.stream(
+                lambda: iter_upload_records(upload, images, render, trace, selection, cache, cache_key)
+            )
+        except QueueFull as e:
+            upload.close()
+            logger.warning("⏳ Parse queue full, rejecting %s", upload.filename)
+            raise queue_full_error(e)
+        records = (format_stream_record(record, stream_format) async for record in events)
+
+    return StreamingResponse(
+        records,
+        media_type=STREAM_MEDIA_TYPES[stream_format],
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Disable proxy buffering (nginx)
+            "X-Parse-Cache": "hit" if cached is not None else "miss",
+        },
+        background=BackgroundTask(upload.close),  # In case the parse never started (client gone)
+    )
+
+
+def iter_batch_upload_records(uploads, images: str, render: RenderOptions, trace: bool, selection: Selection):
+    """iter_batch_records() that deletes the uploads' temp files as soon as the batch ends"""
+    try:
+        yield from iter_batch_records(uploads, render, images, trace, selection)
+    finally:
+        close_uploads(uploads)
+
+
+def close_uploads(uploads) -> None:
+    for upload in uploads:
+        upload.close()
+
+
+@app.post("/api/parse-batch", openapi_extra=upload_openapi(multiple=True))
+async def parse_batch(
+    request: Request,
+    images: str = Query(IMAGE_DELIVERY),
+    render: RenderOptions = Depends(render_options),
+    selection: Selection = Depends(parse_selection),
+    trace: bool = Query(False, description="Log these parses at DEBUG level"),
+):
+    """
+    Parse several PDFs in one request
+
+    The multipart field "file" may be repeated and may hold PDFs or ZIP
+    archives of PDFs (at most PARSE_BATCH_MAX_DOCUMENTS documents). All
+    documents are parsed in parallel on the shared batch worker pool; cached
+    and duplicate documents are not parsed again. pages, questions and
+    preview apply to every document (e.g. preview=5 to check a whole set).
+
+    Returns:
+        {
+          "success": true,              # false when any document failed
+          "total_documents": 3, "completed": 2, "failed": 1, "cached": 1,
+          "total_questions": 120, "seconds": 14.2,
+          "documents": [
+            {"document": 0, "filename": "deneme1.pdf", "status": "completed",
+             "cached": false, "total_questions": 40, "questions": [...]},
+            {"document": 1, "filename": "deneme2.pdf", "status": "failed", "error": "..."},
+            ...
+          ]
+        }
+
+    The whole batch takes one slot on the parse executor (503 + Retry-After
+    when saturated). Use /api/parse-batch/stream for per-document progress.
+    """
+    check_image_delivery(images)
+    uploads = await receive_pdf_batch(request, BATCH_MAX_DOCUMENTS)
+    logger.info("📦 Batch of %d PDF(s)", len(uploads))
+
+    try:
+        return await parse_executor.run(
+            lambda: collect_batch_result(iter_batch_records(uploads, render, images, trace, selection))
+        )
+    except QueueFull as e:
+        logger.warning("⏳ Parse queue full, rejecting a batch of %d PDF(s)", len(uploads))
+        raise queue_full_error(e)
+    finally:
+        close_uploads(uploads)
+
+
+@app.post("/api/parse-batch/stream", openapi_extra=upload_openapi(multiple=True))
+async def parse_batch_stream(
+    request: Request,
+    stream_format: str = Query("ndjson", alias="format"),
+    images: str = Query(IMAGE_DELIVERY),
+    render: RenderOptions = Depends(render_options),
+    selection: Selection = Depends(parse_selection),
+    trace: bool = Query(False, description="Log these parses at DEBUG level"),
+):
+    """
+    Streaming variant of /api/parse-batch
+
+    Emits records as the documents progress, in completion order:
+      batch → progress / document / document_error ... → summary
+    "batch" lists the documents with their index; every other record carries
+    that index as "document". A "document" record holds the document's full
+    /api/parse-pdf response as "result". format=ndjson or format=sse.
+    """
+    if stream_format not in STREAM_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+    check_image_delivery(images)
+
+    uploads = await receive_pdf_batch(request, BATCH_MAX_DOCUMENTS)
+    logger.info("📦 Streaming batch of %d PDF(s)", len(uploads))
+
+    try:
+        events = parse_executor.stream(lambda: iter_batch_upload_records(uploads, images, render, trace, selection))
+    except QueueFull as e:
+        close_uploads(uploads)
+        logger.warning("⏳ Parse queue full, rejecting a batch of %d PDF(s)", len(uploads))
+        raise queue_full_error(e)
+
+    return StreamingResponse(
+        (format_stream_record(record, stream_format) async for record in events),
+        media_type=STREAM_MEDIA_TYPES[stream_format],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(close_uploads, uploads),  # In case the batch never started (client gone)
+    )
+
+
+@app.post("/api/parse-jobs", status_code=202, openapi_extra=upload_openapi())
+async def create_parse_job(request: Request):
+    """
+    Submit a PDF for background parsing; returns a job ID immediately
+
+    Poll GET /api/parse-jobs/{job_id} for progress (pages/questions done, ETA),
+    fetch GET /api/parse-jobs/{job_id}/result when status is "completed",
+    cancel with DELETE /api/parse-jobs/{job_id}. The upload is streamed and
+    size-limited as for /api/parse-pdf, then moved into the job directory.
+    """
+    upload = await receive_pdf_upload(request)
+    try:
+        job_id = await run_in_threadpool(get_job_store().create, upload)
+    finally:
+        upload.close()
+    start_job_workers().notify()
+    logger.info("🧾 Job %s queued: %s (%s)", job_id, upload.filename, describe_upload(upload))
+
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/api/parse-jobs/{job_id}",
+        "result_url": f"/api/parse-jobs/{job_id}/result",
+    }
+
+
+@app.get("/api/parse-jobs/{job_id}")
+async def get_parse_job(job_id: str):
+    """Job status: queued/running/completed/failed/cancelled with progress and ETA"""
+    job = await run_in_threadpool(get_job_store().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_status(job)
+
+
+@app.get("/api/parse-jobs/{job_id}/result")
+async def get_parse_job_result(job_id: str, partial: bool = False, images: str = Query(IMAGE_DELIVERY)):
+    """
+    Parsed questions in the /api/parse-pdf response format
+
+    Returns 409 until the job is completed unless partial=true, which returns
+    the questions finished so far. images=inline embeds base64 data URIs.
+    """
+    check_image_delivery(images)
+    store = get_job_store()
+    job = await run_in_threadpool(store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] != COMPLETED and not partial:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+
+    questions = await run_in_threadpool(store.questions, job_id)
+    if images == "inline":
+        questions = await run_in_threadpool(lambda: [inline_question_image(q) for q in questions])
+    return {
+        "success": job["status"] == COMPLETED,
+        "status": job["status"],
+        "total_questions": len(questions),
+        "questions": questions,
+    }
+
+
+@app.get("/api/images/{digest}")
+async def get_image(digest: str, request: Request):
+    """
+    Question crop image by content digest
+
+    The digest names the bytes, so responses never change: clients and proxies
+    may cache them forever. If-None-Match with the ETag returns 304.
+    """
+    if not is_valid_digest(digest):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    etag = f'"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match", "")
+    if any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+
+    data = await run_in_threadpool(get_image_store().get, digest)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return Response(content=data, media_type=image_media_type(data), headers=headers)
+
+
+@app.delete("/api/parse-jobs/{job_id}")
+async def cancel_parse_job(job_id: str):
+    """Cancel a queued or running job (running jobs stop after the current question)"""
+    status = await run_in_threadpool(get_job_store().request_cancel, job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"job_id": job_id, "status": status, "cancel_requested": True}
+
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Parse result, Vision crop and image store counters (hits, misses, estimated savings)"""
+    cache = get_parse_cache(PARSER_VERSION)
+    vision_cache = get_vision_cache()
+    return {
+        "parse_results": cache.snapshot() if cache is not None else {"enabled": False},
+        "vision": vision_cache.snapshot() if vision_cache is not None else {"enabled": False},
+        "images": get_image_store().snapshot(),
+    }
 
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    try:
-        import pytesseract
-        ocr_status = "available"
-    except ImportError:
-        ocr_status = "unavailable"
-
     return {
         "status": "healthy",
         "service": "pdf-parser-ocr",
-        "ocr": ocr_status
+        "ocr": "available" if OCR_AVAILABLE else "unavailable",
+        "ocr_pool": ocr_pool_snapshot(),
+        "parse_queue": parse_executor.snapshot()
     }
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition: stage histograms, OCR/Vision calls, caches, queue depth"""
+    data = await run_in_threadpool(generate_latest, REGISTRY)  # Cache and job counters query SQLite
+    return Response(content=data, headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness probe: 503 while the parse executor cannot accept new work"""
+    snapshot = parse_executor.snapshot()
+    if not snapshot["accepting"]:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "saturated", "parse_queue": snapshot},
+            headers={"Retry-After": str(parse_executor.retry_after())},
+        )
+    return {"status": "ready", "parse_queue": snapshot}
@@ -0,0 +1,208 @@
+"""
+Prometheus metrics (GET /metrics)
+
+Recorded as things happen:
+- per parse, once at the end: stage latencies (from the parse's StageTimer),
+  total duration, pages and questions per document, outcome
+- per OpenAI Vision request: latency and outcome
+- per prepared Vision image (OPENAI_VISION_IMAGE_PREP): estimated image tokens
+- per HTTP request: latency by route and status, requests in flight
+
+Counters the services already keep (OCR pool, parse / Vision caches, image
+store, parse executor, job queue) are read at scrape time by ServiceCollector,
+so the parser does no extra work per question for them.
+
+Metrics are per process; segmentation worker processes report nothing
+themselves (their time is part of the parent's "segment" stage), and batch
+documents parsed in worker processes are recorded by the parent from their
+summary.
+"""
+import time
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+# Stage latencies range from milliseconds (answer key) to minutes (Vision on a big booklet)
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+PAGES_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+QUESTIONS_BUCKETS = (0, 1, 5, 10, 20, 40, 80, 120, 160, 240, 480)
+# Low detail to many tiles, for both gpt-4o (85 + 170 / tile) and gpt-4o-mini (2833 + 5667 / tile)
+TOKENS_BUCKETS = (85, 255, 425, 765, 1105, 2833, 8500, 14167, 25501, 48169)
+
+PARSES = Counter("pdf_parser_parses_total", "Finished parses by outcome", ["outcome"])
+PARSE_SECONDS = Histogram("pdf_parser_parse_seconds", "Wall-clock time of one parse", buckets=SECONDS_BUCKETS)
+STAGE_SECONDS = Histogram(
+    "pdf_parser_stage_seconds",
+    "Time one parse spent in each pipeline stage (exclusive, see StageTimer)",
+    ["stage"],
+    buckets=SECONDS_BUCKETS,
+)
+DOCUMENT_PAGES = Histogram("pdf_parser_document_pages", "Pages per parsed document", buckets=PAGES_BUCKETS)
+DOCUMENT_QUESTIONS = Histogram(
+    "pdf_parser_document_questions", "Questions emitted per parsed document", buckets=QUESTIONS_BUCKETS
+)
+
+VISION_REQUESTS = Counter("pdf_parser_vision_requests_total", "OpenAI Vision API requests by outcome", ["outcome"])
+VISION_SECONDS = Histogram("pdf_parser_vision_request_seconds", "OpenAI Vision API latency", buckets=SECONDS_BUCKETS)
+VISION_ROUTED = Counter(
+    "pdf_parser_vision_routing_total",
+    "Questions by Vision routing decision (PARSE_VISION_ROUTING=confidence)",
+    ["route"],
+)
+VISION_IMAGE_TOKENS = Histogram(
+    "pdf_parser_vision_image_tokens",
+    "Estimated image tokens per question sent to Vision (OPENAI_VISION_IMAGE_PREP=true)",
+    ["detail"],
+    buckets=TOKENS_BUCKETS,
+)
+
+HTTP_IN_FLIGHT = Gauge("pdf_parser_http_requests_in_flight", "HTTP requests being served")
+HTTP_REQUESTS = Counter("pdf_parser_http_requests_total", "HTTP requests", ["method", "route", "status"])
+HTTP_SECONDS = Histogram(
+    "pdf_parser_http_request_seconds",
+    "HTTP request latency (streamed responses until their last byte)",
+    ["route"],
+    buckets=SECONDS_BUCKETS,
+)
+
+# Bound children: no label lookup on the hot paths
+_VISION_OK = VISION_REQUESTS.labels(outcome="ok")
+_VISION_ERROR = VISION_REQUESTS.labels(outcome="error")
+_ROUTED = {route: VISION_ROUTED.labels(route=route) for route in ("vision", "text_layer")}
+_PARSE_COMPLETED = PARSES.labels(outcome="completed")
+_PARSE_FAILED = PARSES.labels(outcome="failed")
+
+
+def observe_parse(timings: Dict[str, Any], pages: int, questions: int) -> None:
+    """Record a finished parse from its StageTimer.snapshot()"""
+    _PARSE_COMPLETED.inc()
+    PARSE_SECONDS.observe(timings["total_ms"] / 1000)
+    for stage, stats in timings["stages"].items():
+        STAGE_SECONDS.labels(stage=stage).observe(stats["ms"] / 1000)
+    DOCUMENT_PAGES.observe(pages)
+    DOCUMENT_QUESTIONS.observe(questions)
+
+
+def observe_parse_failure() -> None:
+    _PARSE_FAILED.inc()
+
+
+def observe_vision_route(route: str) -> None:
+    """One question sent to Vision ("vision") or answered from the text layer ("text_layer")"""
+    _ROUTED[route].inc()
+
+
+def observe_vision_image(detail: str, tokens: int) -> None:
+    VISION_IMAGE_TOKENS.labels(detail=detail).observe(tokens)
+
+
+def observe_vision_request(seconds: float, ok: bool) -> None:
+    VISION_SECONDS.observe(seconds)
+    (_VISION_OK if ok else _VISION_ERROR).inc()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: HTTP latency, status and in-flight count
+
+    Requests are labelled with their route template (/api/images/{digest}),
+    not the raw path, to keep the number of series bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            HTTP_REQUESTS.labels(method=scope["method"], route=route_path, status=str(status)).inc()
+            HTTP_SECONDS.labels(route=route_path).observe(time.perf_counter() - started)
+
+
+class ServiceCollector(Collector):
+    """
+    Counters and gauges read from the services' own snapshots on each scrape
+
+    Each source is a callable returning that service's snapshot dict (None
+    when the service is disabled).
+    """
+
+    def __init__(
+        self,
+        ocr_pool: Callable[[], Dict[str, Any]],
+        parse_queue: Callable[[], Dict[str, Any]],
+        parse_cache: Callable[[], Optional[Dict[str, Any]]],
+        vision_cache: Callable[[], Optional[Dict[str, Any]]],
+        image_store: Callable[[], Dict[str, Any]],
+        jobs: Callable[[], Dict[str, int]],
+    ):
+        self.ocr_pool = ocr_pool
+        self.parse_queue = parse_queue
+        self.parse_cache = parse_cache
+        self.vision_cache = vision_cache
+        self.image_store = image_store
+        self.jobs = jobs
+
+    def describe(self):
+        return []  # Collected lazily; nothing to check at registration
+
+    def collect(self) -> Iterator:
+        ocr = self.ocr_pool()
+        yield CounterMetricFamily("pdf_parser_ocr_calls", "Tesseract calls (crops and whole pages)", ocr["calls"])
+        yield CounterMetricFamily("pdf_parser_ocr_failures", "Tesseract calls that raised", ocr["failures"])
+        yield CounterMetricFamily("pdf_parser_ocr_seconds", "Time spent in Tesseract calls", ocr["seconds"])
+        yield GaugeMetricFamily("pdf_parser_ocr_workers", "OCR pool threads", ocr["workers"])
+
+        queue = self.parse_queue()
+        yield GaugeMetricFamily("pdf_parser_parse_queue_depth", "Parses waiting for an executor slot", queue["queued"])
+        yield GaugeMetricFamily("pdf_parser_parse_queue_capacity", "Parses allowed to wait", queue["queue_capacity"])
+        yield GaugeMetricFamily("pdf_parser_parses_running", "Parses running on the executor", queue["running"])
+        yield GaugeMetricFamily("pdf_parser_parse_workers", "Parse executor threads", queue["workers"])
+        yield CounterMetricFamily(
+            "pdf_parser_parses_rejected", "Parses rejected with 503 (queue full)", queue["rejected_total"]
+        )
+
+        lookups = CounterMetricFamily(
+            "pdf_parser_cache_lookups", "Cache lookups by cache and result", labels=["cache", "result"]
+        )
+        hit_ratio = GaugeMetricFamily("pdf_parser_cache_hit_ratio", "Hits / lookups since start", labels=["cache"])
+        parse_cache = self.parse_cache()
+        if parse_cache is not None:
+            for result in ("memory_hits", "disk_hits", "misses"):
+                lookups.add_metric(["parse", result], parse_cache[result])
+            hit_ratio.add_metric(["parse"], parse_cache["hit_rate"])
+        vision_cache = self.vision_cache()
+        if vision_cache is not None:
+            for result in ("exact_hits", "perceptual_hits", "misses"):
+                lookups.add_metric(["vision", result], vision_cache[result])
+            hit_ratio.add_metric(["vision"], vision_cache["hit_rate"])
+        images = self.image_store()
+        lookups.add_metric(["images", "dedup_hits"], images["dedup_hits"])
+        lookups.add_metric(["images", "misses"], images["stores"])
+        yield lookups
+        yield hit_ratio
+
+        jobs = GaugeMetricFamily("pdf_parser_jobs", "Background parse jobs by status", labels=["status"])
+        for status, count in self.jobs().items():
+            jobs.add_metric([status], count)
+        yield jobs
@@ -0,0 +1,276 @@
+"""
+Tesseract OCR backends and a process-wide worker pool
+
+Two engines share one interface:
+- tesserocr (in requirements.txt): long-lived TessBaseAPI instances
+  that keep the language models loaded; recognition releases the GIL, so pool
+  threads run on separate cores
+- pytesseract (fallback): one tesseract subprocess per call, which reloads the
+  traineddata and writes temp files every time
+
+OCRPool runs recognition on PARSE_OCR_WORKERS threads. submit() returns a
+concurrent.futures.Future so the parser can queue crops and keep going (a
+page's crops run on all workers at once). submit_lines() returns word boxes
+grouped into text lines (whole-page OCR of scanned PDFs).
+"""
+import os
+import platform
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from PIL import Image
+
+from .logs import get_logger
+
+logger = get_logger("ocr")
+
+# Tesseract OCR setup
+try:
+    import pytesseract
+
+    if platform.system() == 'Windows':
+        tesseract_paths = [
+            Path(r'C:\Program Files\Tesseract-OCR\tesseract.exe'),
+            Path(r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe'),
+        ]
+        for path in tesseract_paths:
+            if path.exists():
+                pytesseract.pytesseract.tesseract_cmd = str(path)
+                logger.info("✅ Tesseract found at: %s", path)
+                break
+
+    PYTESSERACT_AVAILABLE = True
+    logger.info("✅ pytesseract available")
+except ImportError as e:
+    PYTESSERACT_AVAILABLE = False
+    logger.warning("⚠️  pytesseract not available: %s", e)
+
+try:
+    import tesserocr
+    TESSEROCR_AVAILABLE = True
+    logger.info("✅ tesserocr available - persistent OCR workers enabled")
+except ImportError:
+    TESSEROCR_AVAILABLE = False
+
+OCR_AVAILABLE = PYTESSERACT_AVAILABLE or TESSEROCR_AVAILABLE
+if not OCR_AVAILABLE:
+    logger.warning("⚠️  OCR disabled: install pytesseract or tesserocr")
+
+# auto → tesserocr when installed, else pytesseract
+OCR_ENGINE = os.getenv("PARSE_OCR_ENGINE", "auto").lower()
+OCR_LANG = os.getenv("PARSE_OCR_LANG", "tur+eng")
+OCR_WORKERS = int(os.getenv("PARSE_OCR_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+
+
+@dataclass
+class OCRLine:
+    """One recognized text line in image pixels"""
+    x0: int
+    y0: int
+    x1: int
+    y1: int
+    text: str
+    confidence: float  # Mean word confidence (0-100)
+
+
+def parse_tsv_lines(tsv: str) -> List[OCRLine]:
+    """
+    Group the word rows of Tesseract's TSV output into lines
+
+    Columns: level page_num block_num par_num line_num word_num left top width
+    height conf text; words are level 5 and keep reading order.
+    """
+    lines: Dict[tuple, List[list]] = {}
+    for row in tsv.splitlines():
+        fields = row.split("\t")
+        if len(fields) < 12 or fields[0] != "5" or not fields[11].strip():
+            continue  # Header, page/block/line rows, empty words
+        left, top, width, height = (int(value) for value in fields[6:10])
+        key = (fields[1], fields[2], fields[3], fields[4])
+        lines.setdefault(key, []).append([left, top, left + width, top + height, fields[11].strip(), float(fields[10])])
+
+    return [
+        OCRLine(
+            x0=min(word[0] for word in words),
+            y0=min(word[1] for word in words),
+            x1=max(word[2] for word in words),
+            y1=max(word[3] for word in words),
+            text=" ".join(word[4] for word in words),
+            confidence=sum(word[5] for word in words) / len(words),
+        )
+        for words in lines.values()
+    ]
+
+
+class PytesseractEngine:
+    """One tesseract subprocess per call"""
+    name = "pytesseract"
+
+    def __init__(self, lang: str = OCR_LANG):
+        self.lang = lang
+
+    def image_to_string(self, image: Image.Image) -> str:
+        return pytesseract.image_to_string(image, lang=self.lang)
+
+    def image_to_data(self, image: Image.Image) -> str:
+        """Word boxes as Tesseract TSV"""
+        return pytesseract.image_to_data(image, lang=self.lang)
+
+    def close(self) -> None:
+        pass
+
+
+class TesserocrEngine:
+    """
+    Reusable TessBaseAPI instances (language models loaded once per instance)
+
+    An instance is checked out for each call, so at most one per concurrent
+    caller is ever created.
+    """
+    name = "tesserocr"
+
+    def __init__(self, lang: str = OCR_LANG):
+        self.lang = lang
+        self._idle: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._all: List[Any] = []
+        self._lock = threading.Lock()
+        self._release(self._create())  # Fail early when the language data is missing
+
+    def _create(self):
+        api = tesserocr.PyTessBaseAPI(lang=self.lang)
+        with self._lock:
+            self._all.append(api)
+        return api
+
+    def _release(self, api) -> None:
+        self._idle.put(api)
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._create()
+
+    def image_to_string(self, image: Image.Image) -> str:
+        api = self._acquire()
+        try:
+            api.SetImage(image)
+            return api.GetUTF8Text()
+        finally:
+            api.Clear()
+            self._release(api)
+
+    def image_to_data(self, image: Image.Image) -> str:
+        """Word boxes as Tesseract TSV"""
+        api = self._acquire()
+        try:
+            api.SetImage(image)
+            return api.GetTSVText(0)
+        finally:
+            api.Clear()
+            self._release(api)
+
+    def close(self) -> None:
+        with self._lock:
+            apis, self._all = self._all, []
+        for api in apis:
+            api.End()
+
+
+def create_ocr_engine(engine: str = OCR_ENGINE, lang: str = OCR_LANG):
+    """Engine for PARSE_OCR_ENGINE; falls back to pytesseract when tesserocr cannot start"""
+    if engine in ("auto", "tesserocr") and TESSEROCR_AVAILABLE:
+        try:
+            return TesserocrEngine(lang)
+        except Exception as e:
+            logger.warning("⚠️  tesserocr could not load '%s' (%s) - falling back to pytesseract", lang, e)
+    elif engine == "tesserocr":
+        logger.warning("⚠️  PARSE_OCR_ENGINE=tesserocr but tesserocr is not installed - using pytesseract")
+    return PytesseractEngine(lang)
+
+
+class OCRPool:
+    """Fixed set of OCR threads in front of one engine"""
+
+    def __init__(self, workers: int = OCR_WORKERS, engine=None):
+        self.workers = max(1, workers)
+        self.engine = engine if engine is not None else create_ocr_engine()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ocr")
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "failures": 0, "seconds": 0.0}
+
+    def _recognize(self, image: Image.Image) -> str:
+        return self._timed(self.engine.image_to_string, image)
+
+    def _recognize_lines(self, image: Image.Image) -> List[OCRLine]:
+        return parse_tsv_lines(self._timed(self.engine.image_to_data, image))
+
+    def _timed(self, recognize, image: Image.Image):
+        started = time.perf_counter()
+        try:
+            return recognize(image)
+        except Exception:
+            with self._lock:
+                self.stats["failures"] += 1
+            raise
+        finally:
+            with self._lock:
+                self.stats["calls"] += 1
+                self.stats["seconds"] += time.perf_counter() - started
+
+    def submit(self, image: Image.Image) -> Future:
+        """Queue one image; the Future resolves to its text (or raises the OCR error)"""
+        return self._executor.submit(self._recognize, image)
+
+    def submit_lines(self, image: Image.Image) -> Future:
+        """Queue one image; the Future resolves to its text lines with boxes"""
+        return self._executor.submit(self._recognize_lines, image)
+
+    def image_to_string(self, image: Image.Image) -> str:
+        return self.submit(image).result()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["seconds"] = round(stats["seconds"], 2)
+        return {"engine": self.engine.name, "workers": self.workers, **stats}
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        self.engine.close()
+
+
+_pool: Optional[OCRPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_ocr_pool() -> OCRPool:
+    """Process-wide OCR pool (created on first use)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = OCRPool(OCR_WORKERS)
+        return _pool
+
+
+def ocr_pool_snapshot() -> Dict[str, Any]:
+    """Pool stats without starting the pool"""
+    with _pool_lock:
+        pool = _pool
+    if pool is None:
+        return {"engine": None, "workers": OCR_WORKERS, "calls": 0, "failures": 0, "seconds": 0.0}
+    return pool.snapshot()
+
+
+def shutdown_ocr_pool() -> None:
+    """Stop the OCR threads and release the engine (called on app shutdown)"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
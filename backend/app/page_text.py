@@ -0,0 +1,69 @@
+"""
+Per-document cache of extracted page text
+
+Answer key detection, the scanned-page check and segmentation all read the
+text layer of the same pages. PageTextCache builds each page's fitz.TextPage
+once and derives the plain text and the line dict from it,
+so no page is extracted twice. Segmentation releases a page when it is done
+with it; extraction counts stay behind so double extraction shows up in the
+parse summary.
+
+TextPages are built without image blocks (TEXTFLAGS_TEXT): the parser only
+reads text lines, and page.get_text("dict") would otherwise copy every
+embedded image into the TextPage.
+"""
+from typing import Any, Dict, Tuple
+
+import fitz  # PyMuPDF
+
+TEXT_FLAGS = fitz.TEXTFLAGS_TEXT
+
+
+class PageTextCache:
+    """Text layer of a document's pages, extracted at most once per page"""
+
+    def __init__(self, pdf_document: fitz.Document):
+        self.pdf_document = pdf_document
+        self.extractions: Dict[int, int] = {}  # page index → TextPages built
+        self._pages: Dict[int, Tuple[fitz.Page, fitz.TextPage]] = {}
+        self._texts: Dict[int, str] = {}
+
+    def _get(self, page_index: int) -> Tuple[fitz.Page, fitz.TextPage]:
+        entry = self._pages.get(page_index)
+        if entry is None:
+            page = self.pdf_document[page_index]  # get_text() only accepts a TextPage of this Page object
+            entry = (page, page.get_textpage(flags=TEXT_FLAGS))
+            self._pages[page_index] = entry
+            self.extractions[page_index] = self.extractions.get(page_index, 0) + 1
+        return entry
+
+    def text(self, page_index: int) -> str:
+        """Plain text, like page.get_text("text")"""
+        text = self._texts.get(page_index)
+        if text is None:
+            page, textpage = self._get(page_index)
+            text = page.get_text("text", textpage=textpage)
+            self._texts[page_index] = text
+        return text
+
+    def text_dict(self, page_index: int) -> Dict[str, Any]:
+        """Blocks → lines → spans with fonts and boxes, like page.get_text("dict")"""
+        page, textpage = self._get(page_index)
+        return page.get_text("dict", textpage=textpage)
+
+    def release(self, page_index: int) -> None:
+        """Drop a page's TextPage and text (its extraction count is kept)"""
+        self._pages.pop(page_index, None)
+        self._texts.pop(page_index, None)
+
+    def close(self) -> None:
+        self._pages.clear()
+        self._texts.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """{"pages": pages extracted, "extractions": total, "repeated": {page: count}} (1-based pages)"""
+        return {
+            "pages": len(self.extractions),
+            "extractions": sum(self.extractions.values()),
+            "repeated": {page_index + 1: count for page_index, count in self.extractions.items() if count > 1},
+        }
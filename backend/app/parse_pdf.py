@@ -1,59 +1,79 @@
 import fitz  # PyMuPDF
 import re
-import base64
-import json
-from typing import List, Dict, Any, Optional, Tuple
+from bisect import bisect_left
+from operator import attrgetter
+from typing import List, Dict, Any, Optional, Tuple, Union
 from dataclasses import dataclass
-import io
-import platform
-from pathlib import Path
+from contextlib import contextmanager
+import os
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from collections import OrderedDict
 from PIL import Image
-from collections import defaultdict
 from dotenv import load_dotenv
 
 # Load .env file for environment variables (OpenAI API key, etc.)
 load_dotenv()
 
-# Tesseract OCR setup
-try:
-    import pytesseract
-
-    if platform.system() == 'Windows':
-        tesseract_paths = [
-            Path(r'C:\Program Files\Tesseract-OCR\tesseract.exe'),
-            Path(r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe'),
-        ]
-        for path in tesseract_paths:
-            if path.exists():
-                pytesseract.pytesseract.tesseract_cmd = str(path)
-                print(f"✅ Tesseract found at: {path}")
-                break
-
-    OCR_AVAILABLE = True
-    print("✅ pytesseract available")
-except ImportError as e:
-    OCR_AVAILABLE = False
-    print(f"⚠️  OCR disabled: {e}")
-
-# OpenAI Vision setup
-try:
-    import openai
-    import os
-    OPENAI_AVAILABLE = True
-    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-    if OPENAI_API_KEY:
-        print("✅ OpenAI API key found - Vision analysis enabled")
-    else:
-        print("⚠️  OpenAI API key not set - Will use PyMuPDF text extraction only")
-        OPENAI_AVAILABLE = False
-except ImportError:
-    OPENAI_AVAILABLE = False
-    print("⚠️  OpenAI not available - Install with: pip install openai")
-
-
-@dataclass
+# Tesseract OCR engines and worker pool (tesserocr when installed, else pytesseract)
+from .ocr import OCR_AVAILABLE, OCRLine, get_ocr_pool
+
+# OpenAI Vision setup (client, prompt and concurrent enrichment live in vision.py)
+from .vision import (
+    OPENAI_AVAILABLE,
+    OPENAI_API_KEY,
+    OPENAI_VISION_MODEL,
+    VisionRequest,
+    iter_vision_results,
+)
+# Turkish character repair (single-pass, memoized; see turkish_text.py)
+from .turkish_text import fix_turkish_encoding, join_normalized
+# Question crops are stored by content digest and served from /api/images
+from .images import get_image_store, image_data_uri, image_url
+# Crop scale / format / encoder settings and per-stage timings
+from .render import (
+    DEFAULT_RENDER_OPTIONS,
+    OCR_RENDER_SCALE,
+    PARSE_PAGE_RASTER,
+    CropView,
+    PageRasterCache,
+    RenderOptions,
+    encode_crop,
+    render_pixmap,
+)
+from .timing import StageTimer
+# Prometheus histograms, observed once per parse
+from .metrics import observe_parse, observe_parse_failure, observe_vision_image, observe_vision_route
+# Level-gated logging: per-question messages are DEBUG (see logs.py)
+from .logs import get_logger
+# Page geometry as NumPy arrays (vectorized column detection / assignment)
+from .layout import PageLayout
+from .page_text import TEXT_FLAGS, PageTextCache
+# Page / question ranges and previews (?pages=, ?questions=, ?preview=)
+from .selection import FULL_DOCUMENT, Selection
+# Vision only for questions the text layer cannot be trusted on (PARSE_VISION_ROUTING)
+from .routing import VISION_MIN_CONFIDENCE, VISION_ROUTING, needs_vision, text_confidence
+# Trimmed, tile-aware Vision images (OPENAI_VISION_IMAGE_PREP)
+from .vision_image import VISION_IMAGE_PREP, VISION_MIN_LINE_PX, VisionImageTotals, prepare_vision_image
+
+logger = get_logger("parse")
+
+# Bump whenever parsing output changes: cached parse results of other versions are discarded
+PARSER_VERSION = "2.1.0"
+
+# Multi-core segmentation: number of worker processes used to segment pages.
+# 1 (default) keeps the serial path; 0 means "one per CPU core".
+PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS", "1"))
+
+# Whole-page OCR for pages without a text layer (scanned booklets): "auto" or "off"
+PAGE_OCR_MODE = os.getenv("PARSE_PAGE_OCR", "auto").lower()
+
+
+@dataclass(slots=True)
 class TextBlock:
-    """Enhanced text block with geometric properties"""
+    """Enhanced text block with geometric properties (slots: no per-line __dict__)"""
     x0: float
     y0: float
     x1: float
@@ -103,7 +123,7 @@ class Question:
     stem: str  # Bold question root/core
     options: List[Dict[str, str]]
     answer: Optional[str]
-    image_base64: Optional[str]
+    image_digest: Optional[str]  # Content digest in the image store (/api/images/{digest})
     subject: Optional[str] = None  # TÜRKÇE, MATEMATİK, etc.
     topic: Optional[str] = None  # From OpenAI
     subtopic: Optional[str] = None  # From OpenAI
@@ -112,65 +132,16 @@ class Question:
     pdf_question_number: Optional[int] = None  # Original PDF question number
 
 
-def fix_turkish_encoding(text: str) -> str:
-    """
-    Fix Turkish character encoding issues - COMPREHENSIVE version
-    Handles all common PDF encoding problems with Turkish characters
-    """
-    replacements = {
-        # İ variations
-        '˙I': 'İ', '˙i': 'İ', 'ˆI': 'İ', 'I˙': 'İ', 'i˙': 'İ',
-        '¨I': 'İ', '´I': 'İ', 'Ì': 'İ', 'Í': 'İ',
-
-        # ı variations
-        'ˆı': 'ı', 'i': 'ı', '±': 'ı', 'ı': 'ı',
-
-        # ş variations
-        '¸s': 'ş', '¸S': 'Ş', 'ș': 'ş', 'Ș': 'Ş',
-        's¸': 'ş', 'S¸': 'Ş', 'ş': 'ş', 'Ş': 'Ş',
-
-        # ğ variations
-        '˘g': 'ğ', '˘G': 'Ğ', 'ǧ': 'ğ', 'Ǧ': 'Ğ',
-        'g˘': 'ğ', 'G˘': 'Ğ', 'ğ': 'ğ', 'Ğ': 'Ğ',
-
-        # ç variations
-        '¸c': 'ç', '¸C': 'Ç', 'ć': 'ç', 'Ć': 'Ç',
-        'c¸': 'ç', 'C¸': 'Ç', 'ç': 'ç', 'Ç': 'Ç',
-
-        # ö variations
-        '¨o': 'ö', '¨O': 'Ö', 'ó': 'ö', 'Ó': 'Ö',
-        'o¨': 'ö', 'O¨': 'Ö', 'ö': 'ö', 'Ö': 'Ö',
-
-        # ü variations
-        '¨u': 'ü', '¨U': 'Ü', 'ú': 'ü', 'Ú': 'Ü',
-        'u¨': 'ü', 'U¨': 'Ü', 'ü': 'ü', 'Ü': 'Ü',
-
-        # Common ligatures
-        'ﬁ': 'fi', 'ﬂ': 'fl', 'ﬀ': 'ff',
-
-        # Zero-width and combining characters
-        '\u0307': '',  # Combining dot above
-        '\u0306': '',  # Combining breve
-        '\u0327': '',  # Combining cedilla
-        '\u0308': '',  # Combining diaeresis
-    }
-
-    for old, new in replacements.items():
-        text = text.replace(old, new)
-
-    # Normalize whitespace
-    text = ' '.join(text.split())
-
-    return text
-
-
-def extract_text_blocks_with_fonts(page: fitz.Page) -> List[TextBlock]:
+def extract_text_blocks_with_fonts(page: fitz.Page, text_dict: Optional[Dict[str, Any]] = None) -> List[TextBlock]:
     """
     Extract text blocks with font information using PyMuPDF's dict mode
     This gives us accurate font size, style, and positioning
+
+    text_dict: the page's get_text("dict") output when already extracted (PageTextCache)
     """
     blocks = []
-    text_dict = page.get_text("dict")
+    if text_dict is None:
+        text_dict = page.get_text("dict", flags=TEXT_FLAGS)
     page_num = page.number + 1
 
     for block in text_dict.get("blocks", []):
@@ -222,37 +193,63 @@ def extract_text_blocks_with_fonts(page: fitz.Page) -> List[TextBlock]:
     return blocks
 
 
-def detect_columns(blocks: List[TextBlock], page_width: float) -> List[Tuple[float, float]]:
+def page_needs_ocr(page: fitz.Page, texts: Optional[PageTextCache] = None) -> bool:
+    """Scanned page: has images but no text layer"""
+    if not page.get_images(full=False):
+        return False
+    text = texts.text(page.number) if texts is not None else page.get_text("text")
+    return not text.strip()
+
+
+def render_page_for_ocr(page: fitz.Page) -> Image.Image:
+    """Whole page in grayscale at OCR_RENDER_SCALE (Tesseract binarizes anyway)"""
+    mat = fitz.Matrix(OCR_RENDER_SCALE, OCR_RENDER_SCALE)
+    return CropView(page.get_pixmap(matrix=mat, colorspace=fitz.csGRAY)).detached_image()
+
+
+def ocr_lines_to_text_blocks(lines: List[OCRLine], page_num: int, scale: float) -> List[TextBlock]:
     """
-    Detect columns in page using X-axis clustering
-    Returns: list of (x_start, x_end) for each column
+    Turn OCR lines (pixels at `scale`) into TextBlocks in page coordinates,
+    so column detection and question segmentation run unchanged
     """
-    if not blocks:
-        return [(0, page_width)]
+    blocks = []
+    for line in lines:
+        text = fix_turkish_encoding(line.text)
+        if not text:
+            continue
 
-    # Cluster blocks by X position
-    x_positions = [b.center_x for b in blocks]
-    x_positions.sort()
+        blocks.append(TextBlock(
+            x0=line.x0 / scale,
+            y0=line.y0 / scale,
+            x1=line.x1 / scale,
+            y1=line.y1 / scale,
+            text=text,
+            font_size=(line.y1 - line.y0) / scale,  # Line box height ≈ font size
+            font_name="OCR",
+            is_bold=False,
+            page_num=page_num,
+        ))
 
-    # Find gaps larger than 50 points (column separator)
-    columns = []
-    col_start = 0
+    return blocks
 
-    for i in range(1, len(x_positions)):
-        gap = x_positions[i] - x_positions[i-1]
-        if gap > 50:  # Column separator detected
-            col_end = (x_positions[i-1] + x_positions[i]) / 2
-            columns.append((col_start, col_end))
-            col_start = col_end
 
-    # Last column
-    columns.append((col_start, page_width))
+def detect_columns(
+    blocks: List[TextBlock],
+    page_width: float,
+    layout: Optional[PageLayout] = None,
+) -> List[Tuple[float, float]]:
+    """
+    Detect columns in page using X-axis clustering
+    (gaps over 50pt between sorted line centers, see PageLayout.columns)
+    Returns: list of (x_start, x_end) for each column
+    """
+    if not blocks:
+        return [(0, page_width)]
 
-    # If no columns detected, return full width
-    if len(columns) == 0:
-        columns = [(0, page_width)]
+    layout = layout if layout is not None else PageLayout(blocks)
+    columns = layout.columns(page_width)
 
-    print(f"   🔲 Detected {len(columns)} column(s)")
+    logger.debug("🔲 Detected %d column(s)", len(columns))
     return columns
 
 
@@ -297,28 +294,32 @@ def is_question_start_block(block: TextBlock) -> Optional[int]:
     return None
 
 
-def group_blocks_by_column(blocks: List[TextBlock], columns: List[Tuple[float, float]]) -> Dict[int, List[TextBlock]]:
-    """Group text blocks by column"""
-    column_blocks = defaultdict(list)
-
-    for block in blocks:
-        # Find which column this block belongs to
-        for col_idx, (col_start, col_end) in enumerate(columns):
-            if col_start <= block.center_x < col_end:
-                column_blocks[col_idx].append(block)
-                break
-
-    return column_blocks
+def group_blocks_by_column(
+    blocks: List[TextBlock],
+    columns: List[Tuple[float, float]],
+    layout: Optional[PageLayout] = None,
+) -> Dict[int, List[TextBlock]]:
+    """Group text blocks by column (first column whose X range holds the block center)"""
+    layout = layout if layout is not None else PageLayout(blocks)
+    return layout.group_by_column(columns)
 
 
-def find_question_blocks(page: fitz.Page, page_num: int, unique_id_start: int) -> List[QuestionBlock]:
+def find_question_blocks(
+    page: fitz.Page,
+    page_num: int,
+    unique_id_start: int,
+    blocks: Optional[List[TextBlock]] = None,
+) -> List[QuestionBlock]:
     """
     Find all question blocks on a page using:
     - Column detection
     - Font-based segmentation
     - Geometric clustering
+
+    blocks: text lines to segment (None → the page's text layer; OCR lines for scanned pages)
     """
-    blocks = extract_text_blocks_with_fonts(page)
+    if blocks is None:
+        blocks = extract_text_blocks_with_fonts(page)
 
     if not blocks:
         return []
@@ -327,19 +328,23 @@ def find_question_blocks(page: fitz.Page, page_num: int, unique_id_start: int) -
     page_width = page_rect.width
     page_height = page_rect.height
 
+    # Line geometry as arrays, shared by both steps
+    layout = PageLayout(blocks)
+
     # Detect columns
-    columns = detect_columns(blocks, page_width)
+    columns = detect_columns(blocks, page_width, layout)
 
     # Group blocks by column
-    column_groups = group_blocks_by_column(blocks, columns)
+    column_groups = group_blocks_by_column(blocks, columns, layout)
 
     question_blocks = []
     unique_id = unique_id_start
 
     # Process each column separately
     for col_idx, col_blocks in sorted(column_groups.items()):
-        # Sort by Y position within column
+        # Sort by Y position within column (Y ranges become slices found by bisect)
         col_blocks.sort(key=lambda b: b.y0)
+        col_ys = [b.y0 for b in col_blocks]
 
         # Find question starts in this column
         question_starts = []
@@ -355,7 +360,7 @@ def find_question_blocks(page: fitz.Page, page_num: int, unique_id_start: int) -
         if not question_starts:
             continue
 
-        print(f"   📍 Column {col_idx}: Found {len(question_starts)} questions")
+        logger.debug("📍 Column %d: Found %d questions", col_idx, len(question_starts))
 
         # Create question blocks with boundaries
         col_x_start, col_x_end = columns[col_idx]
@@ -370,10 +375,7 @@ def find_question_blocks(page: fitz.Page, page_num: int, unique_id_start: int) -
                 end_y = page_height
 
             # Collect all blocks in this Y range and column
-            q_text_blocks = [
-                b for b in col_blocks
-                if start_y <= b.y0 < end_y
-            ]
+            q_text_blocks = col_blocks[bisect_left(col_ys, start_y):bisect_left(col_ys, end_y)]
 
             if not q_text_blocks:
                 continue
@@ -405,12 +407,331 @@ def find_question_blocks(page: fitz.Page, page_num: int, unique_id_start: int) -
             question_blocks.append(question_block)
             unique_id += 1
 
-            print(f"      ✅ Q{q_start['pdf_num']} → ID={question_block.unique_id} "
-                  f"(Y={crop_y0:.0f}-{crop_y1:.0f}, blocks={len(q_text_blocks)})")
+            logger.debug("✅ Q%s → ID=%d (Y=%.0f-%.0f, blocks=%d)",
+                         q_start['pdf_num'], question_block.unique_id, crop_y0, crop_y1, len(q_text_blocks))
 
     return question_blocks
 
 
+# Parser input: PDF bytes, or the path of a PDF on disk (spooled uploads, job files)
+PdfSource = Union[bytes, str, os.PathLike]
+
+
+def _in_memory(pdf: PdfSource) -> bool:
+    return isinstance(pdf, (bytes, bytearray, memoryview))
+
+
+def open_pdf(pdf: PdfSource) -> fitz.Document:
+    """Open from memory, or by path (pages are then read through the OS page cache)"""
+    if _in_memory(pdf):
+        return fitz.open(stream=pdf, filetype="pdf")
+    return fitz.open(os.fspath(pdf), filetype="pdf")
+
+
+@dataclass(frozen=True)
+class SharedPdf:
+    """Handle to PDF bytes placed in shared memory for segmentation workers"""
+    name: str
+    size: int
+
+    @property
+    def key(self) -> str:
+        return self.name
+
+    def open(self) -> fitz.Document:
+        shm = shared_memory.SharedMemory(name=self.name)
+        try:
+            pdf_bytes = bytes(shm.buf[:self.size])
+        finally:
+            shm.close()
+        return fitz.open(stream=pdf_bytes, filetype="pdf")
+
+
+@dataclass(frozen=True)
+class PdfFile:
+    """Handle to a PDF on disk: segmentation workers open the path themselves (nothing copied)"""
+    path: str
+    size: int
+    mtime_ns: int
+
+    @property
+    def key(self) -> str:
+        return f"{self.path}:{self.size}:{self.mtime_ns}"  # A reused path with new content is another document
+
+    def open(self) -> fitz.Document:
+        return fitz.open(self.path, filetype="pdf")
+
+
+@contextmanager
+def worker_source(pdf: PdfSource):
+    """SharedPdf (bytes copied to shared memory) or PdfFile handle for the segmentation workers"""
+    if not _in_memory(pdf):
+        path = os.fspath(pdf)
+        stat = os.stat(path)
+        yield PdfFile(path=path, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        return
+
+    shm = shared_memory.SharedMemory(create=True, size=max(1, len(pdf)))
+    try:
+        shm.buf[:len(pdf)] = pdf
+        yield SharedPdf(name=shm.name, size=len(pdf))
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+# Per-process cache of documents opened by segmentation workers (keyed by handle)
+_worker_documents: "OrderedDict[str, fitz.Document]" = OrderedDict()
+_WORKER_DOCUMENT_CACHE_SIZE = 4
+
+_segmentation_pools: Dict[int, ProcessPoolExecutor] = {}
+_segmentation_pools_lock = threading.Lock()
+
+
+def resolve_worker_count(workers: Optional[int] = None) -> int:
+    """Resolve requested worker count (None → PDF_PARSE_WORKERS, 0 → CPU count)"""
+    if workers is None:
+        workers = PARSE_WORKERS
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+
+def _open_worker_document(source: Union[SharedPdf, PdfFile]) -> fitz.Document:
+    """Open (once per worker process) the document behind a SharedPdf / PdfFile handle"""
+    pdf_document = _worker_documents.get(source.key)
+    if pdf_document is not None:
+        _worker_documents.move_to_end(source.key)
+        return pdf_document
+
+    pdf_document = source.open()
+    _worker_documents[source.key] = pdf_document
+
+    while len(_worker_documents) > _WORKER_DOCUMENT_CACHE_SIZE:
+        _, stale = _worker_documents.popitem(last=False)
+        stale.close()
+
+    return pdf_document
+
+
+def _segment_page_in_worker(source: Union[SharedPdf, PdfFile], page_index: int) -> List[QuestionBlock]:
+    """Worker entry point: segment one page (unique IDs are assigned by the parent)"""
+    pdf_document = _open_worker_document(source)
+    return find_question_blocks(pdf_document[page_index], page_index + 1, 0)
+
+
+def get_segmentation_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Return the long-lived segmentation process pool for a configured worker count
+
+    Keyed by the configured count, not by what one parse uses: short documents
+    limit their tasks in flight (see _map_in_window) and share the same pool.
+    """
+    with _segmentation_pools_lock:
+        pool = _segmentation_pools.get(workers)
+        if pool is None:
+            # spawn: safe with the threads uvicorn/OpenAI keep running, same on Windows
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _segmentation_pools[workers] = pool
+        return pool
+
+
+def shutdown_segmentation_pools() -> None:
+    """Stop all segmentation worker processes"""
+    with _segmentation_pools_lock:
+        for pool in _segmentation_pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _segmentation_pools.clear()
+
+
+def _map_in_window(pool: ProcessPoolExecutor, source: Union[SharedPdf, PdfFile], page_indices: List[int], window: int):
+    """Segment pages on `pool` with at most `window` in flight; yields results in page order"""
+    pages = iter(page_indices)
+    pending: List[Future] = [
+        pool.submit(_segment_page_in_worker, source, page_index) for _, page_index in zip(range(window), pages)
+    ]
+    try:
+        while pending:
+            result = pending.pop(0).result()
+            page_index = next(pages, None)
+            if page_index is not None:
+                pending.append(pool.submit(_segment_page_in_worker, source, page_index))
+            yield result
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+class ScannedPages:
+    """
+    Whole-page OCR of the pages without a text layer, shared by answer key
+    detection and segmentation (one OCR pass per page)
+
+    Pages are rendered in `order` and OCR'd on the OCR pool, at most two per
+    OCR worker ahead of the caller, so several pages are recognized at once
+    while earlier ones are segmented. Answer key candidates go first.
+    """
+
+    def __init__(self, pdf_document: fitz.Document, order: List[int], timer: Optional[StageTimer] = None):
+        self.pdf_document = pdf_document
+        self.timer = timer or StageTimer()
+        self._order = order
+        self._pages = set(order)
+        self._submitted = 0
+        self._futures: Dict[int, Future] = {}
+        self._blocks: Dict[int, List[TextBlock]] = {}
+        self._window = 0
+
+    def __contains__(self, page_index: int) -> bool:
+        return page_index in self._pages
+
+    def __bool__(self) -> bool:
+        return bool(self._order)
+
+    def _submit_next(self) -> None:
+        page_index = self._order[self._submitted]
+        self._submitted += 1
+        pool = get_ocr_pool()
+        self._window = pool.workers * 2
+        with self.timer.stage("page_ocr"):
+            image = render_page_for_ocr(self.pdf_document[page_index])
+        self._futures[page_index] = pool.submit_lines(image)
+
+    def blocks(self, page_index: int) -> List[TextBlock]:
+        """OCR lines of a scanned page as TextBlocks (waits for its OCR)"""
+        if page_index in self._blocks:
+            return self._blocks[page_index]
+
+        while page_index not in self._futures:
+            self._submit_next()
+
+        with self.timer.stage("page_ocr"):
+            try:
+                lines = self._futures.pop(page_index).result()
+            except Exception as e:
+                logger.warning("⚠️  Page OCR failed (page %d): %s", page_index + 1, e)
+                lines = []
+
+        # Keep the pool busy with the next pages
+        while len(self._futures) < self._window and self._submitted < len(self._order):
+            self._submit_next()
+
+        logger.info("🔍 Page %d: no text layer, OCR found %d line(s)", page_index + 1, len(lines))
+        self._blocks[page_index] = ocr_lines_to_text_blocks(lines, page_index + 1, OCR_RENDER_SCALE)
+        return self._blocks[page_index]
+
+    def text(self, page_index: int) -> str:
+        """Page text in reading order (like page.get_text("text"))"""
+        return "\n".join(block.text for block in self.blocks(page_index))
+
+    def release(self, page_index: int) -> None:
+        """Drop a page's lines once it has been segmented"""
+        self._blocks.pop(page_index, None)
+
+    def close(self) -> None:
+        """Cancel OCR nobody is waiting for anymore"""
+        for future in self._futures.values():
+            future.cancel()
+        self._futures.clear()
+
+
+def find_scanned_pages(
+    pdf_document: fitz.Document,
+    answer_key_candidates: List[int],
+    timer: Optional[StageTimer] = None,
+    texts: Optional[PageTextCache] = None,
+    page_indices: Optional[List[int]] = None,
+) -> ScannedPages:
+    """
+    Pages to OCR whole (none when PARSE_PAGE_OCR=off or OCR is unavailable)
+
+    Only `page_indices` (default: all pages) and the answer key candidates are checked.
+    """
+    if PAGE_OCR_MODE != "auto" or not OCR_AVAILABLE:
+        return ScannedPages(pdf_document, [], timer)
+
+    if page_indices is None:
+        checked = range(len(pdf_document))
+    else:
+        checked = sorted(set(page_indices) | set(answer_key_candidates))
+    scanned = [
+        page_index for page_index in checked
+        if page_needs_ocr(pdf_document[page_index], texts)
+    ]
+    if scanned:
+        logger.info("🔍 %d page(s) without a text layer will be OCR'd", len(scanned))
+    first = [page_index for page_index in answer_key_candidates if page_index in scanned]
+    return ScannedPages(pdf_document, first + [page_index for page_index in scanned if page_index not in first], timer)
+
+
+def iter_page_question_blocks(
+    pdf_document: fitz.Document,
+    pdf: PdfSource,
+    page_indices: List[int],
+    workers: Optional[int] = None,
+    scanned: Optional[ScannedPages] = None,
+    texts: Optional[PageTextCache] = None,
+):
+    """
+    Segment pages and yield (page_index, question_blocks) in page order
+
+    With more than one worker, pages are fanned out to a process pool. PDF
+    bytes are copied once into shared memory (a PDF on disk is opened by path)
+    and every worker opens its own fitz.Document from there, so tasks only
+    carry (handle, page_index).
+    Unique IDs are left at 0-based page-local values; callers renumber them.
+
+    Scanned pages (see ScannedPages) are segmented from their OCR lines in
+    this process. In this process each page's text layer comes from `texts`
+    and is released once the page is segmented; worker processes extract
+    their pages themselves (once each).
+    """
+    workers = resolve_worker_count(workers)
+    scanned = scanned if scanned is not None else ScannedPages(pdf_document, [])
+    texts = texts if texts is not None else PageTextCache(pdf_document)
+    text_pages = [page_index for page_index in page_indices if page_index not in scanned]
+
+    def segment_scanned(page_index: int) -> List[QuestionBlock]:
+        blocks = scanned.blocks(page_index)
+        scanned.release(page_index)
+        texts.release(page_index)
+        return find_question_blocks(pdf_document[page_index], page_index + 1, 0, blocks)
+
+    def segment_text_layer(page_index: int) -> List[QuestionBlock]:
+        page = pdf_document[page_index]
+        blocks = extract_text_blocks_with_fonts(page, texts.text_dict(page_index))
+        texts.release(page_index)
+        return find_question_blocks(page, page_index + 1, 0, blocks)
+
+    if workers <= 1 or len(text_pages) < 2:
+        for page_index in page_indices:
+            logger.debug("📄 Page %d", page_index + 1)
+            if page_index in scanned:
+                yield page_index, segment_scanned(page_index)
+            else:
+                yield page_index, segment_text_layer(page_index)
+        return
+
+    parallel = min(workers, len(text_pages))
+    logger.info("⚙️  Segmenting %d pages on %d worker process(es)", len(text_pages), parallel)
+
+    with worker_source(pdf) as source:
+        results = _map_in_window(get_segmentation_pool(workers), source, text_pages, parallel)
+
+        # Results come in submission order, so page order matches the serial path
+        for page_index in page_indices:
+            if page_index in scanned:
+                page_question_blocks = segment_scanned(page_index)
+            else:
+                page_question_blocks = next(results)
+                texts.release(page_index)  # Text layer read by the answer key / scan checks
+            logger.debug("📄 Page %d: %d question(s)", page_index + 1, len(page_question_blocks))
+            yield page_index, page_question_blocks
+
+
 def extract_options_with_clustering(text_blocks: List[TextBlock]) -> List[Dict[str, str]]:
     """
     Extract options using X-axis alignment clustering - IMPROVED
@@ -466,6 +787,11 @@ def extract_options_with_clustering(text_blocks: List[TextBlock]) -> List[Dict[s
     option_starts.sort(key=lambda opt: opt['y0'])
 
     # Step 5: For each option, collect ALL text blocks in its Y range
+    # X alignment (±20pt tolerance) doesn't depend on the option: filter once,
+    # then each Y range is a slice of the aligned blocks sorted by Y
+    aligned_blocks = [block for block in text_blocks if abs(block.x0 - avg_option_x) <= 20]
+    aligned_blocks.sort(key=attrgetter('y0'))
+    aligned_ys = [block.y0 for block in aligned_blocks]
     options = []
 
     for i, opt_start in enumerate(option_starts):
@@ -478,20 +804,11 @@ def extract_options_with_clustering(text_blocks: List[TextBlock]) -> List[Dict[s
         else:
             end_y = max(b.y1 for b in text_blocks) + 10
 
-        # Collect all blocks in this Y range with X alignment ±20pt
-        option_lines = []
-
-        for block in text_blocks:
-            # Check if block is in Y range
-            if start_y <= block.y0 < end_y:
-                # Check X alignment (±20pt tolerance)
-                x_diff = abs(block.x0 - avg_option_x)
-                if x_diff <= 20:
-                    option_lines.append((block.y0, block.text))
-
-        # Sort by Y to maintain reading order
-        option_lines.sort(key=lambda x: x[0])
-        option_text_parts = [text for _, text in option_lines]
+        # Collect all blocks in this Y range with X alignment ±20pt (in reading order)
+        option_text_parts = [
+            block.text
+            for block in aligned_blocks[bisect_left(aligned_ys, start_y):bisect_left(aligned_ys, end_y)]
+        ]
 
         # Join with space
         full_text = ' '.join(option_text_parts)
@@ -514,162 +831,22 @@ def extract_options_with_clustering(text_blocks: List[TextBlock]) -> List[Dict[s
 
     # Step 7: Validate - should have 2-5 options
     if len(options) < 2:
-        print(f"      ⚠️  Only {len(options)} option(s) found - may be incomplete")
+        logger.debug("⚠️  Only %d option(s) found - may be incomplete", len(options))
     elif len(options) > 5:
-        print(f"      ⚠️  {len(options)} options found - may have false positives")
+        logger.debug("⚠️  %d options found - may have false positives", len(options))
         # Keep only first 5
         options = options[:5]
 
     return options
 
 
-def analyze_question_with_openai_vision(image_base64: str, subject: Optional[str] = None, question_number: Optional[int] = None) -> Dict[str, Any]:
-    """
-    Analyze question image using OpenAI Vision API (GPT-4o-mini)
-
-    Returns: {
-        "text": str,  # Full question text
-        "stem": str,  # Bold/core question part
-        "options": [{"label": "A", "value": "..."}, ...],
-        "topic": str,
-        "subtopic": str,
-        "difficulty": str,  # "easy", "medium", "hard"
-        "answer": str or None,  # If visible in image
-    }
-    """
-    if not OPENAI_AVAILABLE or not OPENAI_API_KEY:
-        return {
-            "text": "",
-            "stem": "",
-            "options": [],
-            "subject": None,
-            "topic": None,
-            "subtopic": None,
-            "difficulty": None,
-            "answer": None,
-        }
-
-    try:
-        # Initialize OpenAI client (compatible with openai >= 1.0.0)
-        client = openai.OpenAI(
-            api_key=OPENAI_API_KEY,
-            timeout=30.0,
-            max_retries=2,
-        )
-
-        # Construct prompt for Turkish exam questions
-        prompt = f"""Sen bir Türk Eğitim Sistemi uzmanısın. Bu sınav sorusunu analiz et ve JSON formatında çıktı ver.
-
-Soru #{question_number or '?'} | Beklenen Ders: {subject or 'Tespit Et'}
-
-📋 GÖREVİN:
-Görüntüdeki sınav sorusunu TAM OLARAK oku ve şu bilgileri çıkar:
-
-1. **subject** (Ders): Sorunun hangi derse ait olduğunu MUTLAKA tespit et
-   - Türkçe, Matematik, Fen Bilimleri, Sosyal Bilgiler, İngilizce, vb.
-   - Soru içeriğinden ve üslubundan anlayabilirsin
-   - Örnek: Geometri sorusu → "Matematik", Fiil sorusu → "Türkçe"
-
-2. **topic** (Ana Konu): Dersin hangi ana konusuyla ilgili
-   - Türkçe: Cümle Bilgisi, Sözcük Bilgisi, Anlatım Bozuklukları, Noktalama, Paragraf
-   - Matematik: Geometri, Sayılar, Denklemler, Kesirler, Olasılık, İstatistik
-   - Fen: Madde ve Özellikleri, Kuvvet ve Hareket, Canlılar, Enerji, Dünya ve Evren
-   - Sosyal: Tarih, Coğrafya, Vatandaşlık, İnsan Hakları
-
-3. **subtopic** (Alt Konu): Daha spesifik konu
-   - Örnek: "Geometri" → "Üçgenler", "Cümle Bilgisi" → "Fiilimsiler"
-
-4. **difficulty** (Zorluk): Sorunun seviyesi
-   - "easy": Basit tanım/bilgi sorusu
-   - "medium": Orta seviye, çıkarım gerektiren
-   - "hard": Karmaşık, çoklu adım gerektiren
-
-5. **text** (Tam Metin): Sorunun TÜM metnini yaz
-   - Soru numarasını ATLA
-   - Sadece soru metnini al
-
-6. **stem** (Soru Kökü): Sorunun ana cümlesi (genelde kalın yazılmış)
-   - Örnek: "Aşağıdakilerden hangisi..." veya "Yukarıdaki metne göre..."
-
-7. **options** (Şıklar): A'dan E'ye kadar TÜM şıkları oku
-   - Format: [{{"label": "A", "value": "gerçek şık metni"}}, {{"label": "B", "value": "gerçek şık metni"}}, ...]
-   - GERÇEK METİNLERİ yaz, "Şık A", "Şık B" gibi placeholder'ları YAZMA
-   - Eğer şıkta sadece "A)", "B)" yazıyorsa ve metin yoksa, boş bırakma - yakındaki metni al
-   - Multi-line şıkları birleştir (aynı şığın devamını yanına ekle)
-
-8. **answer**: Görselde cevap anahtarı görünüyorsa doğru şık (A-E), yoksa null
-
-⚠️ KRİTİK KURALLAR:
-- Şıklardaki GERÇEK metni oku, placeholder yazma
-- subject/topic/subtopic MUTLAKA dolu olsun (null veya "Genel" yazma)
-- Türkçe karakterleri doğru kullan (İ, ı, ş, ğ, ç, ö, ü)
-- Tüm şıkları al (genelde 5 tane: A, B, C, D, E)
-
-JSON FORMAT:
-{{
-  "subject": "Matematik",
-  "topic": "Geometri",
-  "subtopic": "Üçgenler",
-  "difficulty": "medium",
-  "text": "Soru metni tam olarak...",
-  "stem": "Ana soru cümlesi...",
-  "options": [
-    {{"label": "A", "value": "Gerçek şık metni buraya"}},
-    {{"label": "B", "value": "Gerçek şık metni buraya"}},
-    ...
-  ],
-  "answer": null
-}}"""
-
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt},
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": image_base64,
-                                "detail": "high"  # High quality for better text extraction
-                            }
-                        }
-                    ]
-                }
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.2,  # Low temperature for consistent extraction
-            max_tokens=1500,
-        )
-
-        result = response.choices[0].message.content
-        parsed = json.loads(result) if isinstance(result, str) else result
-
-        # Ensure all keys exist
-        return {
-            "text": parsed.get("text", ""),
-            "stem": parsed.get("stem", ""),
-            "options": parsed.get("options", []),
-            "subject": parsed.get("subject"),  # OpenAI will detect the subject
-            "topic": parsed.get("topic"),
-            "subtopic": parsed.get("subtopic"),
-            "difficulty": parsed.get("difficulty"),
-            "answer": parsed.get("answer"),
-        }
-
-    except Exception as e:
-        print(f"      ⚠️  OpenAI Vision analysis failed: {e}")
-        return {
-            "text": "",
-            "stem": "",
-            "options": [],
-            "subject": None,
-            "topic": None,
-            "subtopic": None,
-            "difficulty": None,
-            "answer": None,
-        }
+# Subject names as answer keys and section headings print them
+SUBJECT_NAMES = (
+    r'TÜRKÇE|MATEMATİK|FEN|SOSYAL|İNGİLİZCE|TURKISH|MATH|SCIENCE|'
+    r'TYT|AYT|YKS|LGS|KPSS|'
+    r'FİZİK|KİMYA|BİYOLOJİ|TARİH|COĞRAFYA|GEOMETRI|'
+    r'PHYSICS|CHEMISTRY|BIOLOGY|HISTORY|GEOGRAPHY'
+)
 
 
 def normalize_subject_name(subject: str) -> str:
@@ -709,10 +886,47 @@ def normalize_subject_name(subject: str) -> str:
     return mappings.get(subject, subject)
 
 
-def extract_answer_key_from_pdf(pdf_document: fitz.Document) -> Tuple[Dict[str, Dict[int, str]], List[int]]:
+def answer_key_candidate_pages(pdf_document: fitz.Document) -> List[int]:
+    """Answer keys are searched on the last 3 pages"""
+    total_pages = len(pdf_document)
+    return list(range(max(0, total_pages - 3), total_pages))
+
+
+def find_starting_subject(
+    texts: PageTextCache,
+    skipped_pages: List[int],
+    subjects: List[str],
+    scanned: Optional[ScannedPages] = None,
+) -> Optional[str]:
+    """
+    Answer key subject a page selection starts in
+
+    The text layer of the skipped leading pages is searched backwards for a
+    line that is only a subject heading ("MATEMATİK", "FİZİK 2", "TÜRKÇE TESTİ"). Scanned
+    pages are not OCR'd for this. Returns None when no heading names one of
+    `subjects`.
+    """
+    for page_index in reversed(skipped_pages):
+        if scanned is not None and page_index in scanned:
+            continue
+        text = texts.text(page_index)
+        texts.release(page_index)
+        for line in reversed(text.split("\n")):
+            match = re.fullmatch(rf'({SUBJECT_NAMES})(?:\s+TEST[İI]?)?\s*\d*', line.strip(), re.IGNORECASE)
+            if match and normalize_subject_name(match.group(1)) in subjects:
+                return normalize_subject_name(match.group(1))
+    return None
+
+
+def extract_answer_key_from_pdf(
+    pdf_document: fitz.Document,
+    scanned: Optional[ScannedPages] = None,
+    texts: Optional[PageTextCache] = None,
+) -> Tuple[Dict[str, Dict[int, str]], List[int]]:
     """
     Extract answer key from last pages of PDF
     Format: CEVAP ANAHTARI or answer key sections
+    (scanned pages are read from their OCR text, others from `texts` when given)
 
     Returns:
         Tuple of (answer_keys, pages_with_answer_key)
@@ -723,25 +937,23 @@ def extract_answer_key_from_pdf(pdf_document: fitz.Document) -> Tuple[Dict[str,
     pages_with_answer_key = []
     current_subject = None
 
-    # Check last 3 pages for answer key
-    total_pages = len(pdf_document)
-    start_page = max(0, total_pages - 3)
+    logger.debug("🔍 Checking last 3 pages for answer key")
 
-    print(f"   🔍 Checking last 3 pages for answer key...")
-
-    for page_num in range(start_page, total_pages):
-        page = pdf_document[page_num]
-        text = page.get_text("text")
+    for page_num in answer_key_candidate_pages(pdf_document):
+        if scanned is not None and page_num in scanned:
+            text = scanned.text(page_num)
+        elif texts is not None:
+            text = texts.text(page_num)
+        else:
+            text = pdf_document[page_num].get_text("text")
         text = fix_turkish_encoding(text)
 
         # Check if this page contains answer key
         has_answer_key = re.search(r'(?:CEVAP|ANAHTAR|ANSWER|KEY)', text, re.IGNORECASE)
         if has_answer_key:
             pages_with_answer_key.append(page_num)
-            print(f"   📝 Answer key detected on page {page_num + 1}")
-            # DEBUG: Print raw text to see format
-            print(f"   📄 Raw text preview (first 500 chars):")
-            print(f"      {text[:500]}")
+            logger.info("📝 Answer key detected on page %d", page_num + 1)
+            logger.debug("📄 Raw text preview (first 500 chars): %r", text[:500])
 
         # Only parse if this page has answer key markers
         if not has_answer_key:
@@ -759,14 +971,7 @@ def extract_answer_key_from_pdf(pdf_document: fitz.Document) -> Tuple[Dict[str,
             # Pattern 1: Classic subjects (TÜRKÇE, MATEMATİK, FEN, SOSYAL, İNGİLİZCE)
             # Pattern 2: Exam types (TYT, AYT, YKS, LGS, KPSS)
             # Pattern 3: Science subjects (FİZİK, KİMYA, BİYOLOJİ, TARİH, COĞRAFYA)
-            subject_match = re.match(
-                r'^(TÜRKÇE|MATEMATİK|FEN|SOSYAL|İNGİLİZCE|TURKISH|MATH|SCIENCE|'
-                r'TYT|AYT|YKS|LGS|KPSS|'
-                r'FİZİK|KİMYA|BİYOLOJİ|TARİH|COĞRAFYA|GEOMETRI|'
-                r'PHYSICS|CHEMISTRY|BIOLOGY|HISTORY|GEOGRAPHY)\s*\d*',
-                line,
-                re.IGNORECASE
-            )
+            subject_match = re.match(rf'^({SUBJECT_NAMES})\s*\d*', line, re.IGNORECASE)
 
             if subject_match:
                 # Extract just the subject name (without trailing numbers like "TYT 1")
@@ -774,7 +979,7 @@ def extract_answer_key_from_pdf(pdf_document: fitz.Document) -> Tuple[Dict[str,
                 current_subject = normalize_subject_name(subject_name)
                 if current_subject not in answer_keys:
                     answer_keys[current_subject] = {}
-                print(f"      📚 Subject: {current_subject}")
+                logger.debug("📚 Subject: %s", current_subject)
                 continue
 
             # Parse answer lines - MULTIPLE FORMATS:
@@ -794,23 +999,22 @@ def extract_answer_key_from_pdf(pdf_document: fitz.Document) -> Tuple[Dict[str,
                     current_subject = "GENEL"
                     if current_subject not in answer_keys:
                         answer_keys[current_subject] = {}
-                    print(f"      📚 Subject: {current_subject} (auto-detected)")
+                    logger.debug("📚 Subject: %s (auto-detected)", current_subject)
 
                 for q_num_str, answer_letter in matches:
                     q_num = int(q_num_str)
                     answer_keys[current_subject][q_num] = answer_letter.upper()
-                    print(f"         ✓ Q{q_num} = {answer_letter.upper()}")
+                    logger.debug("✓ Q%d = %s", q_num, answer_letter.upper())
 
     # Log what we found
-    print(f"\n   📊 Answer Key Extraction Results:")
     if answer_keys:
         for subject, answers in answer_keys.items():
             if answers:
                 min_q = min(answers.keys())
                 max_q = max(answers.keys())
-                print(f"      ✅ {subject}: {len(answers)} answers (Q{min_q}-Q{max_q})")
+                logger.debug("✅ %s: %d answers (Q%d-Q%d)", subject, len(answers), min_q, max_q)
     else:
-        print(f"      ⚠️  No answers extracted!")
+        logger.debug("⚠️  No answers extracted")
 
     return answer_keys, pages_with_answer_key
 
@@ -830,8 +1034,8 @@ def extract_question_stem(text_blocks: List[TextBlock]) -> Tuple[str, str]:
         else:
             regular_parts.append(block.text)
 
-    full_text = ' '.join(regular_parts + bold_parts)
-    bold_stem = ' '.join(bold_parts)
+    full_text = join_normalized(regular_parts + bold_parts)
+    bold_stem = join_normalized(bold_parts)
 
     full_text = fix_turkish_encoding(full_text)
     bold_stem = fix_turkish_encoding(bold_stem)
@@ -839,6 +1043,44 @@ def extract_question_stem(text_blocks: List[TextBlock]) -> Tuple[str, str]:
     return full_text.strip(), bold_stem.strip()
 
 
+class BlockAbove:
+    """
+    Last block, in list order, among those starting above a given Y
+
+    Same answer as [b for b in blocks if b.y0 < y][-1]. The first query scans
+    back from the end (question blocks are Y-sorted, so it stops after a few
+    lines); repeated queries use binary search over the Y-sorted blocks and a
+    running maximum of their list positions.
+    """
+
+    def __init__(self, blocks: List[TextBlock]):
+        self.blocks = blocks
+        self.ys: Optional[List[float]] = None
+        self.last_index: List[int] = []
+        self.queries = 0
+
+    def _build(self) -> None:
+        order = sorted(range(len(self.blocks)), key=lambda i: self.blocks[i].y0)
+        self.ys = [self.blocks[i].y0 for i in order]
+        last = -1
+        for i in order:
+            last = max(last, i)
+            self.last_index.append(last)
+
+    def last_before(self, y: float) -> Optional[TextBlock]:
+        self.queries += 1
+        if self.queries == 1:
+            for block in reversed(self.blocks):
+                if block.y0 < y:
+                    return block
+            return None
+
+        if self.ys is None:
+            self._build()
+        count = bisect_left(self.ys, y)
+        return self.blocks[self.last_index[count - 1]] if count else None
+
+
 def extract_question_text(text_blocks: List[TextBlock], options: List[Dict[str, str]]) -> str:
     """
     Extract clean question text (before options start) - IMPROVED
@@ -875,6 +1117,8 @@ def extract_question_text(text_blocks: List[TextBlock], options: List[Dict[str,
 
     # Step 2: If we didn't find option start, look for first clear option marker
     if option_start_y is None:
+        last_block_above = None  # Built on first use
+
         for block in text_blocks:
             text = block.text.strip()
 
@@ -888,9 +1132,11 @@ def extract_question_text(text_blocks: List[TextBlock], options: List[Dict[str,
                 if label == 'A' and len(content) > 8:
                     # Double-check: not part of question like "Aşağıdakilerden A)"
                     # Real options usually don't have question words before them
-                    prev_blocks = [b for b in text_blocks if b.y0 < block.y0]
-                    if prev_blocks:
-                        last_prev = prev_blocks[-1].text.lower()
+                    if last_block_above is None:
+                        last_block_above = BlockAbove(text_blocks)
+                    prev_block = last_block_above.last_before(block.y0)
+                    if prev_block is not None:
+                        last_prev = prev_block.text.lower()
                         # If previous block has question indicators, this might not be option
                         if any(word in last_prev for word in ['hangisi', 'aşağıdaki', 'hangi', 'which']):
                             continue
@@ -924,11 +1170,11 @@ def extract_question_text(text_blocks: List[TextBlock], options: List[Dict[str,
         if re.match(r'^(sayfa|page)\s*\d+', text, re.IGNORECASE):
             continue
 
-        # Add to question
-        question_parts.append(text)
+        # Add to question (unstripped block text keeps its NormalizedText marker)
+        question_parts.append(block.text)
 
     # Step 4: Join and clean
-    question_text = ' '.join(question_parts)
+    question_text = join_normalized(question_parts)
 
     # Apply Turkish encoding fixes
     question_text = fix_turkish_encoding(question_text)
@@ -939,16 +1185,50 @@ def extract_question_text(text_blocks: List[TextBlock], options: List[Dict[str,
     return question_text.strip()
 
 
-def extract_with_ocr_hybrid(page: fitz.Page, crop_rect: fitz.Rect, text_blocks: List[TextBlock]) -> str:
+def extract_fallback_text(text_blocks: List[TextBlock]) -> Tuple[str, str, List[str]]:
+    """Question text, stem and options from the PDF text layer (no Vision)"""
+    options = extract_options_with_clustering(text_blocks)
+    question_text, question_stem = extract_question_stem(text_blocks)
+
+    # Fallback to old method if stem extraction didn't work
+    if not question_text.strip():
+        question_text = extract_question_text(text_blocks, options)
+
+    return question_text, question_stem, options
+
+
+def pymupdf_text_insufficient(text_blocks: List[TextBlock]) -> bool:
+    """True when the text layer is too short/empty and OCR should be tried"""
+    return len(' '.join(b.text for b in text_blocks).strip()) <= 20
+
+
+def render_ocr_image(page: fitz.Page, crop_rect: fitz.Rect, raster: Optional[PageRasterCache] = None) -> Image.Image:
+    """Crop pixels for Tesseract at OCR_RENDER_SCALE (no PNG encode/decode round-trip)"""
+    view = raster.cached_view(page, crop_rect, OCR_RENDER_SCALE) if raster is not None else None
+    if view is None:
+        mat = fitz.Matrix(OCR_RENDER_SCALE, OCR_RENDER_SCALE)
+        view = CropView(page.get_pixmap(matrix=mat, clip=crop_rect))
+    # Read later on an OCR thread, after the pixmap (or the page raster) is gone
+    return view.detached_image()
+
+
+def extract_with_ocr_hybrid(
+    page: fitz.Page,
+    crop_rect: fitz.Rect,
+    text_blocks: List[TextBlock],
+    raster: Optional[PageRasterCache] = None,
+    ocr_future: Optional[Future] = None,
+) -> str:
     """
     Hybrid text extraction: PyMuPDF + OCR merge
     Only use OCR when PyMuPDF text is insufficient
+    (ocr_future: OCR already queued on the pool for this crop)
     """
     # First: Use PyMuPDF text
     pymupdf_text = ' '.join(b.text for b in text_blocks)
 
     # Check if text is good enough
-    if len(pymupdf_text.strip()) > 20:
+    if not pymupdf_text_insufficient(text_blocks):
         return pymupdf_text
 
     # Text is too short/empty - try OCR
@@ -956,28 +1236,34 @@ def extract_with_ocr_hybrid(page: fitz.Page, crop_rect: fitz.Rect, text_blocks:
         return pymupdf_text
 
     try:
-        mat = fitz.Matrix(2.0, 2.0)
-        pix = page.get_pixmap(matrix=mat, clip=crop_rect)
-
-        img_data = pix.tobytes("png")
-        img = Image.open(io.BytesIO(img_data))
+        if ocr_future is None:
+            ocr_future = get_ocr_pool().submit(render_ocr_image(page, crop_rect, raster))
 
-        ocr_text = pytesseract.image_to_string(img, lang='tur+eng')
-        ocr_text = fix_turkish_encoding(ocr_text)
+        ocr_text = fix_turkish_encoding(ocr_future.result())
 
         # Merge: if OCR gives more text, use it
         if len(ocr_text.strip()) > len(pymupdf_text.strip()):
-            print(f"      🔍 OCR extracted {len(ocr_text)} chars (PyMuPDF: {len(pymupdf_text)})")
+            logger.debug("🔍 OCR extracted %d chars (PyMuPDF: %d)", len(ocr_text), len(pymupdf_text))
             return ocr_text
 
     except Exception as e:
-        print(f"      ⚠️  OCR failed: {e}")
+        logger.warning("⚠️  OCR failed: %s", e)
 
     return pymupdf_text
 
 
-def crop_question_image(page: fitz.Page, question_block: QuestionBlock) -> Optional[str]:
-    """Crop question area with high quality"""
+def crop_question_image(
+    page: fitz.Page,
+    question_block: QuestionBlock,
+    options: RenderOptions = DEFAULT_RENDER_OPTIONS,
+    timer: Optional[StageTimer] = None,
+    raster: Optional[PageRasterCache] = None,
+) -> Optional[bytes]:
+    """
+    Crop question area with high quality (encoded per options, PNG by default)
+    With a page raster cache the crop is sliced from the page's single render.
+    """
+    timer = timer or StageTimer()
     try:
         crop_rect = fitz.Rect(
             question_block.x0,
@@ -989,207 +1275,534 @@ def crop_question_image(page: fitz.Page, question_block: QuestionBlock) -> Optio
         if not crop_rect.is_valid or crop_rect.is_empty:
             return None
 
-        # Render at 2x for quality
-        mat = fitz.Matrix(2.0, 2.0)
-        pix = page.get_pixmap(matrix=mat, clip=crop_rect)
+        # Render at options.scale (2x by default) for quality
+        with timer.stage("render"):
+            if raster is not None:
+                view = raster.view(page, crop_rect)
+            else:
+                view = CropView(render_pixmap(page, crop_rect, options))
 
-        img_bytes = pix.tobytes("png")
-        img_base64 = base64.b64encode(img_bytes).decode('utf-8')
+        if view is None:
+            return None
 
-        return f"data:image/png;base64,{img_base64}"
+        with timer.stage("encode"):
+            return encode_crop(view, options)
 
     except Exception as e:
-        print(f"      ❌ Crop failed: {e}")
+        logger.warning("❌ Crop failed: %s", e)
         return None
 
 
-def parse_pdf_with_ocr(pdf_bytes: bytes) -> List[Question]:
+def parser_settings(render: RenderOptions = DEFAULT_RENDER_OPTIONS, selection: Selection = FULL_DOCUMENT) -> Dict[str, Any]:
+    """Settings that change parse output (part of the result cache key)"""
+    settings = {
+        "vision": bool(OPENAI_AVAILABLE and OPENAI_API_KEY),
+        "vision_model": OPENAI_VISION_MODEL,
+        "ocr": OCR_AVAILABLE,
+        "page_ocr": PAGE_OCR_MODE if OCR_AVAILABLE else "off",
+        "render": render.settings(),
+    }
+    if VISION_ROUTING != "all":  # Keys of the default mode stay as they were
+        settings["vision_routing"] = {"mode": VISION_ROUTING, "min_confidence": VISION_MIN_CONFIDENCE}
+    if VISION_IMAGE_PREP:
+        settings["vision_image_prep"] = {"min_line_px": VISION_MIN_LINE_PX}
+    if selection.active:  # Full-document keys stay as they were
+        settings["selection"] = selection.settings()
+    return settings
+
+
+def parse_pdf_with_ocr(
+    pdf: PdfSource,
+    workers: Optional[int] = None,
+    render: RenderOptions = DEFAULT_RENDER_OPTIONS,
+    timer: Optional[StageTimer] = None,
+    selection: Selection = FULL_DOCUMENT,
+) -> List[Question]:
     """
     Main parser with advanced segmentation
+
+    pdf: the PDF bytes or a path to the file
+    workers: segmentation processes (None → PDF_PARSE_WORKERS, 0 → all cores)
+    render: crop scale / format / encoder settings
+    timer: collects per-stage timings when given
+    selection: pages / questions to parse, or a preview (see selection.py)
     """
-    pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
-    all_question_blocks = []
-    unique_id = 1
+    questions = [
+        event["question"]
+        for event in iter_parse_events(pdf, workers=workers, render=render, timer=timer, selection=selection)
+        if event["type"] == "question"
+    ]
 
-    print(f"\n📄 Processing {len(pdf_document)} pages...")
+    logger.info("✅ Successfully parsed %d questions", len(questions))
+    return questions
 
-    # Step 0: First, detect answer key pages (so we can skip them)
-    print(f"\n🔑 Detecting answer key pages...")
-    answer_keys, answer_key_pages = extract_answer_key_from_pdf(pdf_document)
 
-    if answer_key_pages:
-        print(f"   📍 Answer key pages to skip: {[p + 1 for p in answer_key_pages]}")
-    else:
-        print(f"   ⚠️  No answer key pages detected")
-
-    # Step 1: Find all question blocks across pages (SKIP answer key pages)
-    for page_num in range(len(pdf_document)):
-        # CRITICAL: Skip answer key pages!
-        if page_num in answer_key_pages:
-            print(f"\n📄 Page {page_num + 1}: ⏭️  SKIPPING (contains answer key)")
-            continue
+def iter_parse_events(
+    pdf: PdfSource,
+    workers: Optional[int] = None,
+    skip_questions: int = 0,
+    resume_subject: Optional[str] = None,
+    render: RenderOptions = DEFAULT_RENDER_OPTIONS,
+    timer: Optional[StageTimer] = None,
+    selection: Selection = FULL_DOCUMENT,
+):
+    """
+    Incremental parser: yields events as soon as each piece of work is done
+
+    skip_questions / resume_subject resume an interrupted parse: the first
+    `skip_questions` questions are segmented (to keep IDs stable) but not
+    cropped, analyzed or emitted, and subject tracking continues from
+    `resume_subject` (the subject of the last question already delivered).
+    `selection` limits the parse to some pages / questions (see selection.py).
+
+    Event types (dicts with a "type" key):
+    - start:      {"pages": n}
+    - answer_key: {"pages": [...], "subjects": {"TÜRKÇE": 40, ...}}  (before segmentation)
+    - progress:   {"pages_done", "pages_total", "questions_found"}   (after each page)
+    - question:   {"question": Question}                            (in question order)
+    - summary:    {"total_questions", "pages", "answer_key_subjects", "timings",
+                   "text_extraction"}  (text layer extractions per page, see PageTextCache)
+
+    Pages are segmented lazily, so the first question is emitted after the
+    first page rather than after the whole document.
+    """
+    try:
+        pdf_document = open_pdf(pdf)
+        try:
+            yield from _iter_parse_document(
+                pdf_document, pdf, workers, skip_questions, resume_subject, render, timer or StageTimer(), selection
+            )
+        finally:
+            pdf_document.close()
+    except Exception:
+        observe_parse_failure()
+        raise
+
+
+def _iter_parse_document(
+    pdf_document: fitz.Document,
+    pdf: PdfSource,
+    workers: Optional[int],
+    skip_questions: int,
+    resume_subject: Optional[str],
+    render: RenderOptions,
+    timer: StageTimer,
+    selection: Selection,
+):
+    total_pages = len(pdf_document)
+    logger.info("📄 Processing %d pages", total_pages)
+    yield {"type": "start", "pages": total_pages}
+
+    # Unselected pages are never read; the answer key candidates always are
+    selected_pages = [page_num for page_num in range(total_pages) if selection.wants_page(page_num)]
+    if selection.active:
+        logger.info("✂️  Selection: %s (%d of %d pages)", selection.settings(), len(selected_pages), total_pages)
+
+    # Each page's text layer is extracted once, whoever reads it first
+    texts = PageTextCache(pdf_document)
+    # One render per page shared by crops and OCR (optional, identical pixels)
+    raster = PageRasterCache(render) if PARSE_PAGE_RASTER else None
+    # Crop OCR fallbacks queued ahead of the consumer
+    ocr_futures: List[Future] = []
+    scanned = None
+    try:
+        # Pages without a text layer are OCR'd whole, answer key candidates first
+        scanned = find_scanned_pages(
+            pdf_document,
+            answer_key_candidate_pages(pdf_document),
+            timer,
+            texts,
+            selected_pages if selection.pages is not None else None,
+        )
 
-        page = pdf_document[page_num]
-        print(f"\n📄 Page {page_num + 1}:")
+        # Step 0: First, detect answer key pages (so we can skip them)
+        logger.debug("🔑 Detecting answer key pages")
+        with timer.stage("answer_key"):
+            answer_keys, answer_key_pages = extract_answer_key_from_pdf(pdf_document, scanned, texts)
 
-        page_question_blocks = find_question_blocks(page, page_num + 1, unique_id)
-        all_question_blocks.extend(page_question_blocks)
-        unique_id += len(page_question_blocks)
+        if answer_key_pages:
+            logger.info("📍 Answer key pages to skip: %s", [p + 1 for p in answer_key_pages])
+        else:
+            logger.info("⚠️  No answer key pages detected")
+
+        # Step 1: Display answer key summary
+        if answer_keys:
+            total_answers = sum(len(answers) for answers in answer_keys.values())
+            logger.info(
+                "📋 Answer key: %d answers across %d subject(s) (%s)",
+                total_answers,
+                len(answer_keys),
+                ", ".join(f"{subj}: Q1-Q{max(answers.keys())}" for subj, answers in answer_keys.items()),
+            )
+        else:
+            logger.info("⚠️  No answer key found in PDF")
 
-    print(f"\n📊 Total questions found: {len(all_question_blocks)}")
+        yield {
+            "type": "answer_key",
+            "pages": [p + 1 for p in answer_key_pages],
+            "subjects": {subj: len(answers) for subj, answers in answer_keys.items()},
+        }
 
-    # Step 2: Display answer key summary
-    print(f"\n📋 Answer Key Summary:")
-    if answer_keys:
-        total_answers = sum(len(answers) for answers in answer_keys.values())
-        print(f"   ✅ Found {total_answers} answers across {len(answer_keys)} subject(s)")
-        for subj, answers in answer_keys.items():
-            print(f"      📚 {subj}: {len(answers)} answers (Q1-Q{max(answers.keys())})")
-    else:
-        print(f"   ⚠️  No answer key found in PDF")
+        # A page selection starting mid-booklet: find the subject it starts in
+        subject_list = list(answer_keys.keys()) if answer_keys else []
+        first_subject = subject_list[0] if subject_list else None
+        skipped_leading = [
+            page_num for page_num in range(selected_pages[0] if selected_pages else 0)
+            if page_num not in answer_key_pages
+        ]
+        if skipped_leading and len(subject_list) > 1:
+            first_subject = find_starting_subject(texts, skipped_leading, subject_list, scanned)
+            if first_subject:
+                logger.info("📚 Selection starts in %s (heading on a skipped page)", first_subject)
+            else:
+                logger.info("📚 No subject heading on the skipped pages: answer key subjects are not assigned by position")
+
+        # Step 2: Find question blocks page by page (SKIP answer key pages)
+        page_indices = []
+        for page_num in range(total_pages):
+            # CRITICAL: Skip answer key pages!
+            if page_num in answer_key_pages:
+                logger.debug("📄 Page %d: ⏭️  SKIPPING (contains answer key)", page_num + 1)
+                texts.release(page_num)
+                continue
+            if not selection.wants_page(page_num):
+                texts.release(page_num)  # Only read as an answer key candidate
+                continue
+            page_indices.append(page_num)
+
+        def selected(unique_id: int) -> bool:
+            return unique_id > skip_questions and selection.wants_question(unique_id)
+
+        # Progress events raised while the lazy pipeline pulls pages; drained by the main loop
+        pending_events = []
+
+        def iter_question_blocks():
+            """
+            Segment pages on demand and assign document-wide IDs in page order
+
+            Stops after the page holding the last selected question.
+            """
+            unique_id = 1
+            selected_found = 0
+            for pages_done, (_, page_question_blocks) in enumerate(
+                timer.iter("segment", iter_page_question_blocks(pdf_document, pdf, page_indices, workers, scanned, texts)),
+                start=1,
+            ):
+                for q_block in page_question_blocks:
+                    q_block.unique_id = unique_id
+                    selected_found += selected(unique_id)
+                    unique_id += 1
+                pending_events.append({
+                    "type": "progress",
+                    "pages_done": pages_done,
+                    "pages_total": len(page_indices),
+                    "questions_found": unique_id - 1,
+                })
+                yield from page_question_blocks
+                if selection.complete(unique_id - 1, selected_found):
+                    logger.info("✂️  Selection complete after %d of %d pages", pages_done, len(page_indices))
+                    break
 
-    subject_list = list(answer_keys.keys()) if answer_keys else []
-    subject_index = 0
-    subject_question_count = 0
-    current_subject = None
+            logger.info("📊 Total questions found: %d", unique_id - 1)
+
+        use_vision = OPENAI_AVAILABLE and OPENAI_API_KEY and selection.enrich
+        route_by_confidence = use_vision and VISION_ROUTING == "confidence"
+        # Text layer extractions of questions routed away from Vision (by unique ID, used once)
+        local_extractions: Dict[int, Tuple[str, str, List[Dict[str, str]]]] = {}
+        routed = {"vision": 0, "text_layer": 0}
+        vision_images = VisionImageTotals()
+        image_store = get_image_store()
+
+        def iter_cropped_questions():
+            """
+            Crop each question and prepare its Vision request (consumed lazily)
+
+            Questions are handed on a page at a time, so OCR fallbacks of one page
+            are queued on the OCR pool together and run in parallel.
+            """
+            # Unknown start subject: no answer key subject is assigned by position
+            subject_index = subject_list.index(first_subject) if first_subject else None
+            # Past a skipped page the next question 1 starts a new subject
+            subject_question_count = 1 if skipped_leading else 0
+            page_items = []
+            chosen = 0  # Selected questions so far (previews stop at selection.preview)
+
+            for q_block in iter_question_blocks():
+                if page_items and page_items[-1][0][0].page_num != q_block.page_num:
+                    yield from page_items
+                    page_items = []
+
+                # Determine subject (simple heuristic: reset counter when PDF number repeats)
+                if q_block.pdf_number == 1 and subject_question_count > 0 and subject_index is not None:
+                    # New subject started
+                    subject_index = min(subject_index + 1, len(subject_list) - 1)
+
+                key_subject = None
+                if subject_index is not None and subject_index < len(subject_list):
+                    key_subject = subject_list[subject_index]
+                subject_question_count += 1
+
+                # Resuming (already delivered) or not selected: only subject tracking has to advance
+                if not selected(q_block.unique_id) or (selection.preview is not None and chosen >= selection.preview):
+                    page_items.append(((q_block, key_subject, None, None, False), None))
+                    continue
+                chosen += 1
+
+                # STEP 1: Crop image with PyMuPDF (HIGH QUALITY - Don't touch!)
+                page = pdf_document[q_block.page_num - 1]
+                image_bytes = crop_question_image(page, q_block, render, timer, raster)
+                with timer.stage("store"):
+                    image_digest = image_store.put(image_bytes) if image_bytes else None
+
+                vision_request = None
+                if use_vision and image_bytes and route_by_confidence:
+                    with timer.stage("extract"):
+                        local = extract_fallback_text(q_block.text_blocks)
+                    confidence = text_confidence(local[0], local[2])
+                    route = "vision" if needs_vision(confidence) else "text_layer"
+                    logger.debug("🧭 ID=%d → %s (confidence %.2f%s)", q_block.unique_id, route, confidence.score,
+                                 f": {', '.join(confidence.reasons)}" if confidence.reasons else "")
+                    routed[route] += 1
+                    observe_vision_route(route)
+                    if route == "text_layer":
+                        local_extractions[q_block.unique_id] = local
+                if use_vision and image_bytes and q_block.unique_id not in local_extractions:
+                    if VISION_IMAGE_PREP:
+                        with timer.stage("vision_prep"):
+                            prepared = prepare_vision_image(image_bytes, OPENAI_VISION_MODEL)
+                        vision_images.add(prepared)
+                        observe_vision_image(prepared.detail, prepared.tokens)
+                        logger.debug("🧩 ID=%d: %s detail, %d → %d tile(s), ~%d → ~%d tokens, %d → %d bytes",
+                                     q_block.unique_id, prepared.detail, prepared.original_tiles, prepared.tiles,
+                                     prepared.original_tokens, prepared.tokens, prepared.original_bytes, len(prepared.data))
+                        vision_request = VisionRequest(
+                            image_data_uri(prepared.data), key_subject, q_block.pdf_number, prepared.detail
+                        )
+                    else:
+                        vision_request = VisionRequest(image_data_uri(image_bytes), key_subject, q_block.pdf_number)
+
+                # Without Vision, crops whose text layer yields no question text go
+                # to OCR now (tiny text, so checking costs next to nothing)
+                ocr_future = None
+                if (
+                    vision_request is None
+                    and selection.enrich
+                    and OCR_AVAILABLE
+                    and pymupdf_text_insufficient(q_block.text_blocks)
+                    and not extract_fallback_text(q_block.text_blocks)[0].strip()
+                ):
+                    crop_rect = fitz.Rect(q_block.x0, q_block.y0, q_block.x1, q_block.y1)
+                    with timer.stage("ocr"):
+                        ocr_future = get_ocr_pool().submit(render_ocr_image(page, crop_rect, raster))
+                    ocr_futures.append(ocr_future)
 
-    # Step 3: Process each question block
-    questions = []
+                page_items.append(((q_block, key_subject, image_digest, ocr_future, True), vision_request))
 
-    for q_block in all_question_blocks:
-        try:
-            page = pdf_document[q_block.page_num - 1]
+            yield from page_items
 
-            # Determine subject (simple heuristic: reset counter when PDF number repeats)
-            if q_block.pdf_number == 1 and subject_question_count > 0:
-                # New subject started
-                subject_index = min(subject_index + 1, len(subject_list) - 1)
+        # Step 3: Process each question block
+        # Vision requests run concurrently (bounded); results arrive in question order.
+        # With OPENAI_VISION_BATCH_SIZE > 1 the crops of a page share requests.
+        total_questions = 0
+        current_subject = resume_subject
 
-            if subject_list and subject_index < len(subject_list):
-                current_subject = subject_list[subject_index]
-            subject_question_count += 1
+        vision_results = timer.iter("vision_wait", iter_vision_results(
+            iter_cropped_questions(), group_of=lambda item: item[0].page_num,
+        ))
+        for (q_block, key_subject, image_digest, ocr_future, emit), openai_result in vision_results:
+            while pending_events:
+                yield pending_events.pop(0)
 
-            # STEP 1: Crop image with PyMuPDF (HIGH QUALITY - Don't touch!)
-            image_base64 = crop_question_image(page, q_block)
+            if key_subject:
+                current_subject = key_subject
 
-            # STEP 2: HYBRID MODE - Try OpenAI Vision first, fallback to PyMuPDF
-            if OPENAI_AVAILABLE and OPENAI_API_KEY and image_base64:
-                print(f"      🤖 Using OpenAI Vision for text extraction...")
-                openai_result = analyze_question_with_openai_vision(
-                    image_base64=image_base64,
-                    subject=current_subject,
-                    question_number=q_block.pdf_number
-                )
+            if not emit:
+                continue
 
-                question_text = openai_result.get("text", "")
-                question_stem = openai_result.get("stem", "")
-                options = openai_result.get("options", [])
+            try:
+                page = pdf_document[q_block.page_num - 1]
 
-                # OpenAI detects subject/topic/difficulty
-                openai_subject = openai_result.get("subject")
-                topic = openai_result.get("topic")
-                subtopic = openai_result.get("subtopic")
-                difficulty = openai_result.get("difficulty")
+                # STEP 2: HYBRID MODE - Try OpenAI Vision first, fallback to PyMuPDF
+                if openai_result is not None:
+                    logger.debug("🤖 Using OpenAI Vision for text extraction")
 
-                # Prefer OpenAI's subject detection over PDF answer key subject
-                # IMPORTANT: Normalize for matching with answer key
-                if openai_subject:
-                    current_subject = normalize_subject_name(openai_subject)
+                    question_text = openai_result.get("text", "")
+                    question_stem = openai_result.get("stem", "")
+                    options = openai_result.get("options", [])
 
-                # OpenAI might detect answer in image (rare)
-                openai_answer = openai_result.get("answer")
+                    # OpenAI detects subject/topic/difficulty
+                    openai_subject = openai_result.get("subject")
+                    topic = openai_result.get("topic")
+                    subtopic = openai_result.get("subtopic")
+                    difficulty = openai_result.get("difficulty")
 
-            else:
-                # FALLBACK: PyMuPDF text extraction
-                print(f"      📄 Using PyMuPDF for text extraction...")
-                options = extract_options_with_clustering(q_block.text_blocks)
-                question_text, question_stem = extract_question_stem(q_block.text_blocks)
+                    # Prefer OpenAI's subject detection over PDF answer key subject
+                    # IMPORTANT: Normalize for matching with answer key
+                    if openai_subject:
+                        current_subject = normalize_subject_name(openai_subject)
 
-                # Fallback to old method if stem extraction didn't work
-                if not question_text.strip():
-                    question_text = extract_question_text(q_block.text_blocks, options)
+                    # OpenAI might detect answer in image (rare)
+                    openai_answer = openai_result.get("answer")
 
-                # If text still empty, use hybrid OCR
-                if not question_text.strip():
-                    crop_rect = fitz.Rect(q_block.x0, q_block.y0, q_block.x1, q_block.y1)
-                    question_text = extract_with_ocr_hybrid(page, crop_rect, q_block.text_blocks)
-
-                topic = None
-                subtopic = None
-                difficulty = None
-                openai_answer = None
-
-            # Match answer from PDF answer key (has priority over OpenAI)
-            answer = None
-            answer_source = None  # Track where answer came from
-
-            # Try matching with current subject
-            if current_subject and answer_keys.get(current_subject):
-                answer = answer_keys[current_subject].get(q_block.pdf_number)
-                if answer:
-                    answer_source = f"PDF Answer Key ({current_subject})"
-                    print(f"      ✅ Matched answer: Q#{q_block.pdf_number} = {answer} ({current_subject})")
                 else:
-                    print(f"      ⚠️  Q#{q_block.pdf_number} not found in {current_subject} answer key")
-
-            # If no match, try all subjects (maybe subject detection failed)
-            if not answer and answer_keys:
-                print(f"      🔍 Searching all subjects for Q#{q_block.pdf_number}...")
-                for subj, answers in answer_keys.items():
-                    if q_block.pdf_number in answers:
-                        answer = answers[q_block.pdf_number]
-                        answer_source = f"PDF Answer Key ({subj})"
-                        print(f"      ✅ Found in {subj}: Q#{q_block.pdf_number} = {answer}")
-                        # Update current_subject to matched subject
-                        if not current_subject:
-                            current_subject = subj
-                        break
-
-            # If no answer key in PDF, use OpenAI's answer (if available)
-            if not answer and openai_answer:
-                answer = openai_answer
-                answer_source = "OpenAI Vision"
-                print(f"      🤖 Using OpenAI answer: {answer}")
-
-            # Log answer source
-            if answer_source:
-                print(f"      📝 Answer: {answer} (from {answer_source})")
-
-            # Create question
-            question = Question(
-                id=q_block.unique_id,
-                text=question_text,
-                stem=question_stem,
-                options=options,
-                answer=answer,  # From answer key or OpenAI
-                image_base64=image_base64,
-                subject=current_subject,
-                topic=topic,
-                subtopic=subtopic,
-                difficulty=difficulty,
-                answer_source=answer_source,
-                pdf_question_number=q_block.pdf_number,
-            )
-
-            questions.append(question)
+                    # FALLBACK: PyMuPDF text extraction
+                    logger.debug("📄 Using PyMuPDF for text extraction")
+                    with timer.stage("extract"):
+                        local = local_extractions.pop(q_block.unique_id, None)
+                        question_text, question_stem, options = local or extract_fallback_text(q_block.text_blocks)
+
+                    # If text still empty, use hybrid OCR (not for previews)
+                    if not question_text.strip() and selection.enrich:
+                        crop_rect = fitz.Rect(q_block.x0, q_block.y0, q_block.x1, q_block.y1)
+                        with timer.stage("ocr"):
+                            question_text = extract_with_ocr_hybrid(
+                                page, crop_rect, q_block.text_blocks, raster, ocr_future
+                            )
+
+                    topic = None
+                    subtopic = None
+                    difficulty = None
+                    openai_answer = None
+
+                # Match answer from PDF answer key (has priority over OpenAI)
+                answer = None
+                answer_source = None  # Track where answer came from
+
+                # Try matching with current subject
+                if current_subject and answer_keys.get(current_subject):
+                    answer = answer_keys[current_subject].get(q_block.pdf_number)
+                    if answer:
+                        answer_source = f"PDF Answer Key ({current_subject})"
+                        logger.debug("✅ Matched answer: Q#%s = %s (%s)", q_block.pdf_number, answer, current_subject)
+                    else:
+                        logger.debug("⚠️  Q#%s not found in %s answer key", q_block.pdf_number, current_subject)
+
+                # If no match, try all subjects (maybe subject detection failed;
+                # not when the selection's start subject is unknown)
+                if not answer and answer_keys and (first_subject or current_subject):
+                    logger.debug("🔍 Searching all subjects for Q#%s", q_block.pdf_number)
+                    for subj, answers in answer_keys.items():
+                        if q_block.pdf_number in answers:
+                            answer = answers[q_block.pdf_number]
+                            answer_source = f"PDF Answer Key ({subj})"
+                            logger.debug("✅ Found in %s: Q#%s = %s", subj, q_block.pdf_number, answer)
+                            # Update current_subject to matched subject
+                            if not current_subject:
+                                current_subject = subj
+                            break
+
+                # If no answer key in PDF, use OpenAI's answer (if available)
+                if not answer and openai_answer:
+                    answer = openai_answer
+                    answer_source = "OpenAI Vision"
+                    logger.debug("🤖 Using OpenAI answer: %s", answer)
+
+                # Log answer source
+                if answer_source:
+                    logger.debug("📝 Answer: %s (from %s)", answer, answer_source)
+
+                # Create question
+                question = Question(
+                    id=q_block.unique_id,
+                    text=question_text,
+                    stem=question_stem,
+                    options=options,
+                    answer=answer,  # From answer key or OpenAI
+                    image_digest=image_digest,
+                    subject=current_subject,
+                    topic=topic,
+                    subtopic=subtopic,
+                    difficulty=difficulty,
+                    answer_source=answer_source,
+                    pdf_question_number=q_block.pdf_number,
+                )
 
-            print(f"   ✅ ID={q_block.unique_id} (PDF#{q_block.pdf_number}): "
-                  f"subject={current_subject}, "
-                  f"topic={topic}, "
-                  f"subtopic={subtopic}, "
-                  f"difficulty={difficulty}, "
-                  f"text={len(question_text)} chars, "
-                  f"options={len(options)}, "
-                  f"answer={answer}")
+                total_questions += 1
 
-        except Exception as e:
-            print(f"   ❌ ID={q_block.unique_id} failed: {e}")
-            continue
+                logger.debug(
+                    "✅ ID=%d (PDF#%s): subject=%s, topic=%s, subtopic=%s, difficulty=%s, "
+                    "text=%d chars, options=%d, answer=%s",
+                    q_block.unique_id, q_block.pdf_number, current_subject, topic, subtopic, difficulty,
+                    len(question_text), len(options), answer,
+                )
 
-    pdf_document.close()
+            except Exception as e:
+                logger.warning("❌ ID=%d failed: %s", q_block.unique_id, e)
+                continue
 
-    print(f"\n✅ Successfully parsed {len(questions)} questions")
-    return questions
+            yield {"type": "question", "question": question}
+
+        while pending_events:
+            yield pending_events.pop(0)
+
+        text_extraction = texts.snapshot()
+        logger.debug("📑 Text layer: %d extraction(s) for %d page(s)", text_extraction["extractions"], text_extraction["pages"])
+        if text_extraction["repeated"]:
+            logger.warning("⚠️  Pages extracted more than once: %s", text_extraction["repeated"])
+
+        timings = timer.snapshot()
+        observe_parse(timings, total_pages, total_questions)
+
+        yield {
+            "type": "summary",
+            "total_questions": total_questions,
+            "pages": total_pages,
+            "answer_key_subjects": list(answer_keys.keys()),
+            "timings": timings,
+            "text_extraction": text_extraction,
+            **({"vision_routing": routed} if route_by_confidence else {}),
+            **({"vision_images": vision_images.snapshot()} if vision_images.images else {}),
+            **({"selection": selection.settings()} if selection.active else {}),
+        }
+    finally:
+        # Also on early close (client disconnect, cancelled job): drop queued OCR, free pages
+        for future in ocr_futures:
+            future.cancel()
+        if scanned is not None:
+            scanned.close()
+        if raster is not None:
+            raster.release()
+        texts.close()
+
+
+def question_to_json(q: Question) -> Dict[str, Any]:
+    """
+    Convert one question to API response format
+    Matches PostgreSQL JSONB structure for questions table
+    """
+    return {
+        "id": q.id,
+        "pdf_question_number": q.pdf_question_number,  # Original PDF number
+
+        # Metadata fields (from answer key + OpenAI)
+        "subject": q.subject,  # From answer key: TÜRKÇE, MATEMATİK, etc.
+        "topic": q.topic,  # From OpenAI
+        "subtopic": q.subtopic,  # From OpenAI
+        "difficulty": q.difficulty,  # From OpenAI: "easy", "medium", "hard"
+        "format": "multiple_choice",
+        "tags": [],
+
+        # Content structure
+        "content": {
+            "text": q.text,  # Full question text
+            "stem": q.stem,  # Bold question root/core
+            "options": q.options,  # [{"label": "A", "value": "..."}, ...]
+            "image": image_url(q.image_digest),  # /api/images/{digest} (see images.inline_images)
+        },
+
+        # Answer and solution
+        "answer_key": {
+            "correct": q.answer,  # "A", "B", etc.
+            "explanation": None,
+            "source": q.answer_source,  # Where answer came from
+        } if q.answer else None,
+
+        "solution": None,  # Can add step-by-step solution later
+
+        # Ownership and visibility (for database compatibility)
+        "owner_type": None,  # Can be: "user", "admin", "system"
+        "visibility": None,  # Can be: "public", "private", "shared"
+    }
 
 
 def questions_to_json(questions: List[Question]) -> Dict[str, Any]:
@@ -1200,40 +1813,5 @@ def questions_to_json(questions: List[Question]) -> Dict[str, Any]:
     return {
         "success": True,
         "total_questions": len(questions),
-        "questions": [
-            {
-                "id": q.id,
-                "pdf_question_number": q.pdf_question_number,  # Original PDF number
-
-                # Metadata fields (from answer key + OpenAI)
-                "subject": q.subject,  # From answer key: TÜRKÇE, MATEMATİK, etc.
-                "topic": q.topic,  # From OpenAI
-                "subtopic": q.subtopic,  # From OpenAI
-                "difficulty": q.difficulty,  # From OpenAI: "easy", "medium", "hard"
-                "format": "multiple_choice",
-                "tags": [],
-
-                # Content structure
-                "content": {
-                    "text": q.text,  # Full question text
-                    "stem": q.stem,  # Bold question root/core
-                    "options": q.options,  # [{"label": "A", "value": "..."}, ...]
-                    "image": q.image_base64,  # Base64 image
-                },
-
-                # Answer and solution
-                "answer_key": {
-                    "correct": q.answer,  # "A", "B", etc.
-                    "explanation": None,
-                    "source": q.answer_source,  # Where answer came from
-                } if q.answer else None,
-
-                "solution": None,  # Can add step-by-step solution later
-
-                # Ownership and visibility (for database compatibility)
-                "owner_type": None,  # Can be: "user", "admin", "system"
-                "visibility": None,  # Can be: "public", "private", "shared"
-            }
-            for q in questions
-        ]
-    }
\ No newline at end of file
+        "questions": [question_to_json(q) for q in questions]
+    }
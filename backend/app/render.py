@@ -0,0 +1,192 @@
+"""
+Rendering and encoding of question crops
+
+RenderOptions holds the knobs that trade image fidelity for speed and size:
+render scale, output format (PNG, JPEG, WebP), encoder quality / PNG
+compression level and grayscale. Server defaults come from PARSE_IMAGE_*
+environment variables; /api/parse-pdf accepts per-request overrides.
+The defaults reproduce the original output (2x, PyMuPDF's PNG encoder).
+
+With PARSE_PAGE_RASTER=true each page is rasterized once (PageRasterCache)
+and question crops, OCR input and Vision images are slices of that buffer.
+MuPDF renders a clip with exactly the pixels of the full-page render, so the
+output is identical to per-crop rendering.
+"""
+import io
+import os
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+import fitz  # PyMuPDF
+from PIL import Image, ImageChops
+
+PARSE_IMAGE_SCALE = float(os.getenv("PARSE_IMAGE_SCALE", "2.0"))
+PARSE_IMAGE_FORMAT = os.getenv("PARSE_IMAGE_FORMAT", "png").lower()
+PARSE_IMAGE_QUALITY = int(os.getenv("PARSE_IMAGE_QUALITY", "85"))
+# Empty → PyMuPDF's PNG encoder; 0-9 → Pillow with that zlib level
+PARSE_PNG_COMPRESSION = int(os.getenv("PARSE_PNG_COMPRESSION")) if os.getenv("PARSE_PNG_COMPRESSION") else None
+PARSE_IMAGE_GRAYSCALE = os.getenv("PARSE_IMAGE_GRAYSCALE", "never").lower()
+# Tesseract needs resolution: OCR renders keep their own scale
+OCR_RENDER_SCALE = float(os.getenv("PARSE_OCR_SCALE", "2.0"))
+# Render each page once and slice crops from it instead of one render per crop
+PARSE_PAGE_RASTER = os.getenv("PARSE_PAGE_RASTER", "false").lower() in ("1", "true", "yes")
+
+IMAGE_FORMATS = ("png", "jpeg", "webp")
+GRAYSCALE_MODES = ("never", "always", "auto")
+
+
+@dataclass(frozen=True)
+class RenderOptions:
+    """How question crops are rasterized and encoded"""
+    scale: float = PARSE_IMAGE_SCALE
+    image_format: str = PARSE_IMAGE_FORMAT  # png | jpeg | webp
+    quality: int = PARSE_IMAGE_QUALITY  # JPEG / WebP quality (1-100)
+    png_compression: Optional[int] = PARSE_PNG_COMPRESSION  # zlib level 0-9 (None = PyMuPDF encoder)
+    grayscale: str = PARSE_IMAGE_GRAYSCALE  # never | always | auto (crops without any color)
+
+    def validate(self) -> "RenderOptions":
+        """Raises ValueError for out-of-range settings"""
+        if not 0.5 <= self.scale <= 4.0:
+            raise ValueError("scale must be between 0.5 and 4")
+        if self.image_format not in IMAGE_FORMATS:
+            raise ValueError(f"image_format must be one of {', '.join(IMAGE_FORMATS)}")
+        if not 1 <= self.quality <= 100:
+            raise ValueError("quality must be between 1 and 100")
+        if self.png_compression is not None and not 0 <= self.png_compression <= 9:
+            raise ValueError("png_compression must be between 0 and 9")
+        if self.grayscale not in GRAYSCALE_MODES:
+            raise ValueError(f"grayscale must be one of {', '.join(GRAYSCALE_MODES)}")
+        return self
+
+    def settings(self) -> Dict[str, Any]:
+        """Part of the parse cache key: different options → different images"""
+        return asdict(self)
+
+
+def render_pixmap(page: fitz.Page, rect: Optional[fitz.Rect], options: RenderOptions) -> fitz.Pixmap:
+    """Rasterize a page region (whole page when rect is None) at options.scale"""
+    colorspace = fitz.csGRAY if options.grayscale == "always" else fitz.csRGB
+    return page.get_pixmap(matrix=fitz.Matrix(options.scale, options.scale), clip=rect, colorspace=colorspace)
+
+
+class CropView:
+    """
+    Rectangle of a rendered pixmap, read in place
+
+    image() decodes straight from the rows of the source buffer (no PNG
+    round-trip, no intermediate bytes); pixmap() is the source itself for
+    whole-pixmap views, otherwise one row copy for PyMuPDF's PNG encoder.
+
+    A grayscale image() shares the pixmap's memory without keeping the pixmap
+    alive: use detached_image() for images that outlive the view (e.g. handed
+    to the OCR pool).
+    """
+
+    def __init__(self, source: fitz.Pixmap, irect: Optional[fitz.IRect] = None):
+        self.source = source
+        self.irect = fitz.IRect(irect if irect is not None else source.irect)  # Pixmap.irect is a tuple
+        self._image: Optional[Image.Image] = None
+
+    @property
+    def n(self) -> int:
+        return self.source.n
+
+    def pixmap(self) -> fitz.Pixmap:
+        if self.irect == fitz.IRect(self.source.irect):
+            return self.source
+        crop = fitz.Pixmap(self.source.colorspace, self.irect, self.source.alpha)
+        crop.copy(self.source, self.irect)
+        return crop
+
+    def image(self) -> Image.Image:
+        if self._image is None:
+            source = self.source
+            offset = (self.irect.y0 - source.y) * source.stride + (self.irect.x0 - source.x) * source.n
+            mode = "L" if source.n == 1 else "RGB"
+            self._image = Image.frombuffer(
+                mode, (self.irect.width, self.irect.height), source.samples_mv[offset:], "raw", mode, source.stride, 1
+            )
+        return self._image
+
+    def detached_image(self) -> Image.Image:
+        """image() with its own copy of the pixels"""
+        return self.image().copy()
+
+
+class PageRasterCache:
+    """
+    The current page rendered once at the crop scale
+
+    Moving to another page releases the previous raster, so at most one page
+    is held; release() frees it when the parse is done.
+    """
+
+    def __init__(self, options: RenderOptions):
+        self.options = options
+        self.matrix = fitz.Matrix(options.scale, options.scale)
+        self.renders = 0
+        self._page_number: Optional[int] = None
+        self._bound: Optional[fitz.Rect] = None
+        self._pixmap: Optional[fitz.Pixmap] = None
+
+    def _irect(self, rect: fitz.Rect) -> fitz.IRect:
+        # Same rounding MuPDF applies to a clip: (clip ∩ page) × matrix, rounded outward
+        return ((fitz.Rect(rect) & self._bound) * self.matrix).irect
+
+    def view(self, page: fitz.Page, rect: fitz.Rect) -> Optional[CropView]:
+        """Crop of page (rendering the page first if it is not the cached one)"""
+        if self._page_number != page.number:
+            self.release()
+            self._pixmap = render_pixmap(page, None, self.options)
+            self._bound = page.rect
+            self._page_number = page.number
+            self.renders += 1
+        irect = self._irect(rect)
+        if irect.is_empty:
+            return None
+        return CropView(self._pixmap, irect)
+
+    def cached_view(self, page: fitz.Page, rect: fitz.Rect, scale: float) -> Optional[CropView]:
+        """Crop of page only if that page is cached in RGB at `scale` (never renders)"""
+        if self._page_number != page.number or self.options.scale != scale or self._pixmap.n != 3:
+            return None
+        irect = self._irect(rect)
+        return None if irect.is_empty else CropView(self._pixmap, irect)
+
+    def release(self) -> None:
+        self._pixmap = None
+        self._bound = None
+        self._page_number = None
+
+
+def is_colorless(image: Image.Image) -> bool:
+    """True when every pixel is gray (text-only and black/white figures)"""
+    if image.mode == "L":
+        return True
+    red, green, blue = image.split()
+    return (
+        ImageChops.difference(red, green).getbbox() is None
+        and ImageChops.difference(green, blue).getbbox() is None
+    )
+
+
+def encode_crop(view: CropView, options: RenderOptions) -> bytes:
+    """Encode a rendered crop as options.image_format"""
+    if options.grayscale == "auto" and view.n >= 3 and is_colorless(view.image()):
+        view = CropView(fitz.Pixmap(fitz.csGRAY, view.pixmap()))  # Lossless: R == G == B everywhere
+
+    if options.image_format == "png" and options.png_compression is None:
+        return view.pixmap().tobytes("png")
+
+    image = view.image()
+    output = io.BytesIO()
+    if options.image_format == "png":
+        image.save(output, format="PNG", compress_level=options.png_compression)
+    elif options.image_format == "jpeg":
+        image.save(output, format="JPEG", quality=options.quality)
+    else:
+        image.save(output, format="WEBP", quality=options.quality)
+    return output.getvalue()
+
+
+DEFAULT_RENDER_OPTIONS = RenderOptions().validate()
@@ -0,0 +1,93 @@
+"""
+Vision routing: which questions need OpenAI Vision at all
+
+PARSE_VISION_ROUTING=all (default) sends every crop to Vision, as before.
+With PARSE_VISION_ROUTING=confidence each question is first read from the
+PDF text layer and scored; only questions scoring below
+PARSE_VISION_MIN_CONFIDENCE go to Vision. Confident questions are returned
+from the text layer right away (no topic / subtopic / difficulty, which only
+Vision provides), so Vision calls and latency drop with the share of clean
+questions.
+
+The score starts at 1 and loses points for:
+- an option count other than 4 (LGS) or 5 (TYT/AYT), or no options at all
+- labels that do not run A, B, C... without gaps, or empty option texts
+- garbled glyphs left after fix_turkish_encoding (replacement characters,
+  private-use and control code points, stray accents, mojibake)
+- question text shorter than MIN_TEXT_CHARS
+"""
+import os
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from .logs import get_logger
+
+logger = get_logger("routing")
+
+ROUTING_MODES = ("all", "confidence")
+VISION_ROUTING = os.getenv("PARSE_VISION_ROUTING", "all").lower()
+if VISION_ROUTING not in ROUTING_MODES:
+    logger.warning("⚠️  PARSE_VISION_ROUTING=%s is not one of %s - using 'all'", VISION_ROUTING, ", ".join(ROUTING_MODES))
+    VISION_ROUTING = "all"
+VISION_MIN_CONFIDENCE = float(os.getenv("PARSE_VISION_MIN_CONFIDENCE", "0.8"))
+
+OPTION_COUNTS = (4, 5)
+MIN_TEXT_CHARS = 20
+# Left over when a PDF's Turkish glyphs are not mapped back, or from UTF-8 read as Latin-1
+GARBLED_CHARS = frozenset("\ufffd¸˘¨˙ˆ´˛˝ÃÄÅ")
+GARBLED_CATEGORIES = frozenset(("Co", "Cn", "Cs", "Cc"))
+
+
+@dataclass
+class TextConfidence:
+    """How far the text layer extraction of one question can be trusted (0-1)"""
+    score: float
+    reasons: List[str] = field(default_factory=list)  # What lowered the score
+
+
+def garbled_ratio(text: str) -> float:
+    """Share of characters that are not readable text"""
+    if not text:
+        return 0.0
+    garbled = sum(
+        1 for char in text
+        if char in GARBLED_CHARS or (not char.isspace() and unicodedata.category(char) in GARBLED_CATEGORIES)
+    )
+    return garbled / len(text)
+
+
+def text_confidence(question_text: str, options: List[Dict[str, str]]) -> TextConfidence:
+    """Score a question's text layer extraction (see the module docstring)"""
+    score = 1.0
+    reasons = []
+
+    if not options:
+        score -= 0.6
+        reasons.append("no options")
+    else:
+        if len(options) not in OPTION_COUNTS:
+            score -= 0.4
+            reasons.append(f"{len(options)} options")
+        labels = "".join(option.get("label", "") for option in options)
+        if labels != "ABCDE"[:len(labels)]:
+            score -= 0.3
+            reasons.append(f"labels {labels}")
+        if any(not option.get("value", "").strip() for option in options):
+            score -= 0.2
+            reasons.append("empty option")
+
+    if len(question_text.strip()) < MIN_TEXT_CHARS:
+        score -= 0.4
+        reasons.append("short text")
+
+    ratio = garbled_ratio(question_text + "".join(option.get("value", "") for option in options))
+    if ratio > 0:
+        score -= min(0.5, ratio * 10)
+        reasons.append(f"garbled {ratio:.1%}")
+
+    return TextConfidence(max(0.0, round(score, 3)), reasons)
+
+
+def needs_vision(confidence: TextConfidence, min_confidence: float = VISION_MIN_CONFIDENCE) -> bool:
+    return confidence.score < min_confidence
@@ -0,0 +1,109 @@
+"""
+Partial parses: page ranges, question ranges and previews
+
+Selection narrows what a parse works on (?pages=, ?questions=, ?preview=):
+
+- pages: only these pages are read, OCR'd, segmented and cropped. The
+  answer key is still read from the last pages of the document, wherever
+  they fall. Question IDs count from the first selected page. The subject
+  the selection starts in is taken from the last subject heading on the
+  skipped pages; without one, answer key subjects are not assigned by
+  position (only Vision's subject picks a key).
+- questions: question IDs as in a full parse (pages are segmented in order
+  to number them, but only the selected questions are cropped, OCR'd and
+  sent to Vision). Segmentation stops after the last selected question.
+- preview: the first N selected questions from the text layer only (no
+  Vision, no OCR fallback for crops); parsing stops once they are found.
+
+Ranges are 1-based and inclusive: "1-20", "5", "1-10,25-30", "40-" (to the end).
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+# (first, last) 1-based and inclusive; last None = open-ended
+Ranges = Tuple[Tuple[int, Optional[int]], ...]
+
+
+def parse_ranges(spec: str, name: str) -> Ranges:
+    """ "1-20,25,40-" → ((1, 20), (25, 25), (40, None)); raises ValueError"""
+    ranges = []
+    for part in spec.replace(" ", "").split(","):
+        if not part:
+            continue
+        first, dash, last = part.partition("-")
+        if not first.isdigit() or (last and not last.isdigit()):
+            raise ValueError(f"{name} must look like 1-20,25 (got '{spec}')")
+        start = int(first)
+        end = (int(last) if last else None) if dash else start
+        if start < 1 or (end is not None and end < start):
+            raise ValueError(f"{name}: invalid range '{part}'")
+        ranges.append((start, end))
+    if not ranges:
+        raise ValueError(f"{name} is empty")
+    return tuple(sorted(ranges, key=lambda item: item[0]))
+
+
+def format_ranges(ranges: Ranges) -> str:
+    return ",".join(
+        str(start) if end == start else f"{start}-{'' if end is None else end}"
+        for start, end in ranges
+    )
+
+
+def _contains(ranges: Ranges, number: int) -> bool:
+    return any(start <= number and (end is None or number <= end) for start, end in ranges)
+
+
+@dataclass(frozen=True)
+class Selection:
+    """Which part of a document to parse (default: all of it, fully enriched)"""
+    pages: Optional[Ranges] = None  # 1-based page numbers
+    questions: Optional[Ranges] = None  # Question IDs
+    preview: Optional[int] = None  # First N selected questions, text layer only
+
+    @classmethod
+    def parse(cls, pages: Optional[str] = None, questions: Optional[str] = None, preview: Optional[int] = None) -> "Selection":
+        """From query strings; raises ValueError for malformed ranges"""
+        if preview is not None and preview < 1:
+            raise ValueError("preview must be at least 1")
+        return cls(
+            pages=parse_ranges(pages, "pages") if pages else None,
+            questions=parse_ranges(questions, "questions") if questions else None,
+            preview=preview,
+        )
+
+    @property
+    def active(self) -> bool:
+        return self.pages is not None or self.questions is not None or self.preview is not None
+
+    @property
+    def enrich(self) -> bool:
+        """Vision and OCR fallbacks (off for previews)"""
+        return self.preview is None
+
+    def wants_page(self, page_index: int) -> bool:
+        return self.pages is None or _contains(self.pages, page_index + 1)
+
+    def wants_question(self, question_id: int) -> bool:
+        return self.questions is None or _contains(self.questions, question_id)
+
+    def complete(self, questions_found: int, selected_found: int) -> bool:
+        """Nothing selected is left after `questions_found` questions (so segmentation can stop)"""
+        if self.preview is not None and selected_found >= self.preview:
+            return True
+        if self.questions is not None and all(end is not None for _, end in self.questions):
+            return questions_found >= max(end for _, end in self.questions)
+        return False
+
+    def settings(self) -> Optional[Dict[str, Any]]:
+        """Part of the parse cache key (None for a full parse)"""
+        if not self.active:
+            return None
+        return {
+            "pages": format_ranges(self.pages) if self.pages else None,
+            "questions": format_ranges(self.questions) if self.questions else None,
+            "preview": self.preview,
+        }
+
+
+FULL_DOCUMENT = Selection()
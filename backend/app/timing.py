@@ -0,0 +1,66 @@
+"""
+Per-stage wall-clock timings for one parse
+
+Stages nest (e.g. rendering runs while the Vision window pulls the next
+question): time is charged to the innermost stage only, so the stage totals
+add up to the parse time instead of double counting.
+"""
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, TypeVar
+
+T = TypeVar("T")
+
+
+class StageTimer:
+    """Exclusive time and call count per stage (single thread)"""
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self._stack: List[List[Any]] = []  # [stage, started]
+        self._created = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        now = time.perf_counter()
+        if self._stack:
+            parent = self._stack[-1]
+            self.seconds[parent[0]] = self.seconds.get(parent[0], 0.0) + now - parent[1]
+        self._stack.append([name, now])
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            _, started = self._stack.pop()
+            self.seconds[name] = self.seconds.get(name, 0.0) + now - started
+            self.counts[name] = self.counts.get(name, 0) + 1
+            if self._stack:
+                self._stack[-1][1] = now
+
+    def iter(self, name: str, iterable: Iterable[T]) -> Iterator[T]:
+        """Charge the time spent producing each item of iterable to a stage"""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def snapshot(self) -> Dict[str, Any]:
+        """{"total_ms": ..., "stages": {stage: {"ms": ..., "count": ...}}}"""
+        return {
+            "total_ms": round((time.perf_counter() - self._created) * 1000, 1),
+            "stages": {
+                name: {"ms": round(seconds * 1000, 1), "count": self.counts.get(name, 0)}
+                for name, seconds in sorted(self.seconds.items(), key=lambda item: -item[1])
+            },
+        }
+
+    def server_timing(self) -> str:
+        """Server-Timing header value (shown in browser dev tools)"""
+        parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.seconds.items()]
+        parts.append(f"total;dur={(time.perf_counter() - self._created) * 1000:.1f}")
+        return ", ".join(parts)
@@ -0,0 +1,185 @@
+"""
+Turkish character repair for text extracted from PDFs
+
+PDF text layers often store Turkish letters as a base letter plus a spacing
+accent (e.g. "s¸" for "ş") or as look-alike code points. fix_turkish_encoding()
+maps them back in a single scan:
+- two-character sequences via one compiled regex (only when an accent is present)
+- single characters via str.replace ("i") and str.translate (rare ones)
+- whitespace collapsed to single spaces
+
+Output is identical to applying TURKISH_REPLACEMENTS one by one with
+str.replace (see fix_turkish_encoding_sequential, kept as the reference).
+Results that normalization would not change again are returned as
+NormalizedText, so repeated calls on the same text are free.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Iterable
+
+# Applied in this order by the reference implementation
+TURKISH_REPLACEMENTS = {
+    # İ variations
+    '˙I': 'İ', '˙i': 'İ', 'ˆI': 'İ', 'I˙': 'İ', 'i˙': 'İ',
+    '¨I': 'İ', '´I': 'İ', 'Ì': 'İ', 'Í': 'İ',
+
+    # ı variations
+    'ˆı': 'ı', 'i': 'ı', '±': 'ı', 'ı': 'ı',
+
+    # ş variations
+    '¸s': 'ş', '¸S': 'Ş', 'ș': 'ş', 'Ș': 'Ş',
+    's¸': 'ş', 'S¸': 'Ş', 'ş': 'ş', 'Ş': 'Ş',
+
+    # ğ variations
+    '˘g': 'ğ', '˘G': 'Ğ', 'ǧ': 'ğ', 'Ǧ': 'Ğ',
+    'g˘': 'ğ', 'G˘': 'Ğ', 'ğ': 'ğ', 'Ğ': 'Ğ',
+
+    # ç variations
+    '¸c': 'ç', '¸C': 'Ç', 'ć': 'ç', 'Ć': 'Ç',
+    'c¸': 'ç', 'C¸': 'Ç', 'ç': 'ç', 'Ç': 'Ç',
+
+    # ö variations
+    '¨o': 'ö', '¨O': 'Ö', 'ó': 'ö', 'Ó': 'Ö',
+    'o¨': 'ö', 'O¨': 'Ö', 'ö': 'ö', 'Ö': 'Ö',
+
+    # ü variations
+    '¨u': 'ü', '¨U': 'Ü', 'ú': 'ü', 'Ú': 'Ü',
+    'u¨': 'ü', 'U¨': 'Ü', 'ü': 'ü', 'Ü': 'Ü',
+
+    # Common ligatures
+    'ﬁ': 'fi', 'ﬂ': 'fl', 'ﬀ': 'ff',
+
+    # Zero-width and combining characters
+    '\u0307': '',  # Combining dot above
+    '\u0306': '',  # Combining breve
+    '\u0327': '',  # Combining cedilla
+    '\u0308': '',  # Combining diaeresis
+}
+
+# Lines up to this length are memoized (page headers/footers repeat on every page)
+MEMO_MAX_LENGTH = 48
+MEMO_SIZE = 4096
+
+
+class NormalizedText(str):
+    """Text that fix_turkish_encoding() would return unchanged"""
+    __slots__ = ()
+
+
+def _compile_tables():
+    changing = {old: new for old, new in TURKISH_REPLACEMENTS.items() if old != new}
+    pairs = {old: new for old, new in changing.items() if len(old) == 2}
+    singles = {old: new for old, new in changing.items() if len(old) == 1}
+    order = list(TURKISH_REPLACEMENTS)
+
+    # Inputs where one left-to-right scan could disagree with the sequential
+    # replaces: overlapping pairs ("i˙I" matches both "i˙" and "˙I") and pairs
+    # containing a single-char key that the reference applies first
+    ambiguous = set()
+    for a in pairs:
+        for b in pairs:
+            if a[1] == b[0]:
+                ambiguous.add(a + b[1])
+        for char in a:
+            if char in singles and order.index(char) < order.index(a):
+                ambiguous.add(a)
+
+    pair_chars = {char for old in pairs for char in old}
+    # Every pair contains a spacing accent, so text without one skips the regex
+    accents = {char for char in pair_chars if unicodedata.category(char) not in ('Lu', 'Ll')}
+    unstable = set(singles) | accents
+
+    # "i" is in almost every line: str.replace is far cheaper than translating
+    # character by character, so translate only runs for the rare mappings
+    common = [(old, new) for old, new in singles.items() if old.isascii()]
+    rare = {old: new for old, new in singles.items() if not old.isascii()}
+
+    return (
+        re.compile('|'.join(map(re.escape, pairs))),
+        pairs,
+        common,
+        str.maketrans(rare),
+        re.compile('[' + ''.join(map(re.escape, sorted(rare))) + ']'),
+        re.compile('[' + ''.join(map(re.escape, sorted(accents | set(rare)))) + ']'),
+        re.compile('|'.join(map(re.escape, sorted(ambiguous)))) if ambiguous else None,
+        re.compile('[' + ''.join(map(re.escape, sorted(accents))) + ']'),
+        re.compile('[' + ''.join(map(re.escape, sorted(unstable))) + ']'),
+    )
+
+
+(
+    _PAIR_PATTERN,
+    _PAIR_TABLE,
+    _COMMON_SINGLES,
+    _RARE_TABLE,
+    _RARE_PATTERN,
+    _TRIGGER_PATTERN,
+    _AMBIGUOUS_PATTERN,
+    _ACCENT_PATTERN,
+    _UNSTABLE_PATTERN,
+) = _compile_tables()
+
+
+def _replace_pair(match: "re.Match") -> str:
+    return _PAIR_TABLE[match.group()]
+
+
+def fix_turkish_encoding_sequential(text: str) -> str:
+    """Reference implementation: every replacement applied in order, one by one"""
+    for old, new in TURKISH_REPLACEMENTS.items():
+        text = text.replace(old, new)
+
+    # Normalize whitespace
+    return ' '.join(text.split())
+
+
+def _mark(result: str) -> str:
+    # Ligatures expand to "fi", which a second pass would turn into "fı"
+    if _UNSTABLE_PATTERN.search(result) is None:
+        return NormalizedText(result)
+    return result
+
+
+def _normalize(text: str) -> str:
+    if _TRIGGER_PATTERN.search(text) is None:
+        # Common case: no accents or rare characters, only "i" and whitespace
+        for old, new in _COMMON_SINGLES:
+            text = text.replace(old, new)
+        return NormalizedText(' '.join(text.split()))
+
+    if _ACCENT_PATTERN.search(text) is not None:
+        if _AMBIGUOUS_PATTERN is not None and _AMBIGUOUS_PATTERN.search(text) is not None:
+            return _mark(fix_turkish_encoding_sequential(text))
+        text = _PAIR_PATTERN.sub(_replace_pair, text)
+
+    for old, new in _COMMON_SINGLES:
+        text = text.replace(old, new)
+    if _RARE_PATTERN.search(text) is not None:
+        text = text.translate(_RARE_TABLE)
+
+    return _mark(' '.join(text.split()))
+
+
+_normalize_memoized = lru_cache(maxsize=MEMO_SIZE)(_normalize)
+
+
+def fix_turkish_encoding(text: str) -> str:
+    """
+    Fix Turkish character encoding issues - COMPREHENSIVE version
+    Handles all common PDF encoding problems with Turkish characters
+    """
+    if type(text) is NormalizedText:
+        return text
+    if len(text) <= MEMO_MAX_LENGTH:
+        return _normalize_memoized(text)
+    return _normalize(text)
+
+
+def join_normalized(parts: Iterable[str]) -> str:
+    """' '.join() that keeps the NormalizedText marker when every part has it"""
+    parts = list(parts)
+    text = ' '.join(parts)
+    if all(type(part) is NormalizedText and part for part in parts):
+        return NormalizedText(text)
+    return text
@@ -0,0 +1,353 @@
+"""
+Streaming PDF uploads
+
+Upload endpoints read the multipart body themselves instead of taking an
+UploadFile, which FastAPI only hands over after the whole body has been
+received. The file part is processed chunk by chunk as it arrives:
+
+- its SHA-256 (the result cache key) is updated incrementally
+- PARSE_MAX_UPLOAD_MB is a hard limit enforced on the way in: a larger
+  Content-Length is refused before the body is read, and a body that crosses
+  the limit is refused at that chunk (413)
+- up to PARSE_UPLOAD_SPOOL_MB stays in memory; beyond that the upload spills
+  to a named temp file in PARSE_UPLOAD_DIR, which the parser opens by path, so
+  the document is served by the OS page cache instead of Python bytes copies
+
+Batch uploads may also be ZIP archives; their PDFs are unpacked into
+SpooledUploads of their own under the same limits.
+"""
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+
+from .logs import get_logger
+from .parse_pdf import PdfSource
+
+logger = get_logger("uploads")
+
+MAX_UPLOAD_MB = float(os.getenv("PARSE_MAX_UPLOAD_MB", "100"))
+UPLOAD_SPOOL_MB = float(os.getenv("PARSE_UPLOAD_SPOOL_MB", "1"))
+UPLOAD_DIR = os.getenv("PARSE_UPLOAD_DIR") or None  # None → system temp directory
+MAX_UPLOAD_BYTES = int(MAX_UPLOAD_MB * 1024 * 1024)
+SPOOL_BYTES = int(UPLOAD_SPOOL_MB * 1024 * 1024)
+FORM_OVERHEAD_BYTES = 64 * 1024  # Multipart boundaries, part headers and small form fields
+ZIP_READ_BYTES = 1024 * 1024
+
+
+class SpooledUpload:
+    """One uploaded file: in memory while small, a named temp file beyond SPOOL_BYTES"""
+
+    def __init__(self, filename: str, spool_bytes: int = SPOOL_BYTES):
+        self.filename = filename
+        self.size = 0
+        self.digest: Optional[str] = None  # Hex SHA-256 (like cache.sha256_digest), set by finish()
+        self.path: Optional[str] = None  # Temp file, once spilled to disk
+        self._spool_bytes = spool_bytes
+        self._hash = hashlib.sha256()
+        self._buffer: Optional[bytearray] = bytearray()
+        self._data: Optional[bytes] = None
+        self._file = None
+        self._owned = True  # False once moved into place by save_as()
+
+    @property
+    def in_memory(self) -> bool:
+        return self.path is None
+
+    def write(self, data: bytes) -> None:
+        """Append a chunk (writes to disk once spilled: call from a thread then)"""
+        self._hash.update(data)
+        self.size += len(data)
+        if self._buffer is None:
+            self._file.write(data)
+            return
+
+        self._buffer += data
+        if len(self._buffer) > self._spool_bytes:
+            fd, self.path = tempfile.mkstemp(prefix="upload-", suffix=".pdf", dir=UPLOAD_DIR)
+            self._file = os.fdopen(fd, "wb")
+            self._file.write(self._buffer)
+            self._buffer = None
+
+    async def write_async(self, data: bytes) -> None:
+        """write() on the event loop while it stays in memory, in the threadpool once it touches disk"""
+        if self.in_memory and len(self._buffer) + len(data) <= self._spool_bytes:
+            self.write(data)
+        else:
+            await run_in_threadpool(self.write, data)
+
+    def finish(self) -> None:
+        """Upload complete: fix the digest and close the temp file"""
+        self.digest = self._hash.hexdigest()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._buffer is not None:
+            self._data = bytes(self._buffer)
+            self._buffer = None
+
+    def source(self) -> PdfSource:
+        """What the parser opens: the bytes, or the temp file's path"""
+        return self._data if self.path is None else self.path
+
+    def save_as(self, path: Path) -> None:
+        """Persist at `path`; a temp file is moved there (no copy on the same filesystem)"""
+        if self.path is None:
+            path.write_bytes(self._data)
+            return
+        shutil.move(self.path, path)
+        self.path = str(path)
+        self._owned = False
+
+    def close(self) -> None:
+        """Release the data and delete the temp file (safe to call more than once)"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.path is not None and self._owned:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:  # Windows: still open by a parse
+                logger.warning("⚠️  Could not delete upload %s: %s", self.path, e)
+        self.path = None
+        self._buffer = None
+        self._data = None
+
+
+def upload_too_large() -> HTTPException:
+    return HTTPException(status_code=413, detail=f"File exceeds the {MAX_UPLOAD_MB:g} MB upload limit")
+
+
+class _UploadReceiver:
+    """python-multipart callbacks: file parts of `field` go to SpooledUploads (as Starlette's form parser)"""
+
+    def __init__(self, field: str, suffixes: Tuple[str, ...], max_files: int):
+        self.field = field
+        self.suffixes = suffixes
+        self.max_files = max_files
+        self.uploads: List[SpooledUpload] = []
+        self.pending: List[Tuple[SpooledUpload, bytes]] = []  # Written after each chunk (may need a thread)
+        self._header_field = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._current: Optional[SpooledUpload] = None
+
+    def callbacks(self) -> Dict[str, Any]:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self) -> None:
+        self._disposition = b""
+        self._current = None
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        if self._header_field.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        if options.get(b"name", b"").decode("utf-8", "replace") != self.field or b"filename" not in options:
+            return  # Other form fields are skipped
+
+        filename = options[b"filename"].decode("utf-8", "replace")
+        if not filename.endswith(self.suffixes):
+            kinds = " or ".join(suffix.lstrip(".").upper() for suffix in self.suffixes)
+            raise HTTPException(status_code=400, detail=f"File must be a {kinds}")
+        if len(self.uploads) >= self.max_files:
+            raise HTTPException(status_code=400, detail=f"At most {self.max_files} file(s) per request")
+        self._current = SpooledUpload(filename)
+        self.uploads.append(self._current)
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._current is not None:
+            self.pending.append((self._current, data[start:end]))
+
+    def on_part_end(self) -> None:
+        self._current = None
+
+
+async def receive_uploads(
+    request: Request,
+    field: str = "file",
+    suffixes: Tuple[str, ...] = (".pdf",),
+    max_files: int = 1,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+) -> List[SpooledUpload]:
+    """
+    Stream the multipart body into SpooledUploads (one per file part named `field`)
+
+    Raises 400 for a malformed body, a missing file or a wrong file type, and
+    413 as soon as a file (or the whole body) goes over the limit. On error
+    every temp file is deleted; on success the caller close()s the uploads.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail=f"Expected a multipart/form-data upload with a '{field}' field")
+
+    max_body = max_files * max_bytes + FORM_OVERHEAD_BYTES
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > max_body:
+        raise upload_too_large()
+
+    receiver = _UploadReceiver(field, suffixes, max_files)
+    parser = MultipartParser(params[b"boundary"], receiver.callbacks())
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_body:
+                raise upload_too_large()
+            parser.write(chunk)
+            for upload, data in receiver.pending:
+                if upload.size + len(data) > max_bytes:
+                    raise upload_too_large()
+                await upload.write_async(data)
+            receiver.pending.clear()
+        parser.finalize()
+    except MultipartParseError as e:
+        _close_all(receiver.uploads)
+        raise HTTPException(status_code=400, detail=f"Malformed multipart body: {e}")
+    except BaseException:
+        _close_all(receiver.uploads)  # Also on client disconnect
+        raise
+
+    if not receiver.uploads:
+        raise HTTPException(status_code=400, detail=f"Missing '{field}' upload")
+    for upload in receiver.uploads:
+        await run_in_threadpool(upload.finish)
+    return receiver.uploads
+
+
+async def receive_pdf_upload(request: Request, field: str = "file") -> SpooledUpload:
+    """The single PDF of an upload request"""
+    return (await receive_uploads(request, field))[0]
+
+
+async def receive_pdf_batch(request: Request, max_documents: int, field: str = "file") -> List[SpooledUpload]:
+    """
+    Every PDF of a batch upload: PDF parts as they are, ZIP parts unpacked
+
+    Raises 400 when the request holds no PDF or more than `max_documents`.
+    """
+    uploads = await receive_uploads(request, field, suffixes=(".pdf", ".zip"), max_files=max_documents)
+    documents: List[SpooledUpload] = []
+    try:
+        for upload in uploads:
+            if not upload.filename.endswith(".zip"):
+                if len(documents) >= max_documents:
+                    raise too_many_documents(max_documents)
+                documents.append(upload)
+                continue
+            try:
+                documents += await run_in_threadpool(extract_zip_pdfs, upload, max_documents - len(documents))
+            finally:
+                upload.close()
+    except BaseException:
+        _close_all(uploads + documents)
+        raise
+
+    if not documents:
+        raise HTTPException(status_code=400, detail="No PDF files in the upload")
+    return documents
+
+
+def extract_zip_pdfs(archive: SpooledUpload, max_files: int, max_bytes: int = MAX_UPLOAD_BYTES) -> List[SpooledUpload]:
+    """
+    The PDFs inside a ZIP upload, spooled like direct uploads (blocking: call from a thread)
+
+    Members are named by their path in the archive; directories, macOS
+    metadata and other files are skipped. Each PDF is held to `max_bytes`
+    while it is decompressed (the sizes in the ZIP directory are not trusted).
+    """
+    uploads: List[SpooledUpload] = []
+    source = io.BytesIO(archive.source()) if archive.in_memory else archive.path
+    try:
+        with zipfile.ZipFile(source) as zip_file:
+            for info in zip_file.infolist():
+                basename = info.filename.rsplit("/", 1)[-1]
+                if (
+                    info.is_dir()
+                    or info.filename.startswith("__MACOSX/")
+                    or basename.startswith(".")
+                    or not basename.lower().endswith(".pdf")
+                ):
+                    continue
+                if len(uploads) >= max_files:
+                    raise too_many_documents(max_files)
+                if info.file_size > max_bytes:
+                    raise upload_too_large()
+
+                upload = SpooledUpload(info.filename)
+                uploads.append(upload)
+                with zip_file.open(info) as member:
+                    while True:
+                        chunk = member.read(ZIP_READ_BYTES)
+                        if not chunk:
+                            break
+                        if upload.size + len(chunk) > max_bytes:
+                            raise upload_too_large()
+                        upload.write(chunk)
+                upload.finish()
+    except (zipfile.BadZipFile, zlib.error, EOFError, NotImplementedError, RuntimeError) as e:
+        # RuntimeError: encrypted member; NotImplementedError: unsupported compression
+        _close_all(uploads)
+        raise HTTPException(status_code=400, detail=f"Invalid ZIP archive {archive.filename}: {e}")
+    except BaseException:
+        _close_all(uploads)
+        raise
+
+    logger.info("🗜️  %s: %d PDF(s)", archive.filename, len(uploads))
+    return uploads
+
+
+def too_many_documents(max_documents: int) -> HTTPException:
+    return HTTPException(status_code=400, detail=f"At most {max_documents} PDF(s) per batch")
+
+
+def _close_all(uploads: List[SpooledUpload]) -> None:
+    for upload in uploads:
+        upload.close()
+
+
+def upload_openapi(field: str = "file", multiple: bool = False) -> Dict[str, Any]:
+    """OpenAPI request body for endpoints that stream their upload (FastAPI cannot infer it)"""
+    schema: Dict[str, Any] = {"type": "string", "format": "binary"}
+    if multiple:
+        schema = {"type": "array", "items": schema}
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {"type": "object", "required": [field], "properties": {field: schema}},
+                },
+            },
+        },
+    }
@@ -0,0 +1,626 @@
+"""
+OpenAI Vision analysis for cropped question images
+
+One pooled client is shared by every request. Enrichment runs on a background
+asyncio loop that keeps up to OPENAI_VISION_CONCURRENCY requests in flight,
+while iter_vision_results() hands results back in question order.
+With OPENAI_VISION_BATCH_SIZE > 1 the crops of a page share one request
+(labelled [ID=n]); items the batch answers invalidly are retried one by one.
+
+Set OPENAI_BASE_URL to point the client at a local fake endpoint for testing.
+Results are cached per crop (see cache.VisionResultCache) and reused across PDFs.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, InvalidStateError
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from .cache import get_vision_cache
+from .logs import get_logger
+from .metrics import observe_vision_request
+
+load_dotenv()
+
+logger = get_logger("vision")
+
+# OpenAI Vision setup
+try:
+    import httpx
+    import openai
+    OPENAI_AVAILABLE = True
+    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    if OPENAI_API_KEY:
+        logger.info("✅ OpenAI API key found - Vision analysis enabled")
+    else:
+        logger.warning("⚠️  OpenAI API key not set - Will use PyMuPDF text extraction only")
+        OPENAI_AVAILABLE = False
+except ImportError:
+    OPENAI_AVAILABLE = False
+    OPENAI_API_KEY = None
+    logger.warning("⚠️  OpenAI not available - Install with: pip install openai")
+
+OPENAI_VISION_MODEL = os.getenv("OPENAI_VISION_MODEL", "gpt-4o-mini")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None  # None → api.openai.com
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "30"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+
+# Maximum number of Vision requests in flight (process-wide)
+VISION_CONCURRENCY = int(os.getenv("OPENAI_VISION_CONCURRENCY", "8"))
+# Crops of one page sent in a single request (1 = one request per question)
+VISION_BATCH_SIZE = max(1, int(os.getenv("OPENAI_VISION_BATCH_SIZE", "1")))
+
+
+@dataclass
+class VisionRequest:
+    """One question crop to be analyzed by OpenAI Vision"""
+    image_base64: str
+    subject: Optional[str] = None
+    question_number: Optional[int] = None
+    detail: str = "high"  # "low" for small text-only crops (see vision_image.py)
+
+
+def empty_vision_result() -> Dict[str, Any]:
+    """Result used when Vision is disabled or the request failed"""
+    return {
+        "text": "",
+        "stem": "",
+        "options": [],
+        "subject": None,
+        "topic": None,
+        "subtopic": None,
+        "difficulty": None,
+        "answer": None,
+    }
+
+
+# Task description and rules shared by single and batched prompts
+VISION_RULES = """📋 GÖREVİN:
+Görüntüdeki sınav sorusunu TAM OLARAK oku ve şu bilgileri çıkar:
+
+1. **subject** (Ders): Sorunun hangi derse ait olduğunu MUTLAKA tespit et
+   - Türkçe, Matematik, Fen Bilimleri, Sosyal Bilgiler, İngilizce, vb.
+   - Soru içeriğinden ve üslubundan anlayabilirsin
+   - Örnek: Geometri sorusu → "Matematik", Fiil sorusu → "Türkçe"
+
+2. **topic** (Ana Konu): Dersin hangi ana konusuyla ilgili
+   - Türkçe: Cümle Bilgisi, Sözcük Bilgisi, Anlatım Bozuklukları, Noktalama, Paragraf
+   - Matematik: Geometri, Sayılar, Denklemler, Kesirler, Olasılık, İstatistik
+   - Fen: Madde ve Özellikleri, Kuvvet ve Hareket, Canlılar, Enerji, Dünya ve Evren
+   - Sosyal: Tarih, Coğrafya, Vatandaşlık, İnsan Hakları
+
+3. **subtopic** (Alt Konu): Daha spesifik konu
+   - Örnek: "Geometri" → "Üçgenler", "Cümle Bilgisi" → "Fiilimsiler"
+
+4. **difficulty** (Zorluk): Sorunun seviyesi
+   - "easy": Basit tanım/bilgi sorusu
+   - "medium": Orta seviye, çıkarım gerektiren
+   - "hard": Karmaşık, çoklu adım gerektiren
+
+5. **text** (Tam Metin): Sorunun TÜM metnini yaz
+   - Soru numarasını ATLA
+   - Sadece soru metnini al
+
+6. **stem** (Soru Kökü): Sorunun ana cümlesi (genelde kalın yazılmış)
+   - Örnek: "Aşağıdakilerden hangisi..." veya "Yukarıdaki metne göre..."
+
+7. **options** (Şıklar): A'dan E'ye kadar TÜM şıkları oku
+   - Format: [{"label": "A", "value": "gerçek şık metni"}, {"label": "B", "value": "gerçek şık metni"}, ...]
+   - GERÇEK METİNLERİ yaz, "Şık A", "Şık B" gibi placeholder'ları YAZMA
+   - Eğer şıkta sadece "A)", "B)" yazıyorsa ve metin yoksa, boş bırakma - yakındaki metni al
+   - Multi-line şıkları birleştir (aynı şığın devamını yanına ekle)
+
+8. **answer**: Görselde cevap anahtarı görünüyorsa doğru şık (A-E), yoksa null
+
+⚠️ KRİTİK KURALLAR:
+- Şıklardaki GERÇEK metni oku, placeholder yazma
+- subject/topic/subtopic MUTLAKA dolu olsun (null veya "Genel" yazma)
+- Türkçe karakterleri doğru kullan (İ, ı, ş, ğ, ç, ö, ü)
+- Tüm şıkları al (genelde 5 tane: A, B, C, D, E)"""
+
+
+def build_vision_prompt(subject: Optional[str] = None, question_number: Optional[int] = None) -> str:
+    """Construct prompt for Turkish exam questions"""
+    return f"""Sen bir Türk Eğitim Sistemi uzmanısın. Bu sınav sorusunu analiz et ve JSON formatında çıktı ver.
+
+Soru #{question_number or '?'} | Beklenen Ders: {subject or 'Tespit Et'}
+
+{VISION_RULES}
+
+JSON FORMAT:
+{{
+  "subject": "Matematik",
+  "topic": "Geometri",
+  "subtopic": "Üçgenler",
+  "difficulty": "medium",
+  "text": "Soru metni tam olarak...",
+  "stem": "Ana soru cümlesi...",
+  "options": [
+    {{"label": "A", "value": "Gerçek şık metni buraya"}},
+    {{"label": "B", "value": "Gerçek şık metni buraya"}},
+    ...
+  ],
+  "answer": null
+}}"""
+
+
+def vision_label(request_id: int, request: "VisionRequest") -> str:
+    """Text placed before each crop of a batched request"""
+    return f"[ID={request_id}] Soru #{request.question_number or '?'} | Beklenen Ders: {request.subject or 'Tespit Et'}"
+
+
+def build_vision_batch_prompt(count: int) -> str:
+    """Prompt for several crops in one request (each preceded by its vision_label)"""
+    return f"""Sen bir Türk Eğitim Sistemi uzmanısın. Bu istekte {count} ayrı sınav sorusu görseli var. Her görseli AYRI AYRI analiz et ve JSON formatında çıktı ver.
+
+Her görselden hemen önce "[ID=numara] Soru #... | Beklenen Ders: ..." etiketi var. Her görsel yalnızca kendi etiketindeki soruyu içerir; soruları birbirine karıştırma.
+
+{VISION_RULES}
+- Her görsel için TAM OLARAK bir nesne yaz, "id" alanına etiketteki numarayı koy
+
+JSON FORMAT:
+{{
+  "questions": [
+    {{
+      "id": 1,
+      "subject": "Matematik",
+      "topic": "Geometri",
+      "subtopic": "Üçgenler",
+      "difficulty": "medium",
+      "text": "Soru metni tam olarak...",
+      "stem": "Ana soru cümlesi...",
+      "options": [
+        {{"label": "A", "value": "Gerçek şık metni buraya"}},
+        ...
+      ],
+      "answer": null
+    }},
+    ...
+  ]
+}}"""
+
+
+# Identifies the prompt templates in the Vision cache key (per-question hints excluded:
+# the analysis is read from the image, so a reprinted crop may reuse it). Single and
+# batched answers are interchangeable (same VISION_RULES, same fields), so they share
+# entries, and the batch size is not part of the parse cache key either.
+VISION_PROMPT_VERSION = hashlib.sha256(
+    (build_vision_prompt("{subject}", "{question_number}") + build_vision_batch_prompt("{count}")).encode("utf-8")
+).hexdigest()[:16]
+
+
+def image_bytes_from_data_uri(image_base64: str) -> bytes:
+    """Decode a data:image/...;base64 URI (or bare base64) to bytes"""
+    _, _, payload = image_base64.rpartition(",")
+    return base64.b64decode(payload)
+
+
+def cache_prompt_version(request: VisionRequest) -> str:
+    """Vision cache namespace: low-detail answers are kept apart from high-detail ones"""
+    return VISION_PROMPT_VERSION if request.detail == "high" else f"{VISION_PROMPT_VERSION}-{request.detail}"
+
+
+def lookup_cached_result(request: VisionRequest) -> Optional[Dict[str, Any]]:
+    """Consult the per-crop Vision cache before calling the API"""
+    cache = get_vision_cache()
+    if cache is None:
+        return None
+    try:
+        return cache.lookup(image_bytes_from_data_uri(request.image_base64), cache_prompt_version(request), OPENAI_VISION_MODEL)
+    except Exception as e:
+        logger.warning("⚠️  Vision cache lookup failed: %s", e)
+        return None
+
+
+def remember_result(request: VisionRequest, result: Dict[str, Any], seconds: float, response, share: int = 1) -> None:
+    """Store a successful API result and its cost (split over `share` crops) in the Vision cache"""
+    cache = get_vision_cache()
+    if cache is None:
+        return
+    try:
+        usage = getattr(response, "usage", None)
+        cache.record_api_call(seconds / share, (getattr(usage, "total_tokens", 0) or 0) / share)
+        cache.store(image_bytes_from_data_uri(request.image_base64), cache_prompt_version(request), OPENAI_VISION_MODEL, result)
+    except Exception as e:
+        logger.warning("⚠️  Vision cache store failed: %s", e)
+
+
+def remember_batch_results(
+    requests: List[VisionRequest], results: List[Optional[Dict[str, Any]]], seconds: float, response
+) -> None:
+    """Store the answered crops of one batched request, sharing its cost between them"""
+    for request, result in zip(requests, results):
+        if result is not None:
+            remember_result(request, result, seconds, response, share=len(requests))
+
+
+def build_vision_request_kwargs(request: VisionRequest) -> Dict[str, Any]:
+    """Chat completion arguments for one question crop"""
+    prompt = build_vision_prompt(request.subject, request.question_number)
+    return {
+        "model": OPENAI_VISION_MODEL,
+        "messages": [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": request.image_base64,
+                            "detail": request.detail  # High quality for better text extraction
+                        }
+                    }
+                ]
+            }
+        ],
+        "response_format": {"type": "json_object"},
+        "temperature": 0.2,  # Low temperature for consistent extraction
+        "max_tokens": 1500,
+    }
+
+
+def build_vision_batch_request_kwargs(requests: List[VisionRequest]) -> Dict[str, Any]:
+    """Chat completion arguments for several crops, labelled [ID=1]..[ID=n]"""
+    content: List[Dict[str, Any]] = [{"type": "text", "text": build_vision_batch_prompt(len(requests))}]
+    for request_id, request in enumerate(requests, start=1):
+        content.append({"type": "text", "text": vision_label(request_id, request)})
+        content.append({"type": "image_url", "image_url": {"url": request.image_base64, "detail": request.detail}})
+    return {
+        "model": OPENAI_VISION_MODEL,
+        "messages": [{"role": "user", "content": content}],
+        "response_format": {"type": "json_object"},
+        "temperature": 0.2,
+        "max_tokens": 1500 * len(requests),
+    }
+
+
+def normalize_vision_result(parsed: Dict[str, Any]) -> Dict[str, Any]:
+    # Ensure all keys exist
+    return {
+        "text": parsed.get("text", ""),
+        "stem": parsed.get("stem", ""),
+        "options": parsed.get("options", []),
+        "subject": parsed.get("subject"),  # OpenAI will detect the subject
+        "topic": parsed.get("topic"),
+        "subtopic": parsed.get("subtopic"),
+        "difficulty": parsed.get("difficulty"),
+        "answer": parsed.get("answer"),
+    }
+
+
+def parse_vision_response(response) -> Dict[str, Any]:
+    """Turn a chat completion into the normalized Vision result dict"""
+    result = response.choices[0].message.content
+    parsed = json.loads(result) if isinstance(result, str) else result
+    return normalize_vision_result(parsed)
+
+
+def valid_batch_item(item: Any) -> bool:
+    """A batched answer is used only with question text and well-formed options"""
+    if not isinstance(item, dict) or not isinstance(item.get("text"), str) or not item["text"].strip():
+        return False
+    options = item.get("options", [])
+    return isinstance(options, list) and all(isinstance(option, dict) and option.get("label") for option in options)
+
+
+def parse_vision_batch_response(response, count: int) -> List[Optional[Dict[str, Any]]]:
+    """
+    Results of a batched request by position (ID - 1)
+
+    Items that are missing, duplicated or fail validation come back as None,
+    so the caller can analyze those crops one by one.
+    """
+    content = response.choices[0].message.content
+    parsed = json.loads(content) if isinstance(content, str) else content
+    items = parsed.get("questions") if isinstance(parsed, dict) else parsed
+    results: List[Optional[Dict[str, Any]]] = [None] * count
+    seen = set()
+    for item in items if isinstance(items, list) else []:
+        request_id = item.get("id") if isinstance(item, dict) else None
+        if isinstance(request_id, str) and request_id.isdigit():
+            request_id = int(request_id)
+        if not isinstance(request_id, int) or not 1 <= request_id <= count or request_id in seen:
+            continue
+        seen.add(request_id)
+        if valid_batch_item(item):
+            results[request_id - 1] = normalize_vision_result(item)
+    return results
+
+
+def _resolve(future: Future, result: Dict[str, Any]) -> None:
+    try:
+        future.set_result(result)
+    except InvalidStateError:  # Cancelled by a consumer that stopped early
+        pass
+
+
+_client_lock = threading.Lock()
+_sync_client = None
+
+
+def get_openai_client():
+    """Shared synchronous client (one connection pool for the process)"""
+    global _sync_client
+    with _client_lock:
+        if _sync_client is None:
+            _sync_client = openai.OpenAI(
+                api_key=OPENAI_API_KEY,
+                base_url=OPENAI_BASE_URL,
+                timeout=OPENAI_TIMEOUT,
+                max_retries=OPENAI_MAX_RETRIES,
+            )
+        return _sync_client
+
+
+def analyze_question_with_openai_vision(
+    image_base64: str,
+    subject: Optional[str] = None,
+    question_number: Optional[int] = None,
+    detail: str = "high",
+) -> Dict[str, Any]:
+    """
+    Analyze question image using OpenAI Vision API (GPT-4o-mini)
+
+    Returns: {
+        "text": str,  # Full question text
+        "stem": str,  # Bold/core question part
+        "options": [{"label": "A", "value": "..."}, ...],
+        "topic": str,
+        "subtopic": str,
+        "difficulty": str,  # "easy", "medium", "hard"
+        "answer": str or None,  # If visible in image
+    }
+    """
+    if not OPENAI_AVAILABLE or not OPENAI_API_KEY:
+        return empty_vision_result()
+
+    request = VisionRequest(image_base64, subject, question_number, detail)
+    cached = lookup_cached_result(request)
+    if cached is not None:
+        return cached
+
+    started = time.perf_counter()
+    try:
+        response = get_openai_client().chat.completions.create(**build_vision_request_kwargs(request))
+        result = parse_vision_response(response)
+        remember_result(request, result, time.perf_counter() - started, response)
+        observe_vision_request(time.perf_counter() - started, ok=True)
+        return result
+
+    except Exception as e:
+        observe_vision_request(time.perf_counter() - started, ok=False)
+        logger.warning("⚠️  OpenAI Vision analysis failed: %s", e)
+        return empty_vision_result()
+
+
+class VisionRunner:
+    """
+    Background asyncio loop owning one pooled AsyncOpenAI client
+
+    submit() is thread-safe and returns a concurrent.futures.Future, so it can be
+    used from synchronous parser code and from inside FastAPI's own event loop.
+    A semaphore caps the number of requests in flight across all callers.
+    """
+
+    def __init__(self, concurrency: int = VISION_CONCURRENCY):
+        self.concurrency = max(1, concurrency)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="openai-vision", daemon=True)
+        self._ready = threading.Event()
+        self._client = None
+        self._semaphore = None
+        self._thread.start()
+        self._ready.wait()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._client = openai.AsyncOpenAI(
+            api_key=OPENAI_API_KEY,
+            base_url=OPENAI_BASE_URL,
+            timeout=OPENAI_TIMEOUT,
+            max_retries=OPENAI_MAX_RETRIES,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.concurrency,
+                    max_keepalive_connections=self.concurrency,
+                ),
+                timeout=OPENAI_TIMEOUT,
+            ),
+        )
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _analyze(self, request: VisionRequest) -> Dict[str, Any]:
+        async with self._semaphore:
+            started = time.perf_counter()
+            try:
+                response = await self._client.chat.completions.create(**build_vision_request_kwargs(request))
+                result = parse_vision_response(response)
+                seconds = time.perf_counter() - started
+                observe_vision_request(seconds, ok=True)
+            except Exception as e:
+                observe_vision_request(time.perf_counter() - started, ok=False)
+                logger.warning("⚠️  OpenAI Vision analysis failed (Q#%s): %s", request.question_number, e)
+                return empty_vision_result()
+        # SQLite writes run off the loop so they don't stall the requests in flight
+        await self._loop.run_in_executor(None, remember_result, request, result, seconds, response)
+        return result
+
+    async def _analyze_batch(self, requests: List[VisionRequest], futures: List[Future]) -> None:
+        if all(future.cancelled() for future in futures):
+            return
+        results: List[Optional[Dict[str, Any]]] = [None] * len(requests)
+        response, seconds = None, 0.0
+        async with self._semaphore:
+            started = time.perf_counter()
+            try:
+                response = await self._client.chat.completions.create(**build_vision_batch_request_kwargs(requests))
+                results = parse_vision_batch_response(response, len(requests))
+                seconds = time.perf_counter() - started
+                observe_vision_request(seconds, ok=True)
+            except Exception as e:
+                observe_vision_request(time.perf_counter() - started, ok=False)
+                logger.warning("⚠️  OpenAI Vision batch of %d failed: %s", len(requests), e)
+
+        for future, result in zip(futures, results):
+            if result is not None:
+                _resolve(future, result)
+        if response is not None:
+            await self._loop.run_in_executor(None, remember_batch_results, requests, results, seconds, response)
+
+        # Anything the batch did not answer properly is analyzed on its own
+        retry = [
+            (request, future)
+            for request, future, result in zip(requests, futures, results)
+            if result is None and not future.cancelled()
+        ]
+        if retry:
+            logger.info("🔁 Vision batch: %d of %d question(s) retried one by one", len(retry), len(requests))
+            fallback = await asyncio.gather(*(self._analyze(request) for request, _ in retry))
+            for (_, future), result in zip(retry, fallback):
+                _resolve(future, result)
+
+    def submit_batch(self, requests: List[VisionRequest]) -> List[Future]:
+        """Analyze several crops in one request (cache hits resolve immediately), one future each"""
+        futures = [Future() for _ in requests]
+        missing = []  # Indices of cache misses
+        for index, request in enumerate(requests):
+            cached = lookup_cached_result(request)
+            if cached is not None:
+                futures[index].set_result(cached)
+            else:
+                missing.append(index)
+
+        if len(missing) == 1:
+            futures[missing[0]] = asyncio.run_coroutine_threadsafe(self._analyze(requests[missing[0]]), self._loop)
+        elif missing:
+            asyncio.run_coroutine_threadsafe(
+                self._analyze_batch([requests[index] for index in missing], [futures[index] for index in missing]),
+                self._loop,
+            )
+        return futures
+
+    def submit(self, request: VisionRequest) -> Future:
+        """Schedule one analysis on the background loop (cache hits resolve immediately)"""
+        cached = lookup_cached_result(request)
+        if cached is not None:
+            future = Future()
+            future.set_result(cached)
+            return future
+        return asyncio.run_coroutine_threadsafe(self._analyze(request), self._loop)
+
+    def close(self) -> None:
+        """Close the pooled client and stop the loop"""
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.close(), self._loop).result(timeout=5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+
+_runner: Optional[VisionRunner] = None
+
+
+def limit_vision_concurrency(limit: int) -> None:
+    """Lower this process's Vision cap before its runner starts (batch worker processes)"""
+    global VISION_CONCURRENCY
+    VISION_CONCURRENCY = max(1, min(VISION_CONCURRENCY, limit))
+
+
+def get_vision_runner() -> VisionRunner:
+    """Process-wide Vision runner (created on first use)"""
+    global _runner
+    with _client_lock:
+        if _runner is None:
+            _runner = VisionRunner(VISION_CONCURRENCY)
+        return _runner
+
+
+def shutdown_vision_runner() -> None:
+    """Release the pooled async client (called on app shutdown)"""
+    global _runner
+    with _client_lock:
+        runner, _runner = _runner, None
+    if runner is not None:
+        runner.close()
+
+
+def iter_vision_results(
+    items: Iterable[Tuple[Any, Optional[VisionRequest]]],
+    concurrency: Optional[int] = None,
+    group_of: Optional[Callable[[Any], Any]] = None,
+    batch_size: int = VISION_BATCH_SIZE,
+) -> Iterator[Tuple[Any, Optional[Dict[str, Any]]]]:
+    """
+    Analyze a stream of (payload, request) pairs with bounded concurrency
+
+    Yields (payload, result) in input order. Items whose request is None are
+    passed through with result None. At most `concurrency` requests (or batches)
+    are read ahead, so upstream work (cropping) overlaps with requests in flight.
+
+    With `group_of` (e.g. the page of a payload) and batch_size > 1, up to
+    batch_size consecutive requests of the same group go out as one batched
+    request; items the batch does not answer validly are retried one by one.
+    """
+    if not OPENAI_AVAILABLE or not OPENAI_API_KEY:
+        for payload, request in items:
+            yield payload, (empty_vision_result() if request is not None else None)
+        return
+
+    if group_of is None:
+        batch_size = 1
+    window = max(1, concurrency or VISION_CONCURRENCY) * batch_size
+    runner = get_vision_runner()
+    pending = deque()
+    # Read but not submitted yet: starts at a request, ends before the next group's first request
+    group: List[Tuple[Any, Optional[VisionRequest]]] = []
+    group_requests = 0
+    group_key = None
+
+    def submit_group() -> None:
+        nonlocal group_requests
+        requests = [request for _, request in group if request is not None]
+        futures = iter(runner.submit_batch(requests) if batch_size > 1 else map(runner.submit, requests))
+        for payload, request in group:
+            pending.append((payload, next(futures) if request is not None else None))
+        group.clear()
+        group_requests = 0
+
+    try:
+        for payload, request in items:
+            if request is not None:
+                key = group_of(payload) if group_of is not None else None
+                if group and (group_requests >= batch_size or key != group_key):
+                    submit_group()
+                group_key = key
+                group_requests += 1
+                group.append((payload, request))
+                if batch_size == 1:
+                    submit_group()
+            elif group:
+                group.append((payload, None))
+            else:
+                pending.append((payload, None))
+
+            while len(pending) > window:
+                done_payload, future = pending.popleft()
+                yield done_payload, (future.result() if future is not None else None)
+
+        submit_group()
+        while pending:
+            done_payload, future = pending.popleft()
+            yield done_payload, (future.result() if future is not None else None)
+    finally:
+        # Consumer stopped early: don't leave requests running for nobody
+        for _, future in pending:
+            if future is not None:
+                future.cancel()
@@ -0,0 +1,187 @@
+"""
+Tile-aware preparation of question crops for OpenAI Vision
+
+High-detail images are billed per 512px tile: the API first fits the image
+into 2048x2048, then shrinks its short side to 768, and counts the 512px
+tiles covering the result (tokens = base + per tile). The stored crop is a
+2x render with white margins, so it often covers more tiles than its text
+needs.
+
+With OPENAI_VISION_IMAGE_PREP=true each crop sent to Vision is:
+
+1. trimmed to its ink plus a small margin
+2. scaled down to the smallest tile grid that keeps text lines at least
+   OPENAI_VISION_MIN_LINE_PX tall (line height is measured from the rows
+   of ink; crops are never scaled up)
+3. sent with detail "low" (one flat token price, 512px box) when it holds
+   text only and its lines stay legible inside 512x512
+
+The stored and returned question images are not changed. Tile and token
+counts are estimates from the published sizing rules, not billed usage.
+"""
+import io
+import math
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from PIL import Image
+
+from .render import is_colorless
+
+VISION_IMAGE_PREP = os.getenv("OPENAI_VISION_IMAGE_PREP", "false").lower() in ("1", "true", "yes")
+VISION_MIN_LINE_PX = int(os.getenv("OPENAI_VISION_MIN_LINE_PX", "14"))
+
+TILE_PX = 512
+MAX_SIDE_PX = 2048
+SHORT_SIDE_PX = 768
+# (base, per tile) tokens; low detail costs the base only
+TILE_TOKENS: Dict[str, Tuple[int, int]] = {"gpt-4o-mini": (2833, 5667)}
+DEFAULT_TILE_TOKENS = (85, 170)
+
+INK_LEVEL = 160  # Gray level below which a pixel counts as text / figure ink
+MARGIN_LEVEL = 245  # Anything darker is kept when trimming
+MARGIN_PX = 8
+FIGURE_LINES = 3  # A run of ink rows this many line heights tall is a figure, not text
+
+
+@dataclass
+class PreparedImage:
+    """A crop ready for Vision, with its estimated cost before and after"""
+    data: bytes
+    detail: str  # "high" | "low"
+    size: Tuple[int, int]
+    tiles: int  # 0 for low detail
+    tokens: int
+    original_bytes: int
+    original_tiles: int
+    original_tokens: int
+
+
+def tile_tokens(model: str) -> Tuple[int, int]:
+    return TILE_TOKENS.get(model, DEFAULT_TILE_TOKENS)
+
+
+def count_tiles(width: int, height: int) -> int:
+    """512px tiles of a high-detail image after the API's own resizing"""
+    scale = min(1.0, MAX_SIDE_PX / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, SHORT_SIDE_PX / min(width, height))
+    width, height = width * scale, height * scale
+    return math.ceil(width / TILE_PX) * math.ceil(height / TILE_PX)
+
+
+def estimate_tokens(tiles: int, model: str) -> int:
+    """Image tokens for `tiles` high-detail tiles (0 tiles = low detail)"""
+    base, per_tile = tile_tokens(model)
+    return base + per_tile * tiles
+
+
+def ink_rows(ink: np.ndarray) -> List[int]:
+    """Heights of the runs of consecutive rows containing ink (text lines, figures)"""
+    rows = np.concatenate(([False], ink.any(axis=1), [False]))
+    edges = np.flatnonzero(rows[1:] != rows[:-1])
+    return (edges[1::2] - edges[0::2]).tolist()
+
+
+def choose_scale(width: int, height: int, min_scale: float) -> float:
+    """Largest scale in [min_scale, 1] among those covering the fewest tiles"""
+    candidates = {1.0, min_scale}
+    for side in (width, height):
+        for tiles in range(1, math.ceil(side / TILE_PX) + 1):
+            candidates.add(TILE_PX * tiles / side)
+    candidates = [scale for scale in candidates if min_scale <= scale <= 1.0]
+    return min(
+        candidates,
+        key=lambda scale: (count_tiles(max(1, int(width * scale)), max(1, int(height * scale))), -scale),
+    )
+
+
+def encode(image: Image.Image) -> bytes:
+    output = io.BytesIO()
+    image.save(output, format="PNG")
+    return output.getvalue()
+
+
+def prepare_vision_image(image_bytes: bytes, model: str, min_line_px: int = VISION_MIN_LINE_PX) -> PreparedImage:
+    """Trim, rescale and pick the detail level of one crop (see module docstring)"""
+    image = Image.open(io.BytesIO(image_bytes))
+    image = image.convert("RGB") if image.mode not in ("L", "RGB") else image
+    original_tiles = count_tiles(*image.size)
+    original_tokens = estimate_tokens(original_tiles, model)
+
+    gray = np.asarray(image.convert("L"))
+    marked = gray < MARGIN_LEVEL
+    rows, columns = np.flatnonzero(marked.any(axis=1)), np.flatnonzero(marked.any(axis=0))
+    if len(rows):
+        box = (
+            max(0, columns[0] - MARGIN_PX), max(0, rows[0] - MARGIN_PX),
+            min(image.width, columns[-1] + 1 + MARGIN_PX), min(image.height, rows[-1] + 1 + MARGIN_PX),
+        )
+        image = image.crop(tuple(int(value) for value in box))
+        gray = gray[box[1]:box[3], box[0]:box[2]]
+    if image.mode == "RGB" and is_colorless(image):
+        image = image.convert("L")
+
+    runs = ink_rows(gray < INK_LEVEL)
+    line_height = float(np.median(runs)) if runs else 0.0
+    # Unmeasurable text is not shrunk
+    min_scale = min(1.0, min_line_px / line_height) if line_height else 1.0
+    text_only = bool(runs) and max(runs) < FIGURE_LINES * line_height
+
+    width, height = image.size
+    low_scale = min(1.0, TILE_PX / max(width, height))
+    if text_only and low_scale >= min_scale:
+        detail, scale = "low", low_scale
+    else:
+        detail, scale = "high", choose_scale(width, height, min_scale)
+
+    if scale < 1.0:
+        image = image.resize((max(1, int(width * scale)), max(1, int(height * scale))), Image.LANCZOS)
+    tiles = count_tiles(*image.size) if detail == "high" else 0
+    return PreparedImage(
+        data=encode(image),
+        detail=detail,
+        size=image.size,
+        tiles=tiles,
+        tokens=estimate_tokens(tiles, model),
+        original_bytes=len(image_bytes),
+        original_tiles=original_tiles,
+        original_tokens=original_tokens,
+    )
+
+
+class VisionImageTotals:
+    """Upload size, tiles and tokens of one parse's Vision images, before and after preparation"""
+
+    def __init__(self):
+        self.images = 0
+        self.low_detail = 0
+        self.bytes = [0, 0]
+        self.tiles = [0, 0]
+        self.tokens = [0, 0]
+
+    def add(self, prepared: PreparedImage) -> None:
+        self.images += 1
+        self.low_detail += prepared.detail == "low"
+        self.bytes[0] += prepared.original_bytes
+        self.bytes[1] += len(prepared.data)
+        self.tiles[0] += prepared.original_tiles
+        self.tiles[1] += prepared.tiles
+        self.tokens[0] += prepared.original_tokens
+        self.tokens[1] += prepared.tokens
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Totals as {"before": ..., "after": ...} plus tokens per question"""
+        return {
+            "images": self.images,
+            "low_detail": self.low_detail,
+            "bytes": {"before": self.bytes[0], "after": self.bytes[1]},
+            "tiles": {"before": self.tiles[0], "after": self.tiles[1]},
+            "tokens": {"before": self.tokens[0], "after": self.tokens[1]},
+            "tokens_per_question": {
+                "before": round(self.tokens[0] / self.images) if self.images else 0,
+                "after": round(self.tokens[1] / self.images) if self.images else 0,
+            },
+        }
@@ -0,0 +1,87 @@
+"""
+Benchmark: a batch of exam PDFs one after another vs on the batch worker pool
+
+Run from backend/:
+    python -m benchmarks.bench_batch [--documents 12] [--workers 4] [--pages 4 12]
+
+Documents come from benchmarks/exam_pdf with different page counts and seeds.
+The sequential run parses them in this process with parse_pdf_with_ocr();
+the batch run goes through iter_batch_records() on a BatchPool of --workers
+processes (already started, as in the server). Question counts must match.
+Ideal batch time is sequential time / workers; efficiency is how close the
+batch gets to it.
+
+Vision and the result cache are disabled, parser logging is set to ERROR and
+question images go to a temporary directory.
+"""
+import os
+import tempfile
+
+# Before the app modules read their configuration
+os.environ["OPENAI_API_KEY"] = ""
+os.environ["PARSE_CACHE_ENABLED"] = "false"
+os.environ.setdefault("PARSE_LOG_LEVEL", "ERROR")
+os.environ.setdefault("PARSE_IMAGES_DIR", os.path.join(tempfile.gettempdir(), "bench_batch_images"))
+
+import argparse
+import time
+from typing import List
+
+from app import batch
+from app.parse_pdf import parse_pdf_with_ocr
+from app.render import DEFAULT_RENDER_OPTIONS
+from app.uploads import SpooledUpload
+from benchmarks.exam_pdf import ExamSpec, generate_exam
+
+
+def make_upload(name: str, pdf_bytes: bytes) -> SpooledUpload:
+    upload = SpooledUpload(name, spool_bytes=len(pdf_bytes))
+    upload.write(pdf_bytes)
+    upload.finish()
+    return upload
+
+
+def run_batch(uploads: List[SpooledUpload]) -> List[int]:
+    result = batch.collect_batch_result(batch.iter_batch_records(uploads, DEFAULT_RENDER_OPTIONS))
+    assert result["failed"] == 0, result
+    return [document["total_questions"] for document in result["documents"]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--documents", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--pages", type=int, nargs=2, default=[4, 12], help="page count range")
+    args = parser.parse_args()
+
+    low, high = args.pages
+    documents = [
+        generate_exam(ExamSpec(pages=low + (index * 5) % (high - low + 1), seed=index)).pdf_bytes
+        for index in range(args.documents)
+    ]
+    print(f"📚 {len(documents)} documents, {low}-{high} pages, {sum(map(len, documents)) / 1e6:.1f} MB")
+
+    start = time.perf_counter()
+    sequential = [len(parse_pdf_with_ocr(pdf, workers=1)) for pdf in documents]
+    sequential_seconds = time.perf_counter() - start
+
+    batch._pool = batch.BatchPool(args.workers)
+    try:
+        # Start every worker process (distinct documents: duplicates are parsed once)
+        run_batch([make_upload(f"warmup-{index}.pdf", pdf) for index, pdf in enumerate(documents[:args.workers])])
+        uploads = [make_upload(f"exam-{index}.pdf", pdf) for index, pdf in enumerate(documents)]
+        start = time.perf_counter()
+        batched = run_batch(uploads)
+        batch_seconds = time.perf_counter() - start
+    finally:
+        batch.shutdown_batch_pool()
+    assert batched == sequential, (batched, sequential)
+
+    ideal = sequential_seconds / args.workers
+    print(f"\n   sequential       {sequential_seconds:7.2f} s   ({sum(sequential)} questions)")
+    print(f"   batch ({args.workers} proc)   {batch_seconds:7.2f} s   {sequential_seconds / batch_seconds:5.2f}x")
+    print(f"   ideal            {ideal:7.2f} s   efficiency {ideal / batch_seconds:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark: PageLayout (NumPy) column detection vs the previous Python loops
+
+Run from backend/:
+    python -m benchmarks.bench_layout [--lines 50 1000 10000] [--repeat 20]
+
+For synthetic two-column pages (benchmarks/bench_segmentation) the columns
+are detected and the lines grouped by column by the current parser and by
+benchmarks/reference_segmentation.py; outputs must be identical. Memory
+per line compares the slots TextBlock with the previous __dict__ dataclass.
+"""
+import argparse
+import contextlib
+import io
+import time
+import tracemalloc
+from dataclasses import astuple, dataclass
+
+from app.layout import PageLayout
+from app.parse_pdf import TextBlock, detect_columns, group_blocks_by_column
+from benchmarks import reference_segmentation as reference
+from benchmarks.bench_segmentation import build_page
+
+PAGE_WIDTH = 595
+
+
+@dataclass
+class DictTextBlock:
+    """TextBlock as it was before slots (one __dict__ per line)"""
+    x0: float
+    y0: float
+    x1: float
+    y1: float
+    text: str
+    font_size: float
+    font_name: str
+    is_bold: bool
+    page_num: int
+
+
+def columns_current(blocks):
+    layout = PageLayout(blocks)
+    columns = detect_columns(blocks, PAGE_WIDTH, layout)
+    return columns, group_blocks_by_column(blocks, columns, layout)
+
+
+def columns_reference(blocks):
+    columns = reference.detect_columns(blocks, PAGE_WIDTH)
+    return columns, reference.group_blocks_by_column(blocks, columns)
+
+
+def timed(func, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):  # detect_columns logs every page
+            start = time.perf_counter()
+            result = func()
+            best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def allocated(factory, rows):
+    """Bytes held by the objects factory builds from rows (strings shared, not counted)"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [factory(*row) for row in rows]
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del objects
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lines", type=int, nargs="+", default=[50, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"📏 best of {args.repeat}; columns = detect_columns + group_blocks_by_column")
+    for lines in args.lines:
+        blocks = build_page(lines)
+
+        ref_time, (ref_columns, ref_groups) = timed(lambda: columns_reference(blocks), args.repeat)
+        new_time, (new_columns, new_groups) = timed(lambda: columns_current(blocks), args.repeat)
+        assert new_columns == ref_columns
+        assert {col: [id(b) for b in group] for col, group in new_groups.items()} == \
+               {col: [id(b) for b in group] for col, group in ref_groups.items()}
+
+        rows = [astuple(b) for b in blocks]
+        dict_bytes = allocated(DictTextBlock, rows)
+        slots_bytes = allocated(TextBlock, rows)
+
+        print(f"\n   {len(blocks)} lines, {len(new_columns)} columns (output identical)")
+        print(f"   columns  {ref_time * 1e6:9.1f} µs → {new_time * 1e6:7.1f} µs   {ref_time / new_time:6.1f}x")
+        print(f"   memory   {dict_bytes / len(blocks):9.0f} B/line → {slots_bytes / len(blocks):5.0f} B/line")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Microbenchmark: Turkish text normalizer vs the sequential str.replace version
+
+Run from backend/:
+    python -m benchmarks.bench_normalizer [--lines 20000] [--repeat 5]
+
+The corpus mimics PDF text lines: clean Turkish text, broken accent sequences
+("s¸", "˙I", ligatures) and headers/footers that repeat on every page.
+Both implementations are checked for identical output before timing.
+"""
+import argparse
+import random
+import time
+
+from app.turkish_text import (
+    _normalize,
+    _normalize_memoized,
+    fix_turkish_encoding,
+    fix_turkish_encoding_sequential,
+)
+
+WORDS = [
+    "Aşağıdakilerden", "hangisi", "doğrudur", "cümlede", "yazım", "yanlışı",
+    "vardır", "paragrafta", "anlatılmak", "istenen", "öğrenci", "sınav",
+    "soru", "metin", "bilgi", "üçgen", "çözüm", "işlem", "sonucu", "kaçtır",
+    "A)", "B)", "C)", "D)", "E)", "12", "3,5", "x²", "%40",
+]
+BROKEN = ["s¸", "˙I", "c¸", "g˘", "o¨", "u¨", "ﬁ", "ˆı", "S¸", "İ", "i"]
+HEADERS = [
+    "TYT DENEME SINAVI - 3",
+    "TÜRKÇE TESTİ",
+    "Diğer sayfaya geçiniz.",
+    "www.ornekyayinlari.com",
+]
+
+
+def build_corpus(lines: int, seed: int = 7):
+    rnd = random.Random(seed)
+    corpus = []
+    for i in range(lines):
+        if i % 10 == 0:
+            corpus.append(rnd.choice(HEADERS))  # Repeats on every page
+            continue
+        words = [rnd.choice(WORDS) for _ in range(rnd.randint(3, 14))]
+        if rnd.random() < 0.3:  # Some PDFs split accents from their letters
+            words[rnd.randrange(len(words))] += rnd.choice(BROKEN)
+        corpus.append("  ".join(words) if rnd.random() < 0.1 else " ".join(words))
+    return corpus
+
+
+def bench(name, func, corpus, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        _normalize_memoized.cache_clear()
+        start = time.perf_counter()
+        for line in corpus:
+            func(line)
+        best = min(best, time.perf_counter() - start)
+    per_call = best / len(corpus) * 1e6
+    print(f"   {name:<28} {best * 1000:8.1f} ms   {per_call:6.2f} µs/line")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lines", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.lines)
+    for line in corpus:
+        assert fix_turkish_encoding(line) == fix_turkish_encoding_sequential(line), line
+
+    print(f"📏 {len(corpus)} lines, best of {args.repeat}")
+    baseline = bench("sequential replace", fix_turkish_encoding_sequential, corpus, args.repeat)
+    single = bench("single pass", _normalize, corpus, args.repeat)
+    memo = bench("single pass + memo", fix_turkish_encoding, corpus, args.repeat)
+    info = _normalize_memoized.cache_info()
+    print(f"   (memo: {info.hits} hits, {info.misses} misses per run)")
+
+    # Call sites re-normalize joined block text; marked text returns immediately
+    normalized = [fix_turkish_encoding(line) for line in corpus]
+    again = bench("already normalized", fix_turkish_encoding, normalized, args.repeat)
+
+    print(f"\n   single pass:        {baseline / single:5.1f}x")
+    print(f"   single pass + memo: {baseline / memo:5.1f}x")
+    print(f"   already normalized: {baseline / again:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
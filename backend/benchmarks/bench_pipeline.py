@@ -0,0 +1,352 @@
+"""
+Benchmark: every parser stage on synthetic exam PDFs, with stored results
+
+Run from backend/:
+    python -m benchmarks.bench_pipeline [--documents two_column scanned] [--pages 24]
+                                        [--repeat 5] [--workers 1] [--label NAME]
+                                        [--compare benchmarks/results/OTHER.json]
+
+Documents come from benchmarks/exam_pdf (seeded, identical on every run).
+Each stage runs in a fresh process, so its peak memory is its own:
+
+- extract  extract_text_blocks_with_fonts() on every question page
+- ocr      Tesseract: every question crop (text PDFs) or whole pages (scanned)
+- segment  find_question_blocks() on every question page
+- options  extract_options_with_clustering() for every question
+- crop     crop_question_image() (render + encode) for every question
+- parse    parse_pdf_with_ocr() end to end, with its StageTimer breakdown
+
+Results are written to benchmarks/results/<label>.json (default: parser
+version + git commit). --compare prints the change per stage against an
+earlier file and exits with status 1 when a stage got slower or bigger than
+--threshold; compare runs from the same machine only.
+
+Vision is disabled for the run (no API calls), parser logging is set to
+ERROR and question images go to a temporary directory.
+"""
+import os
+import tempfile
+
+# Before the app modules read their configuration
+os.environ["OPENAI_API_KEY"] = ""
+os.environ.setdefault("PARSE_LOG_LEVEL", "ERROR")
+os.environ.setdefault("PARSE_IMAGES_DIR", os.path.join(tempfile.gettempdir(), "bench_pipeline_images"))
+
+import argparse
+import gc
+import json
+import multiprocessing
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, replace
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+from app.ocr import OCR_AVAILABLE, get_ocr_pool
+from app.parse_pdf import (
+    PARSER_VERSION,
+    crop_question_image,
+    extract_options_with_clustering,
+    extract_text_blocks_with_fonts,
+    find_question_blocks,
+    ocr_lines_to_text_blocks,
+    parse_pdf_with_ocr,
+    render_ocr_image,
+    render_page_for_ocr,
+)
+from app.render import OCR_RENDER_SCALE
+from app.timing import StageTimer
+from benchmarks.exam_pdf import ExamSpec, GeneratedExam, generate_exam
+
+RESULTS_DIR = Path(__file__).parent / "results"
+STAGES = ("extract", "ocr", "segment", "options", "crop", "parse")
+DOCUMENTS = {
+    "two_column": ExamSpec(),
+    "one_column": ExamSpec(columns=1, question_style="soru", option_style="dot", bold_stems=False),
+    "scanned": ExamSpec(pages=4, scanned=True),
+}
+
+
+def reset_peak_rss() -> bool:
+    """Restart the kernel's RSS high-water mark (Linux); False when unsupported"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def rss_mb(field: str = "VmHWM") -> Optional[float]:
+    """Current (VmRSS) or peak (VmHWM) resident memory in MB; peak falls back to ru_maxrss"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if field != "VmHWM":
+        return None
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def ocr_unavailable() -> Optional[str]:
+    """Why OCR cannot run here (None when it can)"""
+    if not OCR_AVAILABLE:
+        return "pytesseract/tesserocr not installed"
+    try:
+        get_ocr_pool().image_to_string(Image.new("L", (64, 32), 255))
+    except Exception as e:
+        return f"OCR failed: {e}"
+    return None
+
+
+class SkipStage(Exception):
+    pass
+
+
+class Document:
+    """An opened exam and the intermediate results later stages start from"""
+
+    def __init__(self, exam: GeneratedExam):
+        self.exam = exam
+        self.pdf = fitz.open(stream=exam.pdf_bytes, filetype="pdf")
+        self.pages = [self.pdf[page_index] for page_index in exam.question_pages]
+
+    def text_blocks(self) -> List[list]:
+        return [extract_text_blocks_with_fonts(page) for page in self.pages]
+
+    def page_ocr_blocks(self) -> List[list]:
+        pool = get_ocr_pool()
+        futures = [pool.submit_lines(render_page_for_ocr(page)) for page in self.pages]
+        return [
+            ocr_lines_to_text_blocks(future.result(), page.number + 1, OCR_RENDER_SCALE)
+            for page, future in zip(self.pages, futures)
+        ]
+
+    def blocks(self) -> List[list]:
+        return self.page_ocr_blocks() if self.exam.spec.scanned else self.text_blocks()
+
+    def question_blocks(self, blocks: List[list]) -> List[Tuple[fitz.Page, Any]]:
+        questions = []
+        for page, page_blocks in zip(self.pages, blocks):
+            found = find_question_blocks(page, page.number + 1, len(questions), list(page_blocks))
+            questions += [(page, q_block) for q_block in found]
+        return questions
+
+    def crop_ocr(self, questions) -> int:
+        # Queued as the parser queues a page's OCR fallbacks, then collected
+        pool = get_ocr_pool()
+        futures = [pool.submit(render_ocr_image(page, fitz.Rect(q.x0, q.y0, q.x1, q.y1))) for page, q in questions]
+        return len([future.result() for future in futures])
+
+
+def prepare_stage(stage: str, document: Document, workers: int) -> Tuple[Callable[[], Any], str, int]:
+    """(run, unit, items): everything the stage starts from is built here, outside the timing"""
+    pages = len(document.pages)
+    scanned = document.exam.spec.scanned
+
+    if stage == "parse":
+        def parse():
+            timer = StageTimer()
+            return parse_pdf_with_ocr(document.exam.pdf_bytes, workers=workers, timer=timer), timer
+
+        return parse, "pages", len(document.pdf)
+    if stage == "extract":
+        if scanned:
+            raise SkipStage("no text layer (see ocr)")
+        return document.text_blocks, "pages", pages
+
+    needs_ocr = scanned or stage == "ocr"
+    if needs_ocr:
+        reason = ocr_unavailable()
+        if reason:
+            raise SkipStage(reason)
+    if stage == "ocr" and scanned:
+        return document.page_ocr_blocks, "pages", pages
+
+    blocks = document.blocks()
+    if stage == "segment":
+        return lambda: document.question_blocks(blocks), "pages", pages
+
+    questions = document.question_blocks(blocks)
+    if stage == "ocr":
+        return lambda: document.crop_ocr(questions), "questions", len(questions)
+    if stage == "options":
+        return lambda: [extract_options_with_clustering(q.text_blocks) for _, q in questions], "questions", len(questions)
+    if stage == "crop":
+        return lambda: [crop_question_image(page, q) for page, q in questions], "questions", len(questions)
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def run_stage(stage: str, spec: ExamSpec, repeat: int, workers: int) -> Dict[str, Any]:
+    """One stage in this (fresh) process: best / median time, throughput, peak memory"""
+    document = Document(generate_exam(spec))
+    try:
+        run, unit, items = prepare_stage(stage, document, workers)
+    except SkipStage as e:
+        return {"skipped": str(e)}
+
+    gc.collect()
+    baseline = rss_mb("VmRSS")
+    peak_resettable = reset_peak_rss()
+    times, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = run()
+        times.append(time.perf_counter() - started)
+    peak = rss_mb()
+
+    best = min(times)
+    stats = {
+        "unit": unit,
+        "items": items,
+        "best_ms": round(best * 1000, 2),
+        "median_ms": round(statistics.median(times) * 1000, 2),
+        "per_second": round(items / best, 2) if best else None,
+        "peak_rss_mb": round(peak, 1) if peak is not None else None,
+        "baseline_rss_mb": round(baseline, 1) if baseline is not None else None,
+        "peak_is_stage_only": peak_resettable,
+    }
+    if stage == "parse":
+        questions, timer = result  # Breakdown of the last run
+        stats["questions"] = len(questions)
+        stats["stages"] = timer.snapshot()["stages"]
+    return stats
+
+
+def run_isolated(stage: str, spec: ExamSpec, repeat: int, workers: int) -> Dict[str, Any]:
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(run_stage, stage, spec, repeat, workers).result()
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> Dict[str, Any]:
+    import numpy
+
+    return {
+        "parser_version": PARSER_VERSION,
+        "commit": git_commit(),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pymupdf": fitz.VersionBind,
+        "numpy": numpy.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def print_stage(stage: str, stats: Dict[str, Any]) -> None:
+    if "skipped" in stats:
+        print(f"   {stage:<8} skipped: {stats['skipped']}")
+        return
+    peak = stats["peak_rss_mb"]
+    memory = f"peak {peak:7.1f} MB (+{peak - stats['baseline_rss_mb']:.1f})" if peak and stats["baseline_rss_mb"] else ""
+    print(f"   {stage:<8} {stats['best_ms']:9.1f} ms  (median {stats['median_ms']:9.1f})  "
+          f"{stats['per_second']:8.1f} {stats['unit']}/s   {memory}")
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Print per-stage changes; returns the regressions"""
+    regressions = []
+    base_env = baseline["environment"]
+    print(f"\n📊 vs {base_env['parser_version']} ({base_env['commit']}, {base_env['created']})")
+    for name, document in current["documents"].items():
+        old = baseline["documents"].get(name)
+        if old is None or old["spec"] != document["spec"]:
+            print(f"   {name}: not in baseline with the same spec, skipped")
+            continue
+        for stage, stats in document["stages"].items():
+            old_stats = old["stages"].get(stage, {})
+            if "best_ms" not in stats or "best_ms" not in old_stats:
+                continue
+            ratio = stats["best_ms"] / old_stats["best_ms"]
+            line = f"   {name:<10} {stage:<8} {old_stats['best_ms']:9.1f} → {stats['best_ms']:9.1f} ms  {ratio:5.2f}x"
+            if ratio > 1 + threshold:
+                regressions.append(f"{name}/{stage}: {ratio:.2f}x slower")
+                line += "  ⚠️  slower"
+            old_peak, peak = old_stats.get("peak_rss_mb"), stats.get("peak_rss_mb")
+            if old_peak and peak and peak > old_peak * (1 + threshold) and peak - old_peak > 5:
+                regressions.append(f"{name}/{stage}: peak memory {old_peak:.0f} → {peak:.0f} MB")
+                line += f"  ⚠️  peak {old_peak:.0f} → {peak:.0f} MB"
+            print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--documents", nargs="+", choices=list(DOCUMENTS), default=list(DOCUMENTS))
+    parser.add_argument("--pages", type=int, help="question pages per document (default: per document)")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=1, help="segmentation processes for the parse stage")
+    parser.add_argument("--label", help="results file name (default: <parser version>-<commit>)")
+    parser.add_argument("--compare", type=Path, help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change reported as a regression")
+    args = parser.parse_args()
+
+    env = environment()
+    results = {"environment": env, "repeat": args.repeat, "workers": args.workers, "documents": {}}
+    print(f"📏 best of {args.repeat}, one process per stage; parser {env['parser_version']} ({env['commit']})")
+
+    for name in args.documents:
+        spec = DOCUMENTS[name] if args.pages is None else replace(DOCUMENTS[name], pages=args.pages)
+        exam = generate_exam(spec)
+        print(f"\n📄 {name}: {len(exam.question_pages)} question pages + {len(exam.answer_key_pages)} answer key, "
+              f"{exam.total_questions} questions, {len(exam.pdf_bytes) / 1024:.0f} KB")
+
+        stages = {}
+        for stage in args.stages:
+            stages[stage] = run_isolated(stage, spec, args.repeat, args.workers)
+            print_stage(stage, stages[stage])
+        if "questions" in stages.get("parse", {}) and not spec.scanned:
+            found = stages["parse"]["questions"]
+            if found != exam.total_questions:
+                print(f"   ⚠️  parse found {found} of {exam.total_questions} questions")
+
+        results["documents"][name] = {
+            "spec": {**asdict(spec), "subjects": list(spec.subjects)},  # As read back from JSON
+            "total_questions": exam.total_questions,
+            "pdf_bytes": len(exam.pdf_bytes),
+            "stages": stages,
+        }
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    label = args.label or f"{env['parser_version']}-{env['commit'] or 'local'}"
+    output = RESULTS_DIR / f"{label}.json"
+    output.write_text(json.dumps(results, indent=2, ensure_ascii=False) + "\n")
+    print(f"\n💾 {output}")
+
+    if args.compare is not None:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) over {args.threshold:.0%}: " + "; ".join(regressions))
+            sys.exit(1)
+        print(f"\n✅ No stage slower or bigger than {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark: segmentation range queries (bisect) vs the previous full rescans
+
+Run from backend/:
+    python -m benchmarks.bench_segmentation [--lines 1000 4000 16000] [--repeat 3]
+
+Synthetic pages hold thousands of text lines in two columns: numbered
+questions, stems, "Aşağıdakilerden hangisi" lines followed by A)-E) options
+and multi-line options. Each page is segmented with find_question_blocks()
+and every question's options and text are extracted, by the current parser
+and by benchmarks/reference_segmentation.py; outputs must be identical.
+"""
+import argparse
+import contextlib
+import io
+import random
+import time
+
+import fitz  # PyMuPDF
+
+from app.parse_pdf import (
+    QuestionBlock,
+    TextBlock,
+    extract_options_with_clustering,
+    extract_question_text,
+    find_question_blocks,
+)
+from benchmarks import reference_segmentation as reference
+
+WORDS = ["Aşağıdakilerden", "hangisi", "doğrudur", "paragrafta", "öğrenci", "sınav", "metin", "bilgi", "sonucu"]
+LINE_HEIGHT = 12.0
+COLUMNS = (40.0, 320.0)
+
+
+def build_page(lines: int, seed: int = 11):
+    """TextBlocks of one synthetic page (reading order mostly, some lines out of order)"""
+    rnd = random.Random(seed)
+    blocks = []
+    rows = lines // len(COLUMNS)
+    for x in COLUMNS:
+        y = 40.0
+        number = 1
+        while y < 40.0 + rows * LINE_HEIGHT:
+            def line(text, dx=0.0, bold=False):
+                nonlocal y
+                blocks.append(TextBlock(x + dx, y, x + dx + 220, y + 10, text, 10.0, "Bold" if bold else "Regular", bold, 1))
+                y += LINE_HEIGHT
+
+            line(f"{number}. " + " ".join(rnd.choice(WORDS) for _ in range(6)).capitalize(), bold=rnd.random() < 0.3)
+            for _ in range(rnd.randint(1, 6)):
+                line(" ".join(rnd.choice(WORDS) for _ in range(8)), dx=12)
+            line("Aşağıdakilerden hangisi doğrudur?", dx=12, bold=True)
+            for label in "ABCDE":
+                line(f"{label}) " + " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(2, 5))), dx=12)
+                if rnd.random() < 0.2:  # Option continued on the next line
+                    line(" ".join(rnd.choice(WORDS) for _ in range(3)), dx=14)
+            number += 1
+
+    # Text layers are not always in reading order
+    for _ in range(len(blocks) // 20):
+        i, j = rnd.randrange(len(blocks)), rnd.randrange(len(blocks))
+        blocks[i], blocks[j] = blocks[j], blocks[i]
+    return blocks
+
+
+def segment(page, blocks):
+    return find_question_blocks(page, 1, 0, list(blocks))
+
+
+def segment_reference(page, blocks):
+    return reference.find_question_blocks(page, 1, 0, list(blocks))
+
+
+def extract(question_blocks, options_fn, text_fn):
+    results = []
+    for q_block in question_blocks:
+        options = options_fn(q_block.text_blocks)
+        results.append((options, text_fn(q_block.text_blocks, options)))
+    return results
+
+
+def timed(func, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):  # The parser logs every question
+            start = time.perf_counter()
+            result = func()
+            best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lines", type=int, nargs="+", default=[1000, 4000, 16000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"📏 best of {args.repeat}; segment = find_question_blocks, extract = options + question text")
+    for lines in args.lines:
+        blocks = build_page(lines)
+        page = fitz.open().new_page(width=595, height=40 + lines * LINE_HEIGHT)
+
+        ref_seg, ref_questions = timed(lambda: segment_reference(page, blocks), args.repeat)
+        new_seg, new_questions = timed(lambda: segment(page, blocks), args.repeat)
+        assert [(q.pdf_number, q.x0, q.y0, q.x1, q.y1, [id(b) for b in q.text_blocks]) for q in new_questions] == \
+               [(q.pdf_number, q.x0, q.y0, q.x1, q.y1, [id(b) for b in q.text_blocks]) for q in ref_questions]
+
+        # One long block per page stresses the per-option scans inside a question
+        whole = [QuestionBlock(0, None, 1, 0, 0, page.rect.width, page.rect.height, list(blocks))] + new_questions
+        ref_ext, ref_result = timed(
+            lambda: extract(whole, reference.extract_options_with_clustering, reference.extract_question_text),
+            args.repeat,
+        )
+        new_ext, new_result = timed(
+            lambda: extract(whole, extract_options_with_clustering, extract_question_text), args.repeat
+        )
+        assert new_result == ref_result
+
+        print(f"\n   {len(blocks)} lines, {len(new_questions)} questions (output identical)")
+        print(f"   segment  {ref_seg * 1000:9.1f} ms → {new_seg * 1000:7.1f} ms   {ref_seg / new_seg:6.1f}x")
+        print(f"   extract  {ref_ext * 1000:9.1f} ms → {new_ext * 1000:7.1f} ms   {ref_ext / new_ext:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark: Vision upload size, tiles and tokens with and without image preparation
+
+Run from backend/:
+    python -m benchmarks.bench_vision_image [--pages 12] [--model gpt-4o-mini] [--min-line-px 14]
+
+Every question crop of the benchmarks/exam_pdf documents (as parse_pdf_with_ocr
+stores it) goes through prepare_vision_image(). Printed per document: crops,
+share sent with low detail, bytes, tiles and estimated tokens before → after,
+and the preparation time per crop. Token estimates follow the published
+sizing rules for --model; response times need a real endpoint (the parse
+summary's vision_wait stage with OPENAI_VISION_IMAGE_PREP on and off).
+
+Vision and the result cache are disabled, parser logging is set to ERROR and
+question images go to a temporary directory.
+"""
+import os
+import tempfile
+
+# Before the app modules read their configuration
+os.environ["OPENAI_API_KEY"] = ""
+os.environ["PARSE_CACHE_ENABLED"] = "false"
+os.environ.setdefault("PARSE_LOG_LEVEL", "ERROR")
+os.environ.setdefault("PARSE_IMAGES_DIR", os.path.join(tempfile.gettempdir(), "bench_vision_image_images"))
+
+import argparse
+import time
+from dataclasses import replace
+
+from app.images import digest_from_url, get_image_store
+from app.parse_pdf import parse_pdf_with_ocr, question_to_json
+from app.vision_image import VISION_MIN_LINE_PX, VisionImageTotals, prepare_vision_image
+from benchmarks.exam_pdf import ExamSpec, generate_exam
+
+DOCUMENTS = {
+    "two_column": ExamSpec(),
+    "one_column": ExamSpec(columns=1, question_style="soru", option_style="dot", bold_stems=False),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=12)
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--min-line-px", type=int, default=VISION_MIN_LINE_PX)
+    args = parser.parse_args()
+
+    store = get_image_store()
+    print(f"{'document':<12} {'crops':>5} {'low':>5} {'bytes':>21} {'tiles':>11} {'tokens':>19} {'prep':>8}")
+    for name, spec in DOCUMENTS.items():
+        questions = parse_pdf_with_ocr(generate_exam(replace(spec, pages=args.pages)).pdf_bytes)
+        crops = [
+            store.get(digest_from_url(question_to_json(question)["content"]["image"]))
+            for question in questions
+        ]
+        crops = [crop for crop in crops if crop]
+
+        totals = VisionImageTotals()
+        start = time.perf_counter()
+        for crop in crops:
+            totals.add(prepare_vision_image(crop, args.model, args.min_line_px))
+        prep_ms = (time.perf_counter() - start) * 1000 / max(1, len(crops))
+
+        stats = totals.snapshot()
+        size, tiles, tokens = stats["bytes"], stats["tiles"], stats["tokens"]
+        print(
+            f"{name:<12} {stats['images']:>5} {stats['low_detail'] / max(1, stats['images']):>5.0%} "
+            f"{size['before'] / 1e6:>8.2f} → {size['after'] / 1e6:>5.2f} MB "
+            f"{tiles['before']:>5} → {tiles['after']:<3} "
+            f"{tokens['before']:>9,} → {tokens['after']:<9,} {prep_ms:>5.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
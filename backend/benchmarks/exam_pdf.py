@@ -0,0 +1,333 @@
+"""
+Synthetic Turkish exam PDFs for benchmarks
+
+Run from backend/ to write one to disk:
+    python -m benchmarks.exam_pdf exam.pdf [--pages 20] [--columns 1] [--scanned] ...
+
+Pages look like a printed deneme sınavı: a subject heading, questions in one
+or two columns (number, paragraph, optional figure, stem, options A-E),
+a page footer, and a "CEVAP ANAHTARI" page at the end with one answer table
+per subject. Numbering restarts for every subject, as the parser expects.
+The scanned variant renders every page to a grayscale image and keeps only
+the images (no text layer), like a photocopied booklet.
+
+Text is written with PyMuPDF's built-in Nimbus fonts through a TextWriter, so
+Turkish letters survive without any system fonts. Output depends only on the
+ExamSpec (seeded), so documents are identical across runs and machines.
+"""
+import argparse
+import random
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 40
+COLUMN_SPACING = 24
+TOP = 74  # Below the page heading
+BOTTOM = PAGE_HEIGHT - 50  # Above the footer
+
+FONT = fitz.Font("helv")
+FONT_BOLD = fitz.Font("hebo")
+FONT_SIZE = 9.5
+LEADING = 12.5
+QUESTION_SPACING = 22
+
+QUESTION_STYLES = {
+    "number": "{n}. ",  # "12. Paragraf ..."
+    "paren": "{n}) ",  # "12) Paragraf ..."
+    "soru": "Soru {n}",  # "Soru 12" on its own line
+}
+OPTION_STYLES = {"paren": "{label}) ", "dot": "{label}. "}
+LABELS = "ABCDE"
+
+WORDS = (
+    "öğrenci sınav metin bilgi sonuç düşünce paragraf yazar anlatım cümle olay kişi şehir ağaç "
+    "çalışma güneş ışık değişim doğa gelişme üretim örnek şekil sayı oran büyüklük değer işlem "
+    "süre hız yol çözüm soru ilişki görüş yaşam dünya toplum kültür tarih coğrafya iklim bölge"
+).split()
+OPENINGS = [
+    "Bir araştırmada", "Aşağıdaki metinde", "Öğretmen sınıfta", "Şekildeki grafikte",
+    "Yazara göre", "Bu paragrafta", "Türkiye'nin iç bölgelerinde", "Verilen tabloda",
+]
+STEMS = [
+    "Buna göre aşağıdakilerden hangisi doğrudur?",
+    "Bu parçada asıl anlatılmak istenen aşağıdakilerden hangisidir?",
+    "Aşağıdakilerden hangisi bu durumun bir sonucudur?",
+    "Buna göre hangisi kesinlikle söylenebilir?",
+    "Yukarıdaki bilgilere göre aşağıdakilerden hangisine ulaşılamaz?",
+]
+
+
+@dataclass(frozen=True)
+class ExamSpec:
+    """What to generate (seeded: the same spec always gives the same PDF)"""
+    pages: int = 12  # Question pages, the answer key comes on top
+    columns: int = 2
+    question_style: str = "number"
+    option_style: str = "paren"
+    bold_stems: bool = True  # Stem sentence (soru kökü) in bold
+    figures: bool = True  # Embedded raster charts in some questions
+    answer_key: bool = True
+    scanned: bool = False  # Image-only pages
+    scan_dpi: int = 150
+    subjects: Tuple[str, ...] = ("TÜRKÇE", "MATEMATİK")
+    seed: int = 1
+
+
+@dataclass
+class GeneratedExam:
+    pdf_bytes: bytes
+    spec: ExamSpec
+    question_pages: List[int]  # 0-based page indices holding questions
+    answer_key_pages: List[int] = field(default_factory=list)
+    answers: Dict[str, Dict[int, str]] = field(default_factory=dict)  # Subject → {number: label}
+
+    @property
+    def total_questions(self) -> int:
+        return sum(len(answers) for answers in self.answers.values())
+
+
+def wrap(text: str, font: fitz.Font, width: float) -> List[str]:
+    """Greedy word wrap to `width` points"""
+    lines, line = [], ""
+    for word in text.split():
+        candidate = f"{line} {word}" if line else word
+        if line and font.text_length(candidate, fontsize=FONT_SIZE) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = candidate
+    if line:
+        lines.append(line)
+    return lines
+
+
+def sentence(rnd: random.Random, words: int) -> str:
+    return " ".join(rnd.choice(WORDS) for _ in range(words))
+
+
+def chart_png(seed: int, bars: int = 6) -> bytes:
+    """Small grayscale bar chart, the kind of figure exams embed as an image"""
+    rnd = random.Random(seed)
+    width, height = 360, 160
+    pix = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, width, height), False)
+    pix.clear_with(255)
+    bar_width = width // (bars * 2)
+    for i in range(bars):
+        bar_height = rnd.randint(30, height - 20)
+        x = bar_width // 2 + i * bar_width * 2
+        pix.set_rect(fitz.IRect(x, height - bar_height, x + bar_width, height - 4), (rnd.randint(40, 160),))
+    pix.set_rect(fitz.IRect(0, height - 4, width, height), (0,))  # Axis
+    return pix.tobytes("png")
+
+
+class ExamWriter:
+    """Lays out questions column by column, page by page"""
+
+    def __init__(self, spec: ExamSpec):
+        self.spec = spec
+        self.rnd = random.Random(spec.seed)
+        self.doc = fitz.open()
+        self.column_width = (PAGE_WIDTH - 2 * MARGIN - (spec.columns - 1) * COLUMN_SPACING) / spec.columns
+        self.figures = [chart_png(spec.seed * 100 + i) for i in range(4)]
+        self.page = None
+        self.writer = None
+        self.column = 0
+        self.y = TOP
+
+    def new_page(self, heading: str) -> None:
+        self.finish_page()
+        self.page = self.doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        self.writer = fitz.TextWriter(self.page.rect)
+        self.writer.append((MARGIN, 48), heading, font=FONT_BOLD, fontsize=12)
+        footer = f"Sayfa {len(self.doc)}"
+        self.writer.append((PAGE_WIDTH / 2 - 20, PAGE_HEIGHT - 28), footer, font=FONT, fontsize=8)
+        self.page.draw_line((MARGIN, 58), (PAGE_WIDTH - MARGIN, 58), width=0.8)
+        for column in range(1, self.spec.columns):
+            x = MARGIN + column * (self.column_width + COLUMN_SPACING) - COLUMN_SPACING / 2
+            self.page.draw_line((x, TOP - 6), (x, BOTTOM), width=0.5)
+        self.column = 0
+        self.y = TOP
+
+    def finish_page(self) -> None:
+        if self.writer is not None:
+            self.writer.write_text(self.page)
+            self.writer = None
+
+    @property
+    def x(self) -> float:
+        return MARGIN + self.column * (self.column_width + COLUMN_SPACING)
+
+    def text_line(self, text: str, bold: bool = False, indent: float = 0) -> None:
+        self.writer.append((self.x + indent, self.y), text, font=FONT_BOLD if bold else FONT, fontsize=FONT_SIZE)
+        self.y += LEADING
+
+    def question(self, number: int) -> Tuple[List[Tuple[str, bool, float]], Optional[int]]:
+        """Lines (text, bold, indent) of one question and the line its figure goes before (None: no figure)"""
+        spec, rnd = self.spec, self.rnd
+        prefix = QUESTION_STYLES[spec.question_style].format(n=number)
+        indent = FONT_BOLD.text_length(f"{number}. ", fontsize=FONT_SIZE)
+        body_width = self.column_width - indent
+
+        paragraph = f"{rnd.choice(OPENINGS)} {sentence(rnd, rnd.randint(8, 45))}."
+        body = wrap(paragraph, FONT, body_width)
+        lines = []
+        if spec.question_style == "soru":
+            lines.append((prefix, True, 0))
+            lines += [(text, False, indent) for text in body]
+        else:
+            lines.append((prefix + body[0], False, 0))
+            lines += [(text, False, indent) for text in body[1:]]
+
+        stem_font = FONT_BOLD if spec.bold_stems else FONT
+        figure_at = len(lines) if spec.figures and rnd.random() < 0.3 else None
+        lines += [(text, spec.bold_stems, indent) for text in wrap(rnd.choice(STEMS), stem_font, body_width)]
+
+        for label in LABELS:
+            option = OPTION_STYLES[spec.option_style].format(label=label) + sentence(rnd, rnd.randint(1, 9))
+            option_lines = wrap(option, FONT, body_width - 8)
+            lines.append((option_lines[0], False, indent + 4))
+            lines += [(text, False, indent + 16) for text in option_lines[1:]]
+
+        return lines, figure_at
+
+    def place_question(self, number: int) -> bool:
+        """Write one question at the cursor; False when it does not fit on this page"""
+        lines, figure_at = self.question(number)
+        figure_height = self.column_width * 0.45 if figure_at is not None else 0
+        height = len(lines) * LEADING + figure_height + (8 if figure_height else 0)
+
+        if self.y + height > BOTTOM:
+            if self.column + 1 >= self.spec.columns:
+                return False
+            self.column += 1
+            self.y = TOP
+
+        for i, (text, bold, indent) in enumerate(lines):
+            if i == figure_at:
+                rect = fitz.Rect(self.x + 16, self.y - 6, self.x + self.column_width - 16, self.y - 6 + figure_height)
+                self.page.insert_image(rect, stream=self.rnd.choice(self.figures))
+                self.y += figure_height + 8
+            self.text_line(text, bold, indent)
+        self.y += QUESTION_SPACING
+        return True
+
+    def answer_key_pages(self, answers: Dict[str, Dict[int, str]]) -> None:
+        self.new_page("CEVAP ANAHTARI")
+        for subject, subject_answers in answers.items():
+            rows = [
+                "    ".join(f"{n}. {subject_answers[n]}" for n in range(start, min(start + 5, len(subject_answers) + 1)))
+                for start in range(1, len(subject_answers) + 1, 5)
+            ]
+            if self.y + (len(rows) + 2) * LEADING > BOTTOM:
+                self.new_page("CEVAP ANAHTARI")
+            self.y += LEADING / 2
+            self.text_line(subject, bold=True)
+            for row in rows:
+                if self.y > BOTTOM:
+                    self.new_page("CEVAP ANAHTARI")
+                self.text_line(row)
+
+    def save(self) -> bytes:
+        self.finish_page()
+        self.doc.subset_fonts()  # Nimbus would otherwise be embedded in full on every page
+        pdf_bytes = self.doc.tobytes(garbage=3, deflate=True)
+        self.doc.close()
+        return pdf_bytes
+
+
+def scan(pdf_bytes: bytes, dpi: int) -> bytes:
+    """Same pages as grayscale images only (no text layer)"""
+    source = fitz.open(stream=pdf_bytes, filetype="pdf")
+    scanned = fitz.open()
+    for page in source:
+        pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+        scanned.new_page(width=page.rect.width, height=page.rect.height).insert_image(page.rect, pixmap=pix)
+    source.close()
+    try:
+        return scanned.tobytes(garbage=3, deflate=True)
+    finally:
+        scanned.close()
+
+
+def generate_exam(spec: ExamSpec = ExamSpec()) -> GeneratedExam:
+    """Build the exam described by `spec`"""
+    if spec.columns not in (1, 2):
+        raise ValueError("columns must be 1 or 2")
+    if spec.question_style not in QUESTION_STYLES:
+        raise ValueError(f"question_style must be one of {', '.join(QUESTION_STYLES)}")
+    if spec.option_style not in OPTION_STYLES:
+        raise ValueError(f"option_style must be one of {', '.join(OPTION_STYLES)}")
+
+    writer = ExamWriter(spec)
+    answers: Dict[str, Dict[int, str]] = {}
+    subjects = spec.subjects[:max(1, spec.pages)]
+    for index, subject in enumerate(subjects):
+        # Pages split evenly, earlier subjects take the remainder
+        pages = spec.pages // len(subjects) + (1 if index < spec.pages % len(subjects) else 0)
+        subject_answers = answers.setdefault(subject, {})
+        for _ in range(pages):
+            writer.new_page(f"{subject} TESTİ")
+            while writer.place_question(len(subject_answers) + 1):
+                subject_answers[len(subject_answers) + 1] = writer.rnd.choice(LABELS)
+
+    question_pages = list(range(len(writer.doc)))
+    if spec.answer_key:
+        writer.answer_key_pages(answers)
+    key_pages = list(range(len(question_pages), len(writer.doc)))
+
+    pdf_bytes = writer.save()
+    if spec.scanned:
+        pdf_bytes = scan(pdf_bytes, spec.scan_dpi)
+    return GeneratedExam(pdf_bytes, spec, question_pages, key_pages, answers)
+
+
+def add_spec_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = ExamSpec()
+    parser.add_argument("--pages", type=int, default=defaults.pages, help="question pages")
+    parser.add_argument("--columns", type=int, choices=(1, 2), default=defaults.columns)
+    parser.add_argument("--question-style", choices=list(QUESTION_STYLES), default=defaults.question_style)
+    parser.add_argument("--option-style", choices=list(OPTION_STYLES), default=defaults.option_style)
+    parser.add_argument("--plain-stems", action="store_true", help="stem sentences in regular weight")
+    parser.add_argument("--no-figures", action="store_true")
+    parser.add_argument("--no-answer-key", action="store_true")
+    parser.add_argument("--scanned", action="store_true", help="image-only pages")
+    parser.add_argument("--scan-dpi", type=int, default=defaults.scan_dpi)
+    parser.add_argument("--subjects", nargs="+", default=list(defaults.subjects))
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def spec_from_args(args: argparse.Namespace) -> ExamSpec:
+    return ExamSpec(
+        pages=args.pages,
+        columns=args.columns,
+        question_style=args.question_style,
+        option_style=args.option_style,
+        bold_stems=not args.plain_stems,
+        figures=not args.no_figures,
+        answer_key=not args.no_answer_key,
+        scanned=args.scanned,
+        scan_dpi=args.scan_dpi,
+        subjects=tuple(args.subjects),
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic Turkish exam PDF")
+    parser.add_argument("output")
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+
+    exam = generate_exam(spec_from_args(args))
+    with open(args.output, "wb") as f:
+        f.write(exam.pdf_bytes)
+    print(f"📝 {args.output}: {len(exam.question_pages)} question pages, {exam.total_questions} questions, "
+          f"answer key on pages {[p + 1 for p in exam.answer_key_pages]} ({len(exam.pdf_bytes) / 1024:.0f} KB)")
+    print(f"   {asdict(exam.spec)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+"""
+Frozen copy of segmentation before bisect range queries and NumPy columns
+
+Each question, option and option candidate rescans the whole block list
+(quadratic in lines per column), and column detection/grouping loop over
+every line in Python. Kept verbatim so bench_segmentation and bench_layout
+can check that the current parser produces identical output.
+"""
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+from app.parse_pdf import (
+    QuestionBlock,
+    TextBlock,
+    extract_text_blocks_with_fonts,
+    is_question_start_block,
+)
+from app.turkish_text import fix_turkish_encoding, join_normalized
+
+
+def detect_columns(blocks: List[TextBlock], page_width: float) -> List[Tuple[float, float]]:
+    """
+    Detect columns in page using X-axis clustering
+    Returns: list of (x_start, x_end) for each column
+    """
+    if not blocks:
+        return [(0, page_width)]
+
+    # Cluster blocks by X position
+    x_positions = [b.center_x for b in blocks]
+    x_positions.sort()
+
+    # Find gaps larger than 50 points (column separator)
+    columns = []
+    col_start = 0
+
+    for i in range(1, len(x_positions)):
+        gap = x_positions[i] - x_positions[i-1]
+        if gap > 50:  # Column separator detected
+            col_end = (x_positions[i-1] + x_positions[i]) / 2
+            columns.append((col_start, col_end))
+            col_start = col_end
+
+    # Last column
+    columns.append((col_start, page_width))
+
+    # If no columns detected, return full width
+    if len(columns) == 0:
+        columns = [(0, page_width)]
+
+    print(f"   🔲 Detected {len(columns)} column(s)")
+    return columns
+
+
+def group_blocks_by_column(blocks: List[TextBlock], columns: List[Tuple[float, float]]) -> Dict[int, List[TextBlock]]:
+    """Group text blocks by column"""
+    column_blocks = defaultdict(list)
+
+    for block in blocks:
+        # Find which column this block belongs to
+        for col_idx, (col_start, col_end) in enumerate(columns):
+            if col_start <= block.center_x < col_end:
+                column_blocks[col_idx].append(block)
+                break
+
+    return column_blocks
+
+
+def find_question_blocks(
+    page: fitz.Page,
+    page_num: int,
+    unique_id_start: int,
+    blocks: Optional[List[TextBlock]] = None,
+) -> List[QuestionBlock]:
+    """
+    Find all question blocks on a page using:
+    - Column detection
+    - Font-based segmentation
+    - Geometric clustering
+
+    blocks: text lines to segment (None → the page's text layer; OCR lines for scanned pages)
+    """
+    if blocks is None:
+        blocks = extract_text_blocks_with_fonts(page)
+
+    if not blocks:
+        return []
+
+    page_rect = page.rect
+    page_width = page_rect.width
+    page_height = page_rect.height
+
+    # Detect columns
+    columns = detect_columns(blocks, page_width)
+
+    # Group blocks by column
+    column_groups = group_blocks_by_column(blocks, columns)
+
+    question_blocks = []
+    unique_id = unique_id_start
+
+    # Process each column separately
+    for col_idx, col_blocks in sorted(column_groups.items()):
+        # Sort by Y position within column
+        col_blocks.sort(key=lambda b: b.y0)
+
+        # Find question starts in this column
+        question_starts = []
+        for block in col_blocks:
+            q_num = is_question_start_block(block)
+            if q_num is not None:
+                question_starts.append({
+                    'block': block,
+                    'pdf_num': q_num,
+                    'y0': block.y0,
+                })
+
+        if not question_starts:
+            continue
+
+        print(f"   📍 Column {col_idx}: Found {len(question_starts)} questions")
+
+        # Create question blocks with boundaries
+        col_x_start, col_x_end = columns[col_idx]
+
+        for i, q_start in enumerate(question_starts):
+            start_y = q_start['y0']
+
+            # End Y is next question or page bottom
+            if i + 1 < len(question_starts):
+                end_y = question_starts[i + 1]['y0'] - 5
+            else:
+                end_y = page_height
+
+            # Collect all blocks in this Y range and column
+            q_text_blocks = [
+                b for b in col_blocks
+                if start_y <= b.y0 < end_y
+            ]
+
+            if not q_text_blocks:
+                continue
+
+            # Calculate tight bounding box
+            min_x = min(b.x0 for b in q_text_blocks)
+            max_x = max(b.x1 for b in q_text_blocks)
+            min_y = min(b.y0 for b in q_text_blocks)
+            max_y = max(b.y1 for b in q_text_blocks)
+
+            # Add padding
+            crop_x0 = max(0, min_x - 5)
+            crop_x1 = min(page_width, max_x + 5)
+            crop_y0 = max(0, min_y - 5)
+            crop_y1 = min(page_height, max_y + 5)
+
+            question_block = QuestionBlock(
+                unique_id=unique_id,
+                pdf_number=q_start['pdf_num'],
+                page_num=page_num,
+                x0=crop_x0,
+                y0=crop_y0,
+                x1=crop_x1,
+                y1=crop_y1,
+                text_blocks=q_text_blocks,
+                column_index=col_idx,
+            )
+
+            question_blocks.append(question_block)
+            unique_id += 1
+
+            print(f"      ✅ Q{q_start['pdf_num']} → ID={question_block.unique_id} "
+                  f"(Y={crop_y0:.0f}-{crop_y1:.0f}, blocks={len(q_text_blocks)})")
+
+    return question_blocks
+
+
+def extract_options_with_clustering(text_blocks: List[TextBlock]) -> List[Dict[str, str]]:
+    """
+    Extract options using X-axis alignment clustering - IMPROVED
+    Handles multi-line options with ±20pt tolerance
+    Properly groups text blocks that belong to same option
+    """
+    if not text_blocks:
+        return []
+
+    # Step 1: Find option start markers (A-E)
+    option_starts = []
+
+    for block in text_blocks:
+        text = block.text.strip()
+
+        # Enhanced pattern: A) A. A: A- A  (with space) or A)text
+        # Must be at START of line
+        match = re.match(r'^([A-E])\s*[.):\-]?\s*(.*)$', text, re.IGNORECASE)
+        if match:
+            label = match.group(1).upper()
+            rest = match.group(2).strip()
+
+            # Only accept if:
+            # 1. It's just "A" or "A)" alone
+            # 2. Or it has content after the label
+            # 3. Block is left-aligned (not indented too much)
+            if not rest or len(rest) > 0:
+                option_starts.append({
+                    'label': label,
+                    'block': block,
+                    'x0': block.x0,
+                    'y0': block.y0,
+                })
+
+    if not option_starts:
+        return []
+
+    # Step 2: Remove duplicate labels (keep first occurrence)
+    seen_labels = set()
+    unique_option_starts = []
+    for opt in option_starts:
+        if opt['label'] not in seen_labels:
+            seen_labels.add(opt['label'])
+            unique_option_starts.append(opt)
+
+    option_starts = unique_option_starts
+
+    # Step 3: Calculate average X position for option alignment
+    option_x_positions = [opt['x0'] for opt in option_starts]
+    avg_option_x = sum(option_x_positions) / len(option_x_positions)
+
+    # Step 4: Sort by Y position
+    option_starts.sort(key=lambda opt: opt['y0'])
+
+    # Step 5: For each option, collect ALL text blocks in its Y range
+    options = []
+
+    for i, opt_start in enumerate(option_starts):
+        label = opt_start['label']
+        start_y = opt_start['y0']
+
+        # Determine end Y (next option's Y or end of all blocks)
+        if i + 1 < len(option_starts):
+            end_y = option_starts[i + 1]['y0'] - 2  # Small gap
+        else:
+            end_y = max(b.y1 for b in text_blocks) + 10
+
+        # Collect all blocks in this Y range with X alignment ±20pt
+        option_lines = []
+
+        for block in text_blocks:
+            # Check if block is in Y range
+            if start_y <= block.y0 < end_y:
+                # Check X alignment (±20pt tolerance)
+                x_diff = abs(block.x0 - avg_option_x)
+                if x_diff <= 20:
+                    option_lines.append((block.y0, block.text))
+
+        # Sort by Y to maintain reading order
+        option_lines.sort(key=lambda x: x[0])
+        option_text_parts = [text for _, text in option_lines]
+
+        # Join with space
+        full_text = ' '.join(option_text_parts)
+
+        # Clean: Remove option label prefix
+        full_text = re.sub(r'^[A-E]\s*[.):\-]?\s*', '', full_text, flags=re.IGNORECASE).strip()
+
+        # Apply Turkish encoding fixes
+        full_text = fix_turkish_encoding(full_text)
+
+        # Only add if has content
+        if full_text and len(full_text) > 1:
+            options.append({
+                'label': label,
+                'value': full_text,
+            })
+
+    # Step 6: Ensure A-E order
+    options.sort(key=lambda x: x['label'])
+
+    # Step 7: Validate - should have 2-5 options
+    if len(options) < 2:
+        print(f"      ⚠️  Only {len(options)} option(s) found - may be incomplete")
+    elif len(options) > 5:
+        print(f"      ⚠️  {len(options)} options found - may have false positives")
+        # Keep only first 5
+        options = options[:5]
+
+    return options
+
+
+def extract_question_text(text_blocks: List[TextBlock], options: List[Dict[str, str]]) -> str:
+    """
+    Extract clean question text (before options start) - IMPROVED
+    IMPORTANT: Don't cut off at "Aşağıdakilerden hangisi A)" - that's part of question!
+    Only stop at REAL option starts with substantial content
+    """
+    if not text_blocks:
+        return ""
+
+    # Step 1: Find where options REALLY start
+    # We need to be very careful not to mistake question text for options
+    option_start_y = None
+
+    # If we already extracted options, use their labels to find start
+    if options:
+        # Find first option label in blocks
+        first_option_label = options[0]['label']
+
+        for block in text_blocks:
+            text = block.text.strip()
+
+            # Look for this specific option label with content
+            # Pattern: "A) some text" or "A. some text" with real content
+            pattern = f'^{first_option_label}\\s*[.):\\-]\\s+(.{{5,}})'
+            match = re.match(pattern, text, re.IGNORECASE)
+
+            if match:
+                content = match.group(1).strip()
+                # Must have substantial content (not just "doğru", "yanlış", single word)
+                words = content.split()
+                if len(words) >= 2 or len(content) > 10:
+                    option_start_y = block.y0
+                    break
+
+    # Step 2: If we didn't find option start, look for first clear option marker
+    if option_start_y is None:
+        for block in text_blocks:
+            text = block.text.strip()
+
+            # Check for clear option pattern with content
+            match = re.match(r'^([A-E])\s*[.):\-]\s+(.+)$', text, re.IGNORECASE)
+            if match:
+                label = match.group(1).upper()
+                content = match.group(2).strip()
+
+                # Must be option A and have real content
+                if label == 'A' and len(content) > 8:
+                    # Double-check: not part of question like "Aşağıdakilerden A)"
+                    # Real options usually don't have question words before them
+                    prev_blocks = [b for b in text_blocks if b.y0 < block.y0]
+                    if prev_blocks:
+                        last_prev = prev_blocks[-1].text.lower()
+                        # If previous block has question indicators, this might not be option
+                        if any(word in last_prev for word in ['hangisi', 'aşağıdaki', 'hangi', 'which']):
+                            continue
+
+                    option_start_y = block.y0
+                    break
+
+    # Step 3: Collect question text (everything before options)
+    question_parts = []
+
+    for block in text_blocks:
+        # Stop at option start
+        if option_start_y and block.y0 >= option_start_y:
+            break
+
+        text = block.text.strip()
+
+        # Skip empty
+        if not text:
+            continue
+
+        # Skip answer key lines
+        if re.search(r'(?:cevap|doğru\s+cevap|yanıt|answer\s*key)', text, re.IGNORECASE):
+            continue
+
+        # Skip lone question numbers
+        if re.match(r'^\d+[.)]?\s*$', text):
+            continue
+
+        # Skip page numbers, footers
+        if re.match(r'^(sayfa|page)\s*\d+', text, re.IGNORECASE):
+            continue
+
+        # Add to question (unstripped block text keeps its NormalizedText marker)
+        question_parts.append(block.text)
+
+    # Step 4: Join and clean
+    question_text = join_normalized(question_parts)
+
+    # Apply Turkish encoding fixes
+    question_text = fix_turkish_encoding(question_text)
+
+    # Normalize whitespace
+    question_text = ' '.join(question_text.split())
+
+    return question_text.strip()
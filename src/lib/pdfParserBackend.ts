@@ -19,7 +19,7 @@ export interface BackendQuestionImage {
     text: string;  // Full question text
     stem: string;  // Bold question root/core
     options: Array<{ label: string; value: string }>;
-    image: string;  // data:image/png;base64,...
+    image: string | null;  // /api/images/{digest} (or data:image/png;base64,... with ?images=inline)
   };
   answer_key: {
     correct: string | null;
@@ -71,7 +71,11 @@ export async function parsePDFWithBackend(
 
         const imageData = q.content.image;
 
-        if (imageData && imageData.startsWith('data:image')) {
+        if (imageData && imageData.startsWith('/api/images/')) {
+          // Image served separately by the backend (immutable, browser-cacheable)
+          const imageResponse = await fetch(`${BACKEND_URL}${imageData}`);
+          blob = imageResponse.ok ? await imageResponse.blob() : new Blob([], { type: 'image/png' });
+        } else if (imageData && imageData.startsWith('data:image')) {
           // Extract base64 part after comma
           const base64Data = imageData.split(',')[1];
           const imageBytes = atob(base64Data);